@@ -0,0 +1,102 @@
+"""
+Benchmark: single-pass streaming extractor vs. the previous BeautifulSoup
+implementation of the web loader.
+
+Reports, per page, the median extraction time and the peak Python heap
+allocated during extraction (tracemalloc), and checks both produce the same
+text.
+
+Usage:
+    python -m benchmarks.bench_extractor                 # generated corpus
+    python -m benchmarks.bench_extractor --pages saved/  # directory of *.html
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from benchmarks.corpus import load_corpus
+from graph_web.extractor import StreamingExtractor
+from graph_web.loader_deployment import MAX_CHARS
+
+CHUNK_SIZE = 64 * 1024
+
+
+# -- Previous implementation (BeautifulSoup tree + repeated traversals) --------
+def _bs4_extract_targeted(soup: BeautifulSoup) -> Optional[str]:
+    el = soup.select_one("h1.title.hypothesis_container")
+    if el:
+        text = el.get_text(separator=" ", strip=True)
+        if text:
+            return text
+    el = soup.select_one("h2#html-abstract-title")
+    if el:
+        text = el.get_text(separator=" ", strip=True)
+        if text:
+            return text
+    paragraphs = [d.get_text(separator=" ", strip=True) for d in soup.select("div.html-p")]
+    paragraphs = [p for p in paragraphs if p]
+    return "\n\n".join(paragraphs) if paragraphs else None
+
+
+def _bs4_extract_visible_text(soup: BeautifulSoup) -> str:
+    for tag in soup(["script", "style", "noscript", "iframe", "header", "footer", "svg"]):
+        tag.decompose()
+    texts = list(soup.stripped_strings)
+    return " ".join(texts) if texts else "No content"
+
+
+def bs4_extract(html: str) -> str:
+    soup = BeautifulSoup(html, "lxml")
+    content = _bs4_extract_targeted(soup) or _bs4_extract_visible_text(soup)
+    return content[:MAX_CHARS]
+
+
+# -- New implementation, fed in response-sized chunks -------------------------
+def streaming_extract(html: str) -> str:
+    data = html.encode("utf-8")
+    extractor = StreamingExtractor(max_chars=MAX_CHARS, encoding="utf-8")
+    for start in range(0, len(data), CHUNK_SIZE):
+        if extractor.feed(data[start:start + CHUNK_SIZE]):
+            break
+    return extractor.close()
+
+
+def measure(func, html: str, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", help="Directory of saved *.html pages (default: generated corpus)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per page")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.getLogger("graph_web.extractor").setLevel(logging.WARNING)
+
+    print(f"{'page':<18}{'size KB':>9}{'bs4 ms':>10}{'stream ms':>11}{'speedup':>9}"
+          f"{'bs4 peak KB':>13}{'stream peak KB':>16}  same")
+    for name, html in load_corpus(args.pages).items():
+        old_t, old_mem, old = measure(bs4_extract, html, args.repeat)
+        new_t, new_mem, new = measure(streaming_extract, html, args.repeat)
+        print(f"{name:<18}{len(html) / 1024:>9.0f}{old_t * 1000:>10.2f}{new_t * 1000:>11.2f}"
+              f"{old_t / new_t:>8.1f}x{old_mem / 1024:>13.0f}{new_mem / 1024:>16.0f}  {old == new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Benchmark: web_graph and article_graph end to end, fully offline.
+
+Starts a MockInferenceServer (stand-in for the HF endpoint) and a
+CorpusServer (the HTML fixture corpus), then runs each graph in three modes:
+
+  sequential   one request after another
+  threaded     --concurrency requests at once with graph.invoke in a thread pool
+  async        --concurrency requests at once with graph.ainvoke on one loop
+
+Every (graph, mode) pair runs in a fresh interpreter pointed at the local
+servers, with the page cache, LLM cache and dedup index off and per-host
+rate limiting disabled. Reports throughput, p50/p95/p99 request latency, errors and the
+process's peak RSS.
+
+Usage:
+    python -m benchmarks.bench_graphs
+    python -m benchmarks.bench_graphs --requests 50 --concurrency 8 --latency 0.3 --error-rate 0.02
+    python -m benchmarks.bench_graphs --graphs web --modes async --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from benchmarks.corpus import load_corpus
+from benchmarks.servers import CorpusServer, MockInferenceServer
+
+GRAPHS = ("web", "article")
+MODES = ("sequential", "threaded", "async")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+# -- Worker side: runs inside the child interpreter -----------------------------
+def _requests(graph_name: str, urls: List[str]):
+    """Return (sync request, async request), each taking the request index."""
+    from shared import ResearchState
+
+    if graph_name == "web":
+        from graph_web.graph_web import get_web_graph
+        graph = get_web_graph()
+
+        def state(i):
+            return ResearchState(url=urls[i % len(urls)])
+    else:
+        from graph_article.graph_article import get_article_graph
+        graph = get_article_graph()
+
+        def state(i):
+            return ResearchState(input=f"Benchmark title {i}", category="Benchmarks")
+
+    return (lambda i: graph.invoke(state(i))), (lambda i: graph.ainvoke(state(i)))
+
+
+def _timed(func: Callable, i: int, latencies: List[float], errors: List[str]) -> None:
+    start = time.perf_counter()
+    try:
+        func(i)
+        latencies.append(time.perf_counter() - start)
+    except Exception as e:
+        errors.append(type(e).__name__)
+
+
+async def _atimed(func: Callable, i: int, latencies, errors, semaphore) -> None:
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            await func(i)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(type(e).__name__)
+
+
+def run_worker(graph_name: str, mode: str, requests: int, concurrency: int, urls: List[str]) -> dict:
+    run, arun = _requests(graph_name, urls)
+    # Warm-up: lazy imports, client construction and connection set-up are not timed
+    try:
+        run(0)
+    except Exception:
+        pass
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    start = time.perf_counter()
+    if mode == "sequential":
+        for i in range(requests):
+            _timed(run, i, latencies, errors)
+    elif mode == "threaded":
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(lambda i: _timed(run, i, latencies, errors), range(requests)))
+    else:
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(_atimed(arun, i, latencies, errors, semaphore) for i in range(requests)))
+        asyncio.run(main())
+    wall = time.perf_counter() - start
+
+    return {
+        "graph": graph_name,
+        "mode": mode,
+        "requests": requests,
+        "concurrency": 1 if mode == "sequential" else concurrency,
+        "errors": len(errors),
+        "error_types": sorted(set(errors)),
+        "wall_seconds": wall,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# -- Driver side ---------------------------------------------------------------
+def _child_env(llm: MockInferenceServer, corpus: CorpusServer) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "LLM_ENDPOINT_URL": llm.url,
+        "HUGGINGFACEHUB_API_TOKEN": env.get("HUGGINGFACEHUB_API_TOKEN") or "hf_benchmark",
+        "BENCH_URLS": "\n".join(corpus.url_for(name) for name in corpus.pages),
+        "LLM_CACHE": "off",
+        "PAGE_CACHE_DIR": "",
+        "DEDUP_INDEX": "",
+        "COMPRESS_TOKENIZER": "",
+        "BROWSER_POOL_SIZE": "0",
+        # The mock writer's filler text would never get past the prescreen
+        "CRITIC_PRESCREEN": "0",
+        "FETCH_RATE_PER_HOST": "0",
+        "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")])),
+    })
+    return env
+
+
+def run_case(graph_name: str, mode: str, args, env: dict) -> dict:
+    cmd = [sys.executable, "-m", "benchmarks.bench_graphs", "--worker", graph_name, mode,
+           "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"{graph_name}/{mode} worker failed:\n{proc.stderr[-2000:]}")
+    if args.verbose:
+        sys.stderr.write(proc.stderr)
+    return json.loads(lines[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--graphs", default=",".join(GRAPHS), help="Comma-separated: web,article")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated: sequential,threaded,async")
+    parser.add_argument("--requests", type=int, default=20, help="Timed requests per graph and mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight (threaded/async)")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mock LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Mock LLM generation speed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--accept-rate", type=float, default=1.0, help="Fraction of reviews ACCEPTED")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Corpus server delay per page")
+    parser.add_argument("--pages", help="Directory of saved *.html pages (default: generated corpus)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show worker logs")
+    parser.add_argument("--worker", nargs=2, metavar=("GRAPH", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        urls = [u for u in os.environ.get("BENCH_URLS", "").splitlines() if u]
+        result = run_worker(*args.worker, args.requests, args.concurrency, urls)
+        print(json.dumps(result))
+        return
+
+    llm = MockInferenceServer(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                              error_rate=args.error_rate, accept_rate=args.accept_rate)
+    corpus = CorpusServer(load_corpus(args.pages), latency=args.page_latency)
+    results = []
+    with llm, corpus:
+        env = _child_env(llm, corpus)
+        print(f"{'graph':<9}{'mode':<12}{'conc':>5}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'errors':>8}{'peak RSS MB':>13}")
+        for graph_name in args.graphs.split(","):
+            for mode in args.modes.split(","):
+                r = run_case(graph_name, mode, args, env)
+                results.append(r)
+                print(f"{r['graph']:<9}{r['mode']:<12}{r['concurrency']:>5}{r['throughput']:>8.2f}"
+                      f"{r['p50'] * 1000:>9.0f}{r['p95'] * 1000:>9.0f}{r['p99'] * 1000:>9.0f}"
+                      f"{r['errors']:>8}{r['peak_rss_mb']:>13.0f}", flush=True)
+        print(f"mock LLM: {llm.stats}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k != "worker"},
+                       "llm": llm.stats, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: cold import time of the entry points.
+
+Each module is imported in a fresh interpreter with `python -X importtime`
+and the cumulative time of the top-level import is reported (median of
+--repeat runs), together with which known heavy packages got pulled in.
+
+Usage:
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --save .cache/import_baseline.json
+    python -m benchmarks.bench_import --baseline .cache/import_baseline.json
+
+With --baseline the exit status is 1 when a module got slower than the saved
+time by more than --tolerance (relative) plus --slack (absolute ms), so the
+script can gate startup regressions in CI.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULES = ("main", "graph_web.graph_web", "graph_article.graph_article", "graph_web.batch")
+HEAVY = ("transformers", "torch", "langchain_huggingface", "langgraph", "IPython")
+
+
+def import_time(module: str):
+    """Return (cumulative import seconds, heavy packages loaded) for one cold import."""
+    code = (
+        f"import sys; import {module}; "
+        f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1]) / 1e6
+    if cumulative is None:
+        raise RuntimeError(f"no importtime line for {module}")
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return cumulative, heavy
+
+
+def measure(modules, repeat: int) -> dict:
+    results = {}
+    for module in modules:
+        runs = [import_time(module) for _ in range(repeat)]
+        results[module] = {
+            "seconds": statistics.median(t for t, _ in runs),
+            "heavy": runs[-1][1],
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=list(MODULES), help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold imports per module")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--slack", type=float, default=50, help="Allowed absolute slowdown in ms")
+    args = parser.parse_args(argv)
+
+    results = measure(args.modules, args.repeat)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = []
+    print(f"{'module':<32}{'import ms':>11}{'baseline ms':>13}  heavy imports")
+    for module, result in results.items():
+        ms = result["seconds"] * 1000
+        base = baseline.get(module, {}).get("seconds")
+        base_col = f"{base * 1000:>13.0f}" if base is not None else f"{'-':>13}"
+        print(f"{module:<32}{ms:>11.0f}{base_col}  {', '.join(result['heavy']) or '-'}")
+        if base is not None and ms > base * 1000 * (1 + args.tolerance) + args.slack:
+            regressions.append(module)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"Import time regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
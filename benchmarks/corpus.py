@@ -0,0 +1,102 @@
+"""
+HTML fixture corpus for the offline benchmarks.
+
+Pages are either loaded from a directory of saved pages (*.html) or generated
+deterministically so the benchmarks run with no network access:
+
+  mdpi_*     MDPI article layout (title h1, abstract h2, div.html-p body);
+             mdpi_body_* omit the targeted headings so the body is extracted
+  generic_*  ordinary article page with nav/header/footer and scripts
+  jsshell_*  JavaScript-rendered shell with almost no static text
+"""
+
+import random
+from pathlib import Path
+from typing import Dict, Optional
+
+WORDS = (
+    "model data method result analysis learning network system energy signal "
+    "structure sample performance neural experiment measurement temperature "
+    "protein algorithm cell evaluation simulation approach dataset framework"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(3, 8)))
+
+
+def _chrome(rng: random.Random) -> str:
+    links = "".join(f'<li><a href="/s/{i}">{rng.choice(WORDS)}</a></li>' for i in range(60))
+    return (
+        f"<header><nav><ul>{links}</ul></nav></header>"
+        "<script>window.dataLayer = window.dataLayer || []; function gtag(){}</script>"
+        "<style>.html-p { margin: 0 } body { font-family: serif }</style>"
+    )
+
+
+def mdpi_page(paragraphs: int = 60, seed: int = 0, headings: bool = True) -> str:
+    rng = random.Random(seed)
+    title = _sentence(rng)
+    heads = (
+        f'<h1 class="title hypothesis_container">{title}</h1><h2 id="html-abstract-title">Abstract</h2>'
+        if headings else f"<h1>{title}</h1>"
+    )
+    body = "".join(
+        f'<div class="html-p">{_paragraph(rng)} <a href="#B{i}">[{i}]</a></div>'
+        for i in range(paragraphs)
+    )
+    refs = "".join(f"<li>{_sentence(rng)}</li>" for _ in range(paragraphs))
+    return (
+        "<!DOCTYPE html><html><head><title>MDPI article</title></head><body>"
+        f"{_chrome(rng)}"
+        f'<article>{heads}'
+        f'<section class="html-body">{body}</section>'
+        f'<section id="html-references_list"><ol>{refs}</ol></section></article>'
+        "<footer>© MDPI (Basel, Switzerland)</footer></body></html>"
+    )
+
+
+def generic_page(paragraphs: int = 40, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    body = "".join(f"<p>{_paragraph(rng)}</p>" for _ in range(paragraphs))
+    return (
+        "<!DOCTYPE html><html><head><title>Generic page</title></head><body>"
+        f"{_chrome(rng)}<main><h1>{_sentence(rng)}</h1>{body}</main>"
+        "<footer>Contact | Privacy | Terms</footer></body></html>"
+    )
+
+
+def js_shell_page(seed: int = 0) -> str:
+    return (
+        "<!DOCTYPE html><html><head><title>App</title>"
+        '<script src="/static/app.js"></script></head>'
+        '<body><div id="root"></div><noscript>You need to enable JavaScript to run this app.</noscript>'
+        "</body></html>"
+    )
+
+
+def generate_corpus() -> Dict[str, str]:
+    return {
+        "mdpi_small": mdpi_page(paragraphs=20, seed=1),
+        "mdpi_large": mdpi_page(paragraphs=600, seed=2),
+        "mdpi_body_large": mdpi_page(paragraphs=600, seed=5, headings=False),
+        "generic_small": generic_page(paragraphs=10, seed=3),
+        "generic_large": generic_page(paragraphs=400, seed=4),
+        "jsshell": js_shell_page(),
+    }
+
+
+def load_corpus(directory: Optional[str] = None) -> Dict[str, str]:
+    """Saved pages from directory (name -> HTML), or the generated corpus."""
+    if not directory:
+        return generate_corpus()
+    pages = {p.stem: p.read_text(encoding="utf-8", errors="replace")
+             for p in sorted(Path(directory).glob("*.html"))}
+    if not pages:
+        raise FileNotFoundError(f"No *.html pages found in {directory}")
+    return pages
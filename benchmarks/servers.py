@@ -0,0 +1,261 @@
+"""
+Local stand-ins for the services the graphs talk to, for offline benchmarks.
+
+  MockInferenceServer   OpenAI-style /v1/chat/completions, as served by HF
+                        Inference Providers and TGI, with configurable
+                        latency, token rate and error injection. Streams
+                        server-sent events when the request asks for it.
+  CorpusServer          serves the HTML fixture corpus at /<page name>.
+
+Both run a ThreadingHTTPServer on a background thread and are used as
+context managers:
+
+    with MockInferenceServer(latency=0.2, tokens_per_second=50) as llm, \\
+            CorpusServer(load_corpus()) as pages:
+        os.environ["LLM_ENDPOINT_URL"] = llm.url
+        ...pages.url_for("mdpi_0")...
+
+Run standalone to point the app at them by hand:
+    python -m benchmarks.servers --latency 0.5 --error-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from benchmarks.corpus import WORDS, load_corpus
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hang up early on purpose (the loader stops reading once it
+        # has the content it needs), so resets are not errors here
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class _Server:
+    handler = BaseHTTPRequestHandler
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = _HTTPServer((host, port), self.handler)
+        self.httpd.owner = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _InferenceHandler(_QuietHandler):
+    def do_POST(self):
+        server: MockInferenceServer = self.server.owner
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server.count("requests")
+
+        time.sleep(server.latency)
+        error = server.pick_error()
+        if error:
+            server.count(f"errors_{error}")
+            body = json.dumps({"error": f"injected {error}"}).encode()
+            self._send(error, body, "application/json", {"Retry-After": "1"} if error == 429 else None)
+            return
+
+        tokens = server.completion_tokens(request)
+        if request.get("stream"):
+            self._stream(server, request, tokens)
+        else:
+            time.sleep(len(tokens) / server.tokens_per_second)
+            self._send(200, json.dumps(server.completion(request, tokens)).encode(), "application/json")
+
+    def _stream(self, server, request, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for i, token in enumerate(tokens):
+            time.sleep(1 / server.tokens_per_second)
+            chunk = server.chunk(request, token if i == 0 else " " + token)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        final = server.chunk(request, "", finish_reason="stop")
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        self.wfile.flush()
+
+
+class MockInferenceServer(_Server):
+    """
+    Args:
+        latency (float): seconds before the first token (or the error).
+        tokens_per_second (float): generation speed.
+        error_rate (float): fraction of requests answered with an error.
+        error_status (tuple): statuses injected errors are drawn from.
+        max_tokens (int): completion length cap when the request sets none.
+        accept_rate (float): fraction of reviews answered ACCEPTED.
+        seed (int): seed for error injection and review verdicts.
+
+    Reviewer prompts (containing "ACCEPTED" or "REJECTED") get a one-word
+    verdict; every other prompt gets max_tokens words of filler text.
+    """
+
+    handler = _InferenceHandler
+
+    def __init__(self, latency: float = 0.1, tokens_per_second: float = 200.0,
+                 error_rate: float = 0.0, error_status=(429, 503), max_tokens: int = 100,
+                 accept_rate: float = 1.0, seed: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = tuple(error_status)
+        self.max_tokens = max_tokens
+        self.accept_rate = accept_rate
+        self.stats: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def pick_error(self) -> Optional[int]:
+        with self._lock:
+            if self._rng.random() < self.error_rate:
+                return self._rng.choice(self.error_status)
+        return None
+
+    def completion_tokens(self, request: dict):
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        if "ACCEPTED" in prompt and "REJECTED" in prompt:
+            with self._lock:
+                accepted = self._rng.random() < self.accept_rate
+            return ["ACCEPTED" if accepted else "REJECTED"]
+        limit = request.get("max_tokens") or self.max_tokens
+        rng = random.Random(len(prompt))
+        return [rng.choice(WORDS) for _ in range(min(limit, self.max_tokens))]
+
+    def completion(self, request: dict, tokens) -> dict:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model") or "mock",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": self._usage(request, tokens),
+        }
+
+    def chunk(self, request: dict, text: str, finish_reason=None) -> dict:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model") or "mock",
+            "choices": [{"index": 0, "delta": {"role": "assistant", "content": text},
+                         "finish_reason": finish_reason}],
+        }
+
+    @staticmethod
+    def _usage(request: dict, tokens) -> dict:
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens)}
+
+
+class _CorpusHandler(_QuietHandler):
+    def do_GET(self):
+        server: CorpusServer = self.server.owner
+        html = server.pages.get(self.path.strip("/").split("?")[0])
+        if html is None:
+            self._send(404, b"not found", "text/plain")
+            return
+        time.sleep(server.latency)
+        self._send(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+
+class CorpusServer(_Server):
+    """Serve {name: html} pages at /<name>, after `latency` seconds."""
+
+    handler = _CorpusHandler
+
+    def __init__(self, pages: Dict[str, str], latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.pages = pages
+        self.latency = latency
+
+    def url_for(self, name: str) -> str:
+        return f"{self.url}/{name}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--accept-rate", type=float, default=1.0)
+    parser.add_argument("--pages", help="Directory of saved *.html pages (default: generated corpus)")
+    parser.add_argument("--llm-port", type=int, default=8010)
+    parser.add_argument("--corpus-port", type=int, default=8011)
+    args = parser.parse_args(argv)
+
+    llm = MockInferenceServer(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                              error_rate=args.error_rate, accept_rate=args.accept_rate, port=args.llm_port)
+    corpus = CorpusServer(load_corpus(args.pages), port=args.corpus_port)
+    with llm, corpus:
+        print(f"LLM_ENDPOINT_URL={llm.url}")
+        for name in corpus.pages:
+            print(corpus.url_for(name))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
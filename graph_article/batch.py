@@ -0,0 +1,231 @@
+"""
+Batch abstract generator.
+
+Runs the article graph over many (title, category) jobs read from a CSV or
+JSONL file, with a bounded worker pool:
+
+  jobs -> [worker pool: article_graph] -> results (as they finish)
+
+Progress is recorded in a SQLite ledger (JobLedger). Jobs already completed
+in an earlier run are skipped, so a crashed or interrupted run (e.g. out of
+inference credits) picks up where it stopped. Failed jobs are retried on the
+next run.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from shared import ResearchState
+from utils.evaluation import evaluate_abstract
+from utils.logger import setup_logger
+from utils.retry import deadline
+from .graph_article import get_article_graph
+
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_FAILURES = 5
+
+
+@dataclass
+class AbstractJob:
+    index: int
+    title: str
+    category: str
+
+    @property
+    def key(self) -> str:
+        """Ledger key: rows with the same title and category are one job."""
+        payload = json.dumps([self.title, self.category])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class AbstractResult:
+    index: int
+    title: str
+    category: str
+    abstract: Optional[str] = None
+    accepted: bool = False
+    iterations: int = 0
+    evaluation: Dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def read_jobs(path) -> List[AbstractJob]:
+    """
+    Read (title, category) jobs from a .csv file with a header row or a .jsonl file.
+
+    The title column may also be called "input", matching ResearchState.
+    Rows without a title are skipped.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".jsonl", ".ndjson"):
+        with path.open(encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with path.open(encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for row in rows:
+        title = (row.get("title") or row.get("input") or "").strip()
+        if not title:
+            continue
+        jobs.append(AbstractJob(len(jobs), title, (row.get("category") or "").strip()))
+    return jobs
+
+
+class JobLedger:
+    """SQLite record of which jobs are done, so a batch can be resumed."""
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "key TEXT PRIMARY KEY, title TEXT, category TEXT, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, error TEXT, result TEXT, updated_at REAL)"
+        )
+        self._db.commit()
+
+    def done_keys(self) -> Set[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT key FROM jobs WHERE status = 'done'").fetchall()
+        return {row[0] for row in rows}
+
+    def _record(self, job: AbstractJob, status: str, error: Optional[str], result: Optional[str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (key, title, category, status, attempts, error, result, updated_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET status = excluded.status, attempts = attempts + 1, "
+                "error = excluded.error, result = excluded.result, updated_at = excluded.updated_at",
+                (job.key, job.title, job.category, status, error, result, time.time()),
+            )
+            self._db.commit()
+
+    def mark_done(self, job: AbstractJob, result: AbstractResult) -> None:
+        self._record(job, "done", None, json.dumps(result.to_dict()))
+
+    def mark_failed(self, job: AbstractJob, error: str) -> None:
+        self._record(job, "failed", error, None)
+
+    def results(self) -> Iterator[dict]:
+        """Stored results of all completed jobs, e.g. to rebuild a lost output file."""
+        with self._lock:
+            rows = self._db.execute("SELECT result FROM jobs WHERE status = 'done'").fetchall()
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _generate(job: AbstractJob, candidates: int, max_iterations: int) -> AbstractResult:
+    state = ResearchState(
+        input=job.title, category=job.category,
+        candidates=candidates, max_iterations=max_iterations,
+    )
+    with deadline():
+        final_state = get_article_graph().invoke(state)
+    abstract = final_state.get("final_abstract") or final_state.get("abstract")
+    return AbstractResult(
+        job.index, job.title, job.category,
+        abstract=abstract,
+        accepted=bool(final_state.get("final_abstract")),
+        iterations=final_state.get("iterations", 0),
+        evaluation=evaluate_abstract(abstract) if abstract else {},
+    )
+
+
+def iter_abstracts(
+    jobs: Iterable[AbstractJob],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    ledger: Optional[JobLedger] = None,
+    candidates: int = 1,
+    max_iterations: int = 5,
+    max_failures: int = DEFAULT_MAX_FAILURES,
+) -> Iterator[AbstractResult]:
+    """
+    Generate abstracts for many jobs concurrently, yielding each result as it finishes.
+
+    Args:
+        jobs: jobs to run.
+        max_workers: maximum number of article graph runs in flight.
+        ledger: if given, jobs it marks done are skipped and every outcome is recorded.
+        candidates, max_iterations: passed to ResearchState for every job.
+        max_failures: stop starting new jobs after this many consecutive
+            failures (e.g. the inference credits ran out); 0 never stops.
+
+    A failure on one job is reported on its AbstractResult and does not stop
+    the rest of the batch.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    done = ledger.done_keys() if ledger else set()
+    pending = (job for job in jobs if job.key not in done)
+    running: Dict = {}
+    consecutive_failures = 0
+
+    with ContextThreadPoolExecutor(max_workers, thread_name_prefix="abstract") as pool:
+
+        def fill():
+            # Only 2 * max_workers jobs are queued at a time, however long the input
+            while len(running) < 2 * max_workers:
+                if max_failures and consecutive_failures >= max_failures:
+                    return
+                job = next(pending, None)
+                if job is None:
+                    return
+                running[pool.submit(_generate, job, candidates, max_iterations)] = job
+
+        fill()
+        while running:
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"batch abstract failed for '{job.title}': {e}")
+                    result = AbstractResult(job.index, job.title, job.category, error=str(e))
+                if result.ok:
+                    consecutive_failures = 0
+                    if ledger:
+                        ledger.mark_done(job, result)
+                else:
+                    consecutive_failures += 1
+                    if ledger:
+                        ledger.mark_failed(job, result.error)
+                yield result
+            if max_failures and consecutive_failures >= max_failures and running:
+                logger.error(f"{consecutive_failures} jobs failed in a row; finishing in-flight jobs and stopping")
+            fill()
@@ -1,36 +1,45 @@
+import asyncio
 import os
-from utils.retry import retry
+from functools import partial
+from utils.retry import retry, async_retry
 from requests.exceptions import Timeout
-from langchain.prompts import PromptTemplate
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+from utils.llm_cache import CachedChain
+from utils.models import LLM_TIMEOUT, get_chat_model
 from utils.logger import setup_logger
+from utils.metrics import instrument, record
+from .prescreen import prescreen
 
 logger = setup_logger(__name__)
 
-HUGGINGFACEHUB_API_TOKEN = os.getenv("HUGGINGFACEHUB_API_TOKEN")
 repo_id = "mistralai/Mistral-7B-Instruct-v0.3"
 
 model_kwargs_critic = {
     "max_new_tokens": 5,
     "temperature": 0.1,
-    "timeout": 6000,
+    "timeout": LLM_TIMEOUT,
 }
 
-llm = HuggingFaceEndpoint(
-    repo_id=repo_id,
-    huggingfacehub_api_token=HUGGINGFACEHUB_API_TOKEN,
-    **model_kwargs_critic
-)
-chat_model = ChatHuggingFace(llm=llm)
-
-prompt = PromptTemplate.from_template(
+prompt = (
     "You are a strict research reviewer. Review the abstract:\n\n{abstract}\n\nRespond with 'ACCEPTED' or 'REJECTED'."
 )
-critic_chain = prompt | chat_model
+critic_chain = CachedChain(
+    "critic", prompt, partial(get_chat_model, repo_id, model_kwargs_critic, name="critic"), repo_id, model_kwargs_critic
+)
+
 
-@retry((Timeout,))
+def _prescreened(reason):
+    logger.info(f"critic prescreen rejected the abstract ({reason}) without calling the model")
+    record(prescreen_rejections=1)
+    return {"critique": "REJECTED", "final_abstract": None}
+
+
+@instrument("critic")
+@retry((Timeout,), circuit=repo_id)
 def critic_node(state):
-    logger.info(f"critic_node started reviewing abstract: '{state.abstract[:50]}...'")
+    logger.info(f"critic_node started reviewing abstract: '{(state.abstract or '')[:50]}...'")
+    reason = prescreen(state)
+    if reason:
+        return _prescreened(reason)
     try:
         result = critic_chain.invoke({"abstract": state.abstract})
         critique = result.content.strip().upper()
@@ -41,4 +50,28 @@ def critic_node(state):
         }
     except Exception as e:
         logger.error(f"critic_node error: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+@instrument("critic")
+@async_retry((Timeout, asyncio.TimeoutError), circuit=repo_id)
+async def acritic_node(state):
+    logger.info(f"acritic_node started reviewing abstract: '{(state.abstract or '')[:50]}...'")
+    # The embedding check runs a model: keep it off the event loop
+    if os.getenv("CRITIC_EMBEDDING_MODEL"):
+        reason = await asyncio.to_thread(prescreen, state)
+    else:
+        reason = prescreen(state)
+    if reason:
+        return _prescreened(reason)
+    try:
+        result = await critic_chain.ainvoke({"abstract": state.abstract})
+        critique = result.content.strip().upper()
+        logger.info(f"acritic_node critique result: {critique}")
+        return {
+            "critique": critique,
+            "final_abstract": state.abstract if critique == "ACCEPTED" else None
+        }
+    except Exception as e:
+        logger.error(f"acritic_node error: {e}")
+        raise
@@ -3,26 +3,121 @@ Article Graph
 
 Workflow:
   writer -> critic -> [ACCEPTED -> END, REJECTED -> writer]
+
+With state.candidates > 1 the graph runs in speculative mode instead:
+  speculate (N writers + critics in parallel, first ACCEPTED wins)
+    -> [ACCEPTED -> END, REJECTED -> speculate]
+
+Either way the loop ends once state.max_iterations abstracts have been
+written without one being accepted.
+
+Each node has a sync and an async implementation, so the compiled graph
+works with both invoke/stream and ainvoke/astream.
+
+The graph is compiled on first use: get_article_graph(), or the module
+attribute `article_graph`.
+
+generate_abstract() runs the graph for one request; identical requests made
+while it runs (same title and category, ignoring case and spacing, and the
+same API token) share that run instead of starting their own.
 """
 
-from langgraph.graph import StateGraph, END
-from shared import ResearchState
-from .writer import writer_node
-from .critic import critic_node
+from functools import lru_cache
 
-builder = StateGraph(ResearchState)
+from langchain_core.runnables import RunnableLambda
+from shared import ResearchState
+from utils.checkpoint import get_checkpointer
+from utils.logger import setup_logger
+from utils.models import token_digest
+from utils.singleflight import SingleFlight
+from .writer import writer_node, awriter_node, settle_abstract
+from .critic import critic_node, acritic_node
+from .speculative import speculate_node, aspeculate_node
 
-builder.add_node("writer", writer_node)
-builder.add_node("critic", critic_node)
+logger = setup_logger(__name__)
 
 def should_accept(state):
     return state.critique == "ACCEPTED"
 
-builder.set_entry_point("writer")
-builder.add_edge("writer", "critic")
-builder.add_conditional_edges("critic", should_accept, {
-    True: END,
-    False: "writer"
-})
+def should_stop(state):
+    if should_accept(state):
+        return True
+    if state.iterations >= state.max_iterations:
+        logger.warning(f"article graph stopping: no abstract accepted after {state.iterations} attempts")
+        return True
+    return False
+
+def review_node(state):
+    """The critic node; the verdict also settles the draft in the writer cache."""
+    result = critic_node(state)
+    settle_abstract(state, result["critique"])
+    return result
+
+async def areview_node(state):
+    result = await acritic_node(state)
+    settle_abstract(state, result["critique"])
+    return result
+
+def choose_mode(state):
+    return "speculate" if state.candidates > 1 else "writer"
+
+def get_article_graph(durable: bool = False):
+    """
+    Return the compiled article graph.
+
+    With durable=True and CHECKPOINT_DB set, the graph checkpoints after every
+    node so a failed run can be resumed by thread id (see utils.checkpoint).
+    """
+    return _compile(get_checkpointer() if durable else None)
+
+
+@lru_cache(maxsize=None)
+def _compile(checkpointer=None):
+    # langgraph is only imported once a graph is actually needed
+    from langgraph.graph import StateGraph, START, END
+
+    builder = StateGraph(ResearchState)
+
+    builder.add_node("writer", RunnableLambda(writer_node, afunc=awriter_node, name="writer"))
+    builder.add_node("critic", RunnableLambda(review_node, afunc=areview_node, name="critic"))
+    builder.add_node("speculate", RunnableLambda(speculate_node, afunc=aspeculate_node, name="speculate"))
+
+    builder.add_conditional_edges(START, choose_mode, ["writer", "speculate"])
+    builder.add_edge("writer", "critic")
+    builder.add_conditional_edges("critic", should_stop, {
+        True: END,
+        False: "writer"
+    })
+    builder.add_conditional_edges("speculate", should_stop, {
+        True: END,
+        False: "speculate"
+    })
+    return builder.compile(checkpointer=checkpointer)
+
+def __getattr__(name):
+    if name == "article_graph":
+        return get_article_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+article_flight = SingleFlight("article")
+
+
+def article_request_key(state: ResearchState) -> tuple:
+    """
+    Requests with equal keys get the same abstract; title and category ignore
+    case and spacing. The API token is part of the key, so one caller's
+    failures (a revoked key, exhausted credits) never reach another.
+    """
+    def normalize(text):
+        return " ".join((text or "").split()).casefold()
+    return normalize(state.input), normalize(state.category), state.candidates, state.max_iterations, token_digest()
+
+
+def generate_abstract(state: ResearchState, config=None) -> dict:
+    """Run the article graph for `state`, sharing the run with identical concurrent requests."""
+    return article_flight.do(article_request_key(state), get_article_graph().invoke, state, config)
+
 
-article_graph = builder.compile()
\ No newline at end of file
+async def agenerate_abstract(state: ResearchState, config=None) -> dict:
+    return await article_flight.ado(article_request_key(state), get_article_graph().ainvoke, state, config)
@@ -0,0 +1,113 @@
+"""
+Cheap local checks run before the LLM critic.
+
+Each review by the remote critic costs a full round trip, yet many rejected
+abstracts are visibly bad. prescreen() rejects those in microseconds, and
+only plausible candidates reach critic_chain:
+
+  empty       nothing but whitespace or punctuation
+  echo        the writer repeated its instructions or just the title
+  truncated   about as long as the writer's max_new_tokens and not ending
+              a sentence, i.e. cut off mid-sentence
+  off-topic   (30 words or more) none of the title or category words occur
+              in it, not even as a prefix ("networks" for "network")
+
+Short abstracts are never judged off-topic: a handful of words is too little
+evidence, so they are left to the critic.
+
+With CRITIC_EMBEDDING_MODEL set to a sentence-transformers model (e.g.
+"sentence-transformers/all-MiniLM-L6-v2"), on-topic abstracts also need a
+cosine similarity of at least CRITIC_MIN_SIMILARITY (default 0.15) to
+"<title> (<category>)". The model is loaded on first use.
+
+CRITIC_PRESCREEN=0 sends every abstract to the critic.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+from utils.evaluation import evaluate_abstract
+from utils.logger import setup_logger
+from utils.tokens import count_tokens
+from .writer import model_kwargs_writer, prompt as writer_prompt
+
+logger = setup_logger(__name__)
+
+MIN_TOPIC_WORDS = 30
+# An abstract this close to the writer's token limit was probably cut off
+TRUNCATION_RATIO = 0.9
+# Shorter title words ("a", "of", "the", "and", ...) say nothing about the topic
+MIN_TERM_LENGTH = 4
+# Title words are matched on their first letters, so inflections still count
+STEM_LENGTH = 6
+
+_SENTENCE_END = re.compile(r"""[.!?]["')\]]*$""")
+_SPACE = re.compile(r"\s+")
+_TERM = re.compile(r"[^\W\d_]+")
+
+
+def _normalize(text: str) -> str:
+    return _SPACE.sub(" ", text).strip().casefold()
+
+
+# The writer's fixed instruction, up to its first placeholder
+_INSTRUCTION = _normalize(writer_prompt.split("{", 1)[0])
+
+
+def topic_terms(*texts: Optional[str]) -> List[str]:
+    """Prefix keyword terms ("network*") for the content words of the title and category."""
+    terms = []
+    for text in texts:
+        for word in _TERM.findall((text or "").casefold()):
+            if len(word) >= MIN_TERM_LENGTH:
+                terms.append(word[:STEM_LENGTH] + "*")
+    return list(dict.fromkeys(terms))
+
+
+@lru_cache(maxsize=2)
+def _embedder(model_name: str):
+    # Deferred: sentence-transformers imports torch
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Loading prescreen embedding model {model_name}")
+    return SentenceTransformer(model_name)
+
+
+def topic_similarity(abstract: str, topic: str, model_name: str) -> float:
+    """Cosine similarity of the abstract and topic embeddings."""
+    query, document = _embedder(model_name).encode([topic, abstract], normalize_embeddings=True)
+    return float(query @ document)
+
+
+def prescreen(state) -> Optional[str]:
+    """The reason to reject state.abstract without asking the critic, or None to ask it."""
+    if os.getenv("CRITIC_PRESCREEN", "1").lower() not in ("1", "true", "yes", "on"):
+        return None
+    abstract = (getattr(state, "abstract", None) or "").strip()
+    title = getattr(state, "input", None)
+    category = getattr(state, "category", None)
+
+    if not _TERM.search(abstract):
+        return "empty"
+    normalized = _normalize(abstract)
+    if _INSTRUCTION in normalized or (title and normalized.strip("'\". ") == _normalize(title)):
+        return "echo"
+    max_tokens = model_kwargs_writer.get("max_new_tokens")
+    if max_tokens and count_tokens(abstract) >= TRUNCATION_RATIO * max_tokens and not _SENTENCE_END.search(abstract):
+        return "truncated"
+
+    terms = topic_terms(title, category)
+    if not terms or len(abstract.split()) < MIN_TOPIC_WORDS:
+        return None
+    if evaluate_abstract(abstract, terms)["keyword_match_score"] == 0:
+        return "off-topic"
+    model_name = os.getenv("CRITIC_EMBEDDING_MODEL")
+    if model_name:
+        topic = f"{title} ({category})" if title and category else title or category
+        similarity = topic_similarity(abstract, topic, model_name)
+        if similarity < float(os.getenv("CRITIC_MIN_SIMILARITY", 0.15)):
+            logger.info(f"prescreen: similarity to the topic only {similarity:.2f}")
+            return "off-topic"
+    return None
@@ -0,0 +1,128 @@
+"""
+Speculative abstract generation.
+
+Instead of writer -> critic -> writer ..., one round writes `state.candidates`
+abstracts concurrently and reviews each as soon as it is written. The first
+ACCEPTED candidate is returned and the remaining work is cancelled, so a
+rejection no longer costs a full extra writer + critic round trip.
+
+Each candidate counts towards state.max_iterations, and is written as that
+attempt: only the first attempt of a run may come from the writer cache, so
+the candidates of a round are never copies of one cached draft. Rejected
+drafts are evicted from the cache and accepted ones stored.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Optional
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from utils.logger import setup_logger
+from utils.metrics import instrument
+from .critic import acritic_node, critic_node
+from .writer import awriter_node, settle_abstract, writer_node
+
+logger = setup_logger(__name__)
+
+
+def _round_size(state) -> int:
+    return max(1, min(state.candidates, state.max_iterations - state.iterations))
+
+
+def _attempt(state, i):
+    """State for the i-th candidate of a round."""
+    return state.model_copy(update={"iterations": state.iterations + i})
+
+
+def _write_and_review(state, dropped: threading.Event) -> Optional[dict]:
+    """Write and review one candidate; None once `dropped` is set (another was accepted)."""
+    if dropped.is_set():
+        return None
+    abstract = writer_node(state)["abstract"]
+    if dropped.is_set():
+        return None
+    draft = state.model_copy(update={"abstract": abstract})
+    review = critic_node(draft)
+    settle_abstract(draft, review["critique"])
+    return {"abstract": abstract, **review}
+
+
+async def _awrite_and_review(state) -> dict:
+    abstract = (await awriter_node(state))["abstract"]
+    draft = state.model_copy(update={"abstract": abstract})
+    review = await acritic_node(draft)
+    settle_abstract(draft, review["critique"])
+    return {"abstract": abstract, **review}
+
+
+def _outcome(accepted, last, errors, n) -> dict:
+    if accepted is not None:
+        return {**accepted, "iterations": n}
+    if last is None:
+        raise errors[0]
+    logger.info(f"speculate_node: all {n} candidates rejected")
+    return {**last, "final_abstract": None, "iterations": n}
+
+
+@instrument("speculate")
+def speculate_node(state):
+    n = _round_size(state)
+    logger.info(f"speculate_node writing {n} candidate abstracts in parallel")
+    pool = ContextThreadPoolExecutor(max_workers=n)
+    dropped = threading.Event()
+    pending = {pool.submit(_write_and_review, _attempt(state, i), dropped) for i in range(n)}
+    accepted = last = None
+    errors = []
+    try:
+        while pending and accepted is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"speculate_node candidate failed: {e}")
+                    errors.append(e)
+                    continue
+                last = result
+                if result["critique"] == "ACCEPTED":
+                    accepted = result
+                    break
+    finally:
+        # Don't wait for the losing candidates; their results are discarded.
+        # Running ones stop before their next writer or critic call.
+        dropped.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    if accepted is not None and pending:
+        logger.info(f"speculate_node accepted a candidate, dropping {len(pending)} in flight")
+    return _outcome(accepted, last, errors, n)
+
+
+@instrument("speculate")
+async def aspeculate_node(state):
+    n = _round_size(state)
+    logger.info(f"aspeculate_node writing {n} candidate abstracts in parallel")
+    pending = {asyncio.ensure_future(_awrite_and_review(_attempt(state, i))) for i in range(n)}
+    accepted = last = None
+    errors = []
+    try:
+        while pending and accepted is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    result = task.result()
+                except Exception as e:
+                    logger.error(f"aspeculate_node candidate failed: {e}")
+                    errors.append(e)
+                    continue
+                last = result
+                if result["critique"] == "ACCEPTED":
+                    accepted = result
+                    break
+    finally:
+        for task in pending:
+            task.cancel()
+    if accepted is not None and pending:
+        logger.info(f"aspeculate_node accepted a candidate, cancelled {len(pending)} in flight")
+    return _outcome(accepted, last, errors, n)
@@ -1,43 +1,69 @@
-import os
-from utils.retry import retry
+import asyncio
+from functools import partial
+from utils.retry import retry, async_retry
 from requests.exceptions import Timeout
-from langchain.prompts import PromptTemplate
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
 
+from utils.llm_cache import CachedChain
+from utils.models import LLM_TIMEOUT, get_chat_model
 from utils.logger import setup_logger
+from utils.metrics import instrument
 
 logger = setup_logger(__name__)
 
-HUGGINGFACEHUB_API_TOKEN = os.getenv("HUGGINGFACEHUB_API_TOKEN")
 repo_id = "meta-llama/Llama-3.2-3B-Instruct"
 
 model_kwargs_writer = {
     "max_new_tokens": 200,
     "max_length": 100,
     "temperature": 0.8,
-    "timeout": 6000,
+    "timeout": LLM_TIMEOUT,
 }
 
-llm = HuggingFaceEndpoint(
-    repo_id=repo_id,
-    huggingfacehub_api_token=HUGGINGFACEHUB_API_TOKEN,
-    **model_kwargs_writer
+prompt = (
+    "Generate an abstract for the paper titled '{input}' in the domain of {category}."
 )
-chat_model = ChatHuggingFace(llm=llm)
 
-prompt = PromptTemplate.from_template(
-    "Generate an abstract for the paper titled '{input}' in the domain of {category}."
+# High-temperature output: only cached when the caller opts in (LLM_CACHE_WRITER / cache_writer).
+# Even then only a run's first draft is looked up: a rewrite follows a rejection,
+# and the same prompt must not return the rejected draft again. settle_abstract()
+# keeps accepted drafts in the cache and drops rejected ones.
+writer_chain = CachedChain(
+    "writer", prompt, partial(get_chat_model, repo_id, model_kwargs_writer, name="writer"), repo_id, model_kwargs_writer, cache_by_default=False
 )
 
-writer_chain = prompt | chat_model
 
-@retry((Timeout,))
+def _inputs(state):
+    return {"input": state.input, "category": state.category}
+
+
+def settle_abstract(state, critique):
+    """Cache state.abstract if the critic accepted it, else drop it so no later run reuses it."""
+    if critique == "ACCEPTED":
+        writer_chain.store(_inputs(state), state.abstract)
+    else:
+        writer_chain.evict(_inputs(state))
+
+@instrument("writer")
+@retry((Timeout,), circuit=repo_id)
 def writer_node(state):
     logger.info(f"writer_node started with input: '{state.input}' and category: '{state.category}'")
     try:
-        result = writer_chain.invoke({"input": state.input, "category": state.category})
+        result = writer_chain.invoke(_inputs(state), use_cache=state.iterations == 0)
         logger.info("writer_node successfully generated abstract")
-        return {"abstract": result.content}
+        return {"abstract": result.content, "iterations": 1}
     except Exception as e:
         logger.error(f"writer_node error: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+@instrument("writer")
+@async_retry((Timeout, asyncio.TimeoutError), circuit=repo_id)
+async def awriter_node(state):
+    logger.info(f"awriter_node started with input: '{state.input}' and category: '{state.category}'")
+    try:
+        result = await writer_chain.ainvoke(_inputs(state), use_cache=state.iterations == 0)
+        logger.info("awriter_node successfully generated abstract")
+        return {"abstract": result.content, "iterations": 1}
+    except Exception as e:
+        logger.error(f"awriter_node error: {e}")
+        raise
@@ -0,0 +1,167 @@
+"""
+Batch web summariser.
+
+Runs the web graph's load and summarize stages over many URLs at once:
+
+  urls -> [fetch pool: load_node, compress_node] -> [summarize pool: summarize_node] -> results
+
+Each stage has its own bounded worker pool, so pages keep downloading while
+earlier ones are being summarised. Results are yielded either in input order
+or as soon as each URL finishes. Near-duplicates of pages already summarised
+reuse the stored summary (see dedup.py).
+"""
+
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from shared import ResearchState
+from utils.logger import setup_logger
+from utils.retry import deadline
+from .loader_deployment import load_node
+from .summarizer import summarize_node
+from .compress import compress_node
+from .dedup import dedup_node, index_node
+
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_FETCH = 8
+DEFAULT_MAX_SUMMARIZE = 2
+
+
+@dataclass
+class BatchResult:
+    index: int
+    url: str
+    summary: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def read_urls(path) -> List[str]:
+    """
+    Read URLs from a text file, one per line.
+
+    Blank lines and lines starting with '#' are ignored.
+    """
+    urls = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return urls
+
+
+def _fetch(url: str) -> ResearchState:
+    state = ResearchState(url=url)
+    with deadline():
+        state = state.model_copy(update=load_node(state))
+    return state.model_copy(update=compress_node(state))
+
+
+def _summarize(state: ResearchState) -> str:
+    reused = dedup_node(state)
+    if reused:
+        return reused["summary"]
+    with deadline():
+        summary = summarize_node(state)["summary"]
+    index_node(state.model_copy(update={"summary": summary}))
+    return summary
+
+
+def iter_summaries(
+    urls: Iterable[str],
+    max_fetch: int = DEFAULT_MAX_FETCH,
+    max_summarize: int = DEFAULT_MAX_SUMMARIZE,
+) -> Iterator[BatchResult]:
+    """
+    Summarise many URLs concurrently, yielding each result as it finishes.
+
+    Args:
+        urls: URLs to summarise.
+        max_fetch: maximum number of pages being fetched at once.
+        max_summarize: maximum number of summarize calls in flight.
+
+    A failure on one URL is reported on its BatchResult and does not stop
+    the rest of the batch.
+    """
+    if max_fetch < 1 or max_summarize < 1:
+        raise ValueError("max_fetch and max_summarize must be at least 1")
+
+    pending = iter(enumerate(urls))
+    fetching: Dict = {}
+    summarizing: Dict = {}
+    # Don't let fetched pages pile up faster than the summarizer can drain them
+    max_buffered = 2 * max_summarize
+
+    # Context-propagating pools, so use_api_token() and run traces reach the workers
+    with ContextThreadPoolExecutor(max_fetch, thread_name_prefix="fetch") as fetch_pool, \
+            ContextThreadPoolExecutor(max_summarize, thread_name_prefix="summarize") as summarize_pool:
+
+        def fill():
+            while len(fetching) < max_fetch and len(summarizing) < max_buffered:
+                try:
+                    index, url = next(pending)
+                except StopIteration:
+                    return
+                fetching[fetch_pool.submit(_fetch, url)] = (index, url)
+
+        fill()
+        while fetching or summarizing:
+            done, _ = wait(list(fetching) + list(summarizing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    index, url = fetching.pop(future)
+                    try:
+                        state = future.result()
+                    except Exception as e:
+                        logger.warning(f"batch fetch failed for {url}: {e}")
+                        failed = BatchResult(index, url, error=str(e))
+                        yield failed
+                        continue
+                    summarizing[summarize_pool.submit(_summarize, state)] = (index, url)
+                else:
+                    index, url = summarizing.pop(future)
+                    try:
+                        result = BatchResult(index, url, summary=future.result())
+                    except Exception as e:
+                        logger.warning(f"batch summarize failed for {url}: {e}")
+                        result = BatchResult(index, url, error=str(e))
+                    yield result
+            fill()
+
+
+def summarize_batch(
+    urls: Iterable[str],
+    max_fetch: int = DEFAULT_MAX_FETCH,
+    max_summarize: int = DEFAULT_MAX_SUMMARIZE,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+    """
+    Summarise many URLs concurrently.
+
+    With ordered=True results are yielded in input order, each one as soon as
+    it and every URL before it have finished. With ordered=False they are
+    yielded in completion order.
+    """
+    results = iter_summaries(urls, max_fetch=max_fetch, max_summarize=max_summarize)
+    if not ordered:
+        yield from results
+        return
+
+    buffered: Dict[int, BatchResult] = {}
+    next_index = 0
+    for result in results:
+        buffered[result.index] = result
+        while next_index in buffered:
+            yield buffered.pop(next_index)
+            next_index += 1
@@ -0,0 +1,270 @@
+"""
+Pool of headless browsers for pages that need JavaScript.
+
+The loader fetches pages statically first; only when the result is thin or a
+JavaScript shell (see loader_deployment.needs_browser) does it render the
+page here. Starting Chrome costs seconds and hundreds of MB, so browsers are
+kept warm and reused:
+
+  * at most BROWSER_POOL_SIZE browsers run at once; further renders wait
+    for a free one (up to BROWSER_ACQUIRE_TIMEOUT seconds)
+  * a browser is recycled (quit and replaced on next use) after
+    BROWSER_MAX_PAGES pages, or once its process tree uses more than
+    BROWSER_MAX_RSS_MB of memory, so leaks in long-lived tabs stay bounded
+  * each render is bounded by BROWSER_PAGE_TIMEOUT seconds, and the rendered
+    HTML by BROWSER_MAX_HTML_CHARS characters
+  * warm(n) starts browsers ahead of the first render (server.py does so
+    with BROWSER_PREWARM)
+
+BROWSER_POOL_SIZE=0 disables the fallback. selenium is imported when the
+first browser starts; without it the loader keeps its static result.
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from utils.logger import setup_logger
+from utils.metrics import record
+
+logger = setup_logger(__name__)
+
+DEFAULT_SIZE = 2
+DEFAULT_MAX_PAGES = 50
+DEFAULT_MAX_RSS_MB = 1024
+DEFAULT_PAGE_TIMEOUT = 30.0
+DEFAULT_MAX_HTML_CHARS = 5 * 1024 * 1024
+
+
+class BrowserUnavailable(RuntimeError):
+    """No browser could be started, or none became free in time."""
+
+
+def chrome_driver(page_timeout: float = DEFAULT_PAGE_TIMEOUT):
+    """A headless Chrome tuned for text extraction: no images, no GPU, eager page loads."""
+    # Deferred: selenium is only needed once a page has to be rendered
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    for arg in ("--headless=new", "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu",
+                "--disable-extensions", "--blink-settings=imagesEnabled=false", "--mute-audio"):
+        options.add_argument(arg)
+    options.page_load_strategy = "eager"
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(page_timeout)
+    return driver
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        tasks = Path(f"/proc/{pid}/task").iterdir()
+        return [int(c) for t in tasks for c in (t / "children").read_text().split()]
+    except OSError:
+        return []
+
+
+def process_tree_rss(pid: Optional[int]) -> Optional[int]:
+    """Resident memory in bytes of a process and its descendants; None where /proc is unavailable."""
+    if not pid or not Path("/proc").is_dir():
+        return None
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            for line in Path(f"/proc/{current}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+                    break
+        except OSError:
+            continue
+        stack.extend(_children(current))
+    return total
+
+
+def _driver_pid(driver) -> Optional[int]:
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+
+class _Browser:
+    __slots__ = ("driver", "pages")
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class BrowserPool:
+    """
+    Bounded pool of reusable headless browsers.
+
+    Args:
+        size (int): most browsers alive at once.
+        max_pages (int): pages a browser renders before it is recycled.
+        max_rss_mb (float): memory of a browser's process tree that gets it
+            recycled; 0 disables the check.
+        page_timeout (float): seconds allowed per render.
+        max_html_chars (int): longest rendered HTML returned.
+        acquire_timeout (float): seconds to wait for a free browser.
+        driver_factory: zero-argument callable starting a browser, headless
+            Chrome by default.
+    """
+
+    def __init__(self, size: int = DEFAULT_SIZE, max_pages: int = DEFAULT_MAX_PAGES,
+                 max_rss_mb: float = DEFAULT_MAX_RSS_MB, page_timeout: float = DEFAULT_PAGE_TIMEOUT,
+                 max_html_chars: int = DEFAULT_MAX_HTML_CHARS, acquire_timeout: Optional[float] = None,
+                 driver_factory: Optional[Callable] = None):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.page_timeout = page_timeout
+        self.max_html_chars = max_html_chars
+        self.acquire_timeout = page_timeout if acquire_timeout is None else acquire_timeout
+        self._factory = driver_factory or (lambda: chrome_driver(page_timeout))
+        self._idle: List[_Browser] = []
+        self._alive = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def alive(self) -> int:
+        return self._alive
+
+    def _start(self) -> _Browser:
+        started = time.perf_counter()
+        try:
+            browser = _Browser(self._factory())
+        except BaseException:
+            with self._cond:
+                self._alive -= 1
+                self._cond.notify()
+            raise
+        logger.info(f"browser pool: started a browser in {time.perf_counter() - started:.1f}s")
+        record(browser_starts=1)
+        return browser
+
+    def _quit(self, browser: _Browser) -> None:
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.warning(f"browser pool: quitting a browser failed: {e!r}")
+
+    def _take(self) -> _Browser:
+        """An idle browser, or a new one while under the size limit; waits otherwise."""
+        end = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise BrowserUnavailable("browser pool is shut down")
+                if self._idle:
+                    return self._idle.pop()
+                if self._alive < self.size:
+                    self._alive += 1
+                    break
+                left = end - time.monotonic()
+                if left <= 0:
+                    raise BrowserUnavailable(f"no browser free within {self.acquire_timeout:.0f}s")
+                self._cond.wait(left)
+        return self._start()
+
+    def _worn_out(self, browser: _Browser) -> Optional[str]:
+        if browser.pages >= self.max_pages:
+            return f"{browser.pages} pages"
+        if self.max_rss:
+            rss = process_tree_rss(_driver_pid(browser.driver))
+            if rss is not None and rss > self.max_rss:
+                return f"{rss / 2 ** 20:.0f} MB resident"
+        return None
+
+    def _give_back(self, browser: _Browser, broken: bool = False) -> None:
+        reason = "it failed" if broken else self._worn_out(browser)
+        with self._cond:
+            keep = reason is None and not self._closed
+            if keep:
+                self._idle.append(browser)
+            else:
+                self._alive -= 1
+            self._cond.notify()
+        if not keep:
+            if reason:
+                logger.info(f"browser pool: recycling a browser after {reason}")
+                record(browser_recycles=1)
+            self._quit(browser)
+
+    @contextmanager
+    def browser(self):
+        """Borrow a driver for the duration of the block."""
+        browser = self._take()
+        broken = True
+        try:
+            yield browser.driver
+            broken = False
+        finally:
+            browser.pages += 1
+            self._give_back(browser, broken)
+
+    def render(self, url: str) -> str:
+        """The page's HTML after its scripts have run."""
+        with self.browser() as driver:
+            driver.get(url)
+            end = time.monotonic() + self.page_timeout
+            while driver.execute_script("return document.readyState") != "complete" and time.monotonic() < end:
+                time.sleep(0.1)
+            html = driver.page_source or ""
+        record(browser_renders=1)
+        return html[:self.max_html_chars]
+
+    def warm(self, n: int = 1) -> None:
+        """Start up to n browsers now (in this thread), so the first renders don't wait for one."""
+        started = []
+        try:
+            for _ in range(min(n, self.size)):
+                with self._cond:
+                    if self._alive >= self.size:
+                        break
+                    self._alive += 1
+                started.append(self._start())
+        finally:
+            for browser in started:
+                self._give_back(browser)
+
+    def shutdown(self) -> None:
+        """Quit every idle browser; busy ones are quit when handed back."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._alive -= len(idle)
+            self._cond.notify_all()
+        for browser in idle:
+            self._quit(browser)
+
+
+_default_pool: Optional[BrowserPool] = None
+_default_lock = threading.Lock()
+
+
+def get_browser_pool() -> Optional[BrowserPool]:
+    """
+    The process-wide pool, configured from the environment (see the module
+    docstring), or None when BROWSER_POOL_SIZE is 0.
+    """
+    global _default_pool
+    size = int(os.getenv("BROWSER_POOL_SIZE", DEFAULT_SIZE))
+    if size <= 0:
+        return None
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = BrowserPool(
+                size=size,
+                max_pages=int(os.getenv("BROWSER_MAX_PAGES", DEFAULT_MAX_PAGES)),
+                max_rss_mb=float(os.getenv("BROWSER_MAX_RSS_MB", DEFAULT_MAX_RSS_MB)),
+                page_timeout=float(os.getenv("BROWSER_PAGE_TIMEOUT", DEFAULT_PAGE_TIMEOUT)),
+                max_html_chars=int(os.getenv("BROWSER_MAX_HTML_CHARS", DEFAULT_MAX_HTML_CHARS)),
+                acquire_timeout=float(os.getenv("BROWSER_ACQUIRE_TIMEOUT", DEFAULT_PAGE_TIMEOUT)),
+            )
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
@@ -0,0 +1,56 @@
+"""
+Split page content into token-budgeted chunks for map-reduce summarisation.
+
+Chunks follow paragraph boundaries (the loader joins paragraphs with a blank
+line). A paragraph that is larger than the budget on its own is split on
+sentence boundaries, and as a last resort cut at the character limit.
+"""
+
+import re
+from typing import Iterable, Iterator, List
+
+from utils.tokens import CHARS_PER_TOKEN, count_tokens
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _split_oversized(paragraph: str, max_tokens: int) -> Iterator[str]:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    for sentence in _SENTENCE_END.split(paragraph):
+        for start in range(0, len(sentence), max_chars):
+            yield sentence[start:start + max_chars]
+
+
+def _pieces(text: str, max_tokens: int) -> Iterator[str]:
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= max_tokens:
+            yield paragraph
+        else:
+            yield from _split_oversized(paragraph, max_tokens)
+
+
+def pack(pieces: Iterable[str], max_tokens: int, separator: str = "\n\n") -> Iterator[str]:
+    """Greedily join consecutive pieces into chunks of at most max_tokens."""
+    current: List[str] = []
+    size = 0
+    sep_tokens = count_tokens(separator)
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if current and size + sep_tokens + tokens > max_tokens:
+            yield separator.join(current)
+            current, size = [], 0
+        current.append(piece)
+        size += tokens + (sep_tokens if size else 0)
+    if current:
+        yield separator.join(current)
+
+
+def split_into_chunks(text: str, max_tokens: int) -> Iterator[str]:
+    """
+    Lazily split text into chunks of at most max_tokens (estimated),
+    keeping paragraphs together where possible.
+    """
+    return pack(_pieces(text, max_tokens), max_tokens)
@@ -0,0 +1,294 @@
+"""
+Prompt compression for the web graph.
+
+Extracted pages carry a lot that the summary never needs: breadcrumbs and
+menus, repeated boilerplate, figure captions, reference lists and
+acknowledgements. The compress node strips them from state.content before
+it is summarized, because every prompt token costs latency and credits:
+
+  1. back matter     References, Bibliography, Acknowledgements, Funding, ...
+                     sections are dropped up to the next heading (or, in
+                     unstructured text, the next plain prose sentence)
+  2. noise           breadcrumbs, menus, captions ("Figure 3."), citation
+                     entries and sentences made mostly of digits
+  3. duplicates      repeated sentences and lines are kept once
+  4. low information sentences with fewer than 3 content words
+  5. budget          only when COMPRESS_MAX_TOKENS is set (it is 0, off, by
+                     default): over it, sentences are ranked by the
+                     frequency of their content words in the page (Luhn
+                     scoring) and the best are kept, in page order
+
+Steps 1-4 only drop text the summary never needs, so they are always on;
+long pages still reach the summarizer whole and go through map-reduce.
+Step 5 is lossy and opt-in, for deployments that would rather bound prompt
+cost than read every section.
+
+Paragraphs (blank-line separated, as the loader writes them) stay
+paragraphs, so map-reduce chunking still follows them.
+
+Tokens are counted with the summarizer model's tokenizer (COMPRESS_TOKENIZER:
+a Hub repo id or a tokenizer.json path, the summarizer's repo_id by default).
+When it cannot be loaded, or COMPRESS_TOKENIZER is empty, the character
+estimate from utils.tokens is used instead.
+
+The ratio of tokens kept is logged, exported as the research_compression_ratio
+histogram and counted in research_compressed_tokens_saved_total.
+"""
+
+import asyncio
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from shared import ResearchState
+from utils.logger import setup_logger
+from utils.metrics import REGISTRY, instrument, record
+from utils.models import current_api_token, token_digest
+from utils.tokens import count_tokens
+from .summarizer import repo_id as summarizer_repo_id
+
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_TOKENS = 0
+MIN_CONTENT_WORDS = 3
+# Sentences with this many digits per letter are tables, coordinates or citations
+MAX_DIGIT_RATIO = 0.3
+# Placeholders the loader returns instead of page text
+PLACEHOLDERS = {"No content", "No URL to load"}
+
+COMPRESSION_RATIO = REGISTRY.histogram(
+    "research_compression_ratio", "Tokens kept by prompt compression, as a fraction of the page",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=\S)")
+_WORD = re.compile(r"[^\W\d_]{3,}")
+_SPACE = re.compile(r"\s+")
+_BACK_MATTER = re.compile(
+    r"^(?:\d+\.?\s*)?(references?|bibliography|works cited|literature cited|notes|"
+    r"acknowledge?ments?|funding|conflicts? of interest|author contributions|"
+    r"data availability(?: statement)?)\b\s*:?",
+    re.IGNORECASE,
+)
+_CAPTION = re.compile(r"^(?:fig(?:ure)?|table|scheme|chart)\.?\s*[A-Z]?\d+[a-z]?\s*[.:|]", re.IGNORECASE)
+# DOIs, numbered entries and "Journal 2020, 5, 123" / "2020;5(3):12" references
+_CITATION = re.compile(r"\bdoi(?::|\.org/)|^\s*\[\d+\]|\b(?:19|20)\d\d[a-z]?\s*[;,]\s*\d+\s*[,(:]\s*\d", re.IGNORECASE)
+_SEPARATOR = re.compile(r"\s[>›»|]\s")
+# Menus in the visible-text fallback read as runs of capitalised words
+MENU_WORDS = 6
+MENU_CAPITALISED = 0.7
+
+STOPWORDS = frozenset("""
+    about above after again against all also and any are because been before being below between both but
+    can could did does doing down during each few for from further had has have having her here hers herself
+    him himself his how into its itself just more most much must myself nor not now off once only other our
+    ours ourselves out over own same she should some such than that the their theirs them themselves then
+    there these they this those through too under until upon very was were what when where which while who
+    whom why will with within without would you your yours yourself yourselves may might shall one two
+    use used using via per however thus therefore here click read share download view cite see
+""".split())
+
+
+class Compressed(NamedTuple):
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def ratio(self) -> float:
+        """Fraction of the tokens kept."""
+        return self.tokens_after / self.tokens_before if self.tokens_before else 1.0
+
+
+class _Sentence(NamedTuple):
+    block: int
+    text: str
+    words: List[str]
+
+
+# -- Token counting -----------------------------------------------------------------
+TOKENIZER_CACHE_SIZE = 4
+
+# Loaded tokenizers by (name, token digest); failed loads are not kept, so a
+# later call (or another caller's key) can still load the tokenizer
+_tokenizers: "OrderedDict[Tuple[str, str], object]" = OrderedDict()
+_tokenizers_lock = threading.Lock()
+
+
+def _load_tokenizer(name: str):
+    """The tokenizer called `name`, or None (logged) when it cannot be loaded."""
+    local = os.path.isfile(name)
+    token = None if local else current_api_token()
+    key = name, token_digest(token or "")
+    with _tokenizers_lock:
+        tokenizer = _tokenizers.get(key)
+        if tokenizer is not None:
+            _tokenizers.move_to_end(key)
+            return tokenizer
+    try:
+        # Deferred: only needed once a page is compressed
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_file(name) if local else Tokenizer.from_pretrained(name, token=token)
+    except Exception as e:
+        logger.warning(f"compress: tokenizer {name} unavailable ({e!r}), estimating tokens from characters")
+        return None
+    with _tokenizers_lock:
+        _tokenizers[key] = tokenizer
+        while len(_tokenizers) > TOKENIZER_CACHE_SIZE:
+            _tokenizers.popitem(last=False)
+    return tokenizer
+
+
+def token_counter() -> Callable[[Sequence[str]], List[int]]:
+    """A function returning the token count of each text, from COMPRESS_TOKENIZER or the estimate."""
+    name = os.getenv("COMPRESS_TOKENIZER", summarizer_repo_id)
+    tokenizer = _load_tokenizer(name) if name else None
+    if tokenizer is None:
+        return lambda texts: [count_tokens(t) for t in texts]
+    return lambda texts: [len(e.ids) for e in tokenizer.encode_batch(list(texts), add_special_tokens=False)]
+
+
+# -- Segmentation -------------------------------------------------------------------
+def _is_heading(block: str) -> bool:
+    return len(block.split()) <= 8 and not block.rstrip().endswith((".", "!", "?", ","))
+
+
+def _is_noise(sentence: str, words: List[str]) -> bool:
+    if _CAPTION.match(sentence) or _CITATION.search(sentence) or len(_SEPARATOR.findall(sentence)) >= 2:
+        return True
+    tokens = [t for t in sentence.split() if t[0].isalpha()]
+    if len(tokens) >= MENU_WORDS and sum(t[0].isupper() for t in tokens) >= MENU_CAPITALISED * len(tokens):
+        return True
+    digits = sum(c.isdigit() for c in sentence)
+    letters = sum(c.isalpha() for c in sentence)
+    if digits > MAX_DIGIT_RATIO * max(letters, 1):
+        return True
+    return sum(w not in STOPWORDS for w in words) < MIN_CONTENT_WORDS
+
+
+def _sentences(text: str) -> List[_Sentence]:
+    """Sentences worth keeping, in page order, tagged with their paragraph."""
+    blocks = [b.strip() for b in re.split(r"\n\s*\n|\n", text) if b.strip()]
+    structured = len(blocks) > 1
+    kept: List[_Sentence] = []
+    seen = set()
+    in_back_matter = False
+    skip_next = False
+    for number, block in enumerate(blocks):
+        if structured and _is_heading(block):
+            # Headings open and close back-matter sections, but are not kept themselves
+            in_back_matter = bool(_BACK_MATTER.match(block))
+            continue
+        for sentence in _SENTENCE_END.split(block):
+            sentence = _SPACE.sub(" ", sentence).strip()
+            words = _WORD.findall(sentence.casefold())
+            if skip_next:
+                # The text of a caption split after "Figure 3."
+                skip_next = False
+                continue
+            if _CAPTION.match(sentence) and len(words) <= 1:
+                skip_next = True
+                continue
+            noise = _is_noise(sentence, words)
+            # "References [1] Smith J. ..." when the heading ran into the list
+            if _BACK_MATTER.match(sentence) and (_is_heading(sentence) or (noise and not structured)):
+                in_back_matter = True
+                continue
+            if in_back_matter:
+                # Unstructured text has no headings: plain prose ends the section
+                if structured or noise or len(words) < 12:
+                    continue
+                in_back_matter = False
+            if noise:
+                continue
+            key = " ".join(words)
+            if key in seen:
+                continue
+            seen.add(key)
+            kept.append(_Sentence(number, sentence, words))
+    return kept
+
+
+def _join(sentences: Sequence[_Sentence]) -> str:
+    paragraphs: List[List[str]] = []
+    last_block = None
+    for sentence in sentences:
+        if sentence.block != last_block:
+            paragraphs.append([])
+            last_block = sentence.block
+        paragraphs[-1].append(sentence.text)
+    return "\n\n".join(" ".join(p) for p in paragraphs)
+
+
+def _scores(sentences: Sequence[_Sentence]) -> List[float]:
+    """Luhn-style salience: how frequent a sentence's content words are across the page."""
+    frequency = Counter(w for s in sentences for w in set(s.words) if w not in STOPWORDS)
+    scores = []
+    for s in sentences:
+        content = [w for w in s.words if w not in STOPWORDS]
+        salience = sum(math.log1p(frequency[w]) for w in set(content))
+        scores.append(salience / math.sqrt(max(len(s.words), 1)))
+    return scores
+
+
+def _fit(sentences: List[_Sentence], lengths: List[int], budget: int) -> List[_Sentence]:
+    """The highest scoring sentences that fit the budget, in page order."""
+    scores = _scores(sentences)
+    chosen, used = [], 0
+    for i in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        if used + lengths[i] <= budget:
+            chosen.append(i)
+            used += lengths[i]
+    return [sentences[i] for i in sorted(chosen)]
+
+
+def compress(text: str, max_tokens: Optional[int] = None,
+             counter: Optional[Callable[[Sequence[str]], List[int]]] = None) -> Compressed:
+    """
+    Compress page text for summarization.
+
+    Args:
+        text (str): extracted page text.
+        max_tokens (int): token budget, COMPRESS_MAX_TOKENS by default; 0 for none.
+        counter: token counter for a list of texts, token_counter() by default.
+    """
+    if max_tokens is None:
+        max_tokens = int(os.getenv("COMPRESS_MAX_TOKENS", DEFAULT_MAX_TOKENS))
+    counter = counter or token_counter()
+    before = counter([text])[0]
+    sentences = _sentences(text)
+    if not sentences:
+        return Compressed(text, before, before)
+    lengths = counter([s.text for s in sentences])
+    if max_tokens and sum(lengths) > max_tokens:
+        sentences = _fit(sentences, lengths, max_tokens)
+    compressed = _join(sentences)
+    return Compressed(compressed, before, counter([compressed])[0])
+
+
+def _compress_state(state: ResearchState) -> dict:
+    if not state.content or state.content in PLACEHOLDERS:
+        return {}
+    result = compress(state.content)
+    logger.info(
+        f"compress: {result.tokens_before} -> {result.tokens_after} tokens "
+        f"({result.ratio:.0%} kept) for {state.url}"
+    )
+    COMPRESSION_RATIO.observe(result.ratio)
+    record(compressed_tokens_saved=max(result.tokens_before - result.tokens_after, 0))
+    return {"content": result.text}
+
+
+@instrument("compress")
+def compress_node(state: ResearchState) -> dict:
+    """Drop boilerplate, back matter and low-information sentences from the page text."""
+    return _compress_state(state)
+
+
+@instrument("compress")
+async def acompress_node(state: ResearchState) -> dict:
+    return await asyncio.to_thread(_compress_state, state)
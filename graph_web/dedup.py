@@ -0,0 +1,259 @@
+"""
+Near-duplicate detection for the web graph.
+
+The same document often reaches us under several URLs (an MDPI article, its
+/htm view, its PDF landing page, links with utm_* parameters) or again after
+a small edit. Before summarizing, the graph looks the extracted text up in a
+SimHash index and, when a stored page is similar enough, reuses its summary
+instead of calling the model.
+
+  simhash(text)   64-bit SimHash over word 3-shingles; near-identical texts
+                  differ in only a few bits
+  DedupIndex      persistent SQLite index: canonical URL -> signature, summary
+
+Each signature is split into four 16-bit bands stored in indexed columns. Two
+signatures within 3 bits of each other share at least one band exactly, so
+a lookup reads only the rows sharing a band with the query instead of
+scanning the index. A row is a fixed-size signature plus its summary, and
+nothing is held in memory, so the index scales to millions of pages.
+
+Entries are keyed by canonical_url (utils.urls): an updated page replaces its
+old signature instead of adding a new one.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from shared import ResearchState
+from utils.logger import setup_logger
+from utils.metrics import instrument, record
+from utils.paths import cache_path
+from utils.urls import canonical_url
+
+logger = setup_logger(__name__)
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+SHINGLE = 3
+
+# Bands guarantee a match only up to BANDS - 1 differing bits
+DEFAULT_MAX_DISTANCE = 3
+# Shorter texts ("No content", error pages) are not worth indexing
+DEFAULT_MIN_WORDS = 50
+
+_WORD = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    url TEXT PRIMARY KEY,
+    simhash INTEGER NOT NULL,
+    b0 INTEGER NOT NULL,
+    b1 INTEGER NOT NULL,
+    b2 INTEGER NOT NULL,
+    b3 INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signatures_b0 ON signatures (b0);
+CREATE INDEX IF NOT EXISTS signatures_b1 ON signatures (b1);
+CREATE INDEX IF NOT EXISTS signatures_b2 ON signatures (b2);
+CREATE INDEX IF NOT EXISTS signatures_b3 ON signatures (b3);
+"""
+
+
+def _shingle_bits(words):
+    """One row of 64 bits per word 3-shingle."""
+    import numpy as np
+
+    shingles = (" ".join(words[i:i + SHINGLE]) for i in range(max(1, len(words) - SHINGLE + 1)))
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles)
+    return np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1)
+
+
+@lru_cache(maxsize=128)
+def simhash(text: str) -> int:
+    """64-bit SimHash of `text` over lower-cased word 3-shingles."""
+    import numpy as np
+
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0
+    bits = _shingle_bits(words)
+    # Each bit position is set if most shingles set it
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(bits)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(signature: int):
+    return [(signature >> (i * BAND_BITS)) & BAND_MASK for i in range(BANDS)]
+
+
+def _to_sql(signature: int) -> int:
+    # SQLite integers are signed 64-bit
+    return signature - (1 << BITS) if signature >= 1 << (BITS - 1) else signature
+
+
+def _from_sql(value: int) -> int:
+    return value & ((1 << BITS) - 1)
+
+
+class Match(NamedTuple):
+    url: str
+    summary: str
+    distance: int
+
+    @property
+    def similarity(self) -> float:
+        return 1 - self.distance / BITS
+
+
+class DedupIndex:
+    """
+    Thread-safe persistent near-duplicate index.
+
+    Args:
+        path: SQLite file.
+        max_distance (int): largest Hamming distance (of 64 bits) counted as a
+            duplicate; at most BANDS - 1.
+        min_words (int): texts with fewer words are neither looked up nor stored.
+    """
+
+    def __init__(self, path, max_distance: int = DEFAULT_MAX_DISTANCE, min_words: int = DEFAULT_MIN_WORDS):
+        if not 0 <= max_distance < BANDS:
+            raise ValueError(f"max_distance must be between 0 and {BANDS - 1}")
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_distance = max_distance
+        self.min_words = min_words
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def _signature(self, text: Optional[str]) -> Optional[int]:
+        if not text or len(_WORD.findall(text)) < self.min_words:
+            return None
+        return simhash(text)
+
+    def find(self, text: Optional[str]) -> Optional[Match]:
+        """The closest stored page within max_distance of `text`, if any."""
+        signature = self._signature(text)
+        if signature is None:
+            return None
+        where = " OR ".join(f"b{i} = ?" for i in range(BANDS))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT url, simhash, summary FROM signatures WHERE {where}", _bands(signature)
+            ).fetchall()
+        best = None
+        for url, stored, summary in rows:
+            distance = hamming(signature, _from_sql(stored))
+            if distance <= self.max_distance and (best is None or distance < best.distance):
+                best = Match(url, summary, distance)
+        return best
+
+    def add(self, url: str, text: Optional[str], summary: str) -> bool:
+        """Store the summary of the page at `url`; returns False if the text is too short to index."""
+        signature = self._signature(text)
+        if signature is None:
+            return False
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (canonical_url(url), _to_sql(signature), *_bands(signature), summary, time.time()),
+            )
+            self._db.commit()
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM signatures")
+            self._db.commit()
+
+
+_default_index: Optional[DedupIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_dedup_index() -> Optional[DedupIndex]:
+    """
+    Return the process-wide index, configured from the environment:
+
+      DEDUP_INDEX         SQLite file (default "dedup.sqlite" in the user cache
+                          directory, see utils.paths; empty disables)
+      DEDUP_MAX_DISTANCE  differing bits still counted as a duplicate (default 3)
+      DEDUP_MIN_WORDS     shortest text that is indexed (default 50)
+    """
+    global _default_index
+    path = os.getenv("DEDUP_INDEX", cache_path("dedup.sqlite"))
+    if not path:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            _default_index = DedupIndex(
+                path,
+                max_distance=int(os.getenv("DEDUP_MAX_DISTANCE", DEFAULT_MAX_DISTANCE)),
+                min_words=int(os.getenv("DEDUP_MIN_WORDS", DEFAULT_MIN_WORDS)),
+            )
+        return _default_index
+
+
+def _lookup(state: ResearchState) -> dict:
+    index = get_dedup_index()
+    match = index.find(state.content) if index is not None else None
+    if match is None:
+        record(dedup_misses=1)
+        return {}
+    logger.info(f"{state.url} duplicates {match.url} ({match.similarity:.0%} similar); reusing its summary")
+    record(dedup_hits=1)
+    return {"summary": match.summary}
+
+
+def _remember(state: ResearchState) -> dict:
+    index = get_dedup_index()
+    if index is not None and state.url and state.summary:
+        index.add(str(state.url), state.content, state.summary)
+    return {}
+
+
+@instrument("dedup")
+def dedup_node(state: ResearchState) -> dict:
+    """Reuse the stored summary of a near-duplicate page, so summarize is skipped."""
+    return _lookup(state)
+
+
+@instrument("dedup")
+async def adedup_node(state: ResearchState) -> dict:
+    return await asyncio.to_thread(_lookup, state)
+
+
+@instrument("index")
+def index_node(state: ResearchState) -> dict:
+    """Remember the new summary under the page's canonical URL."""
+    return _remember(state)
+
+
+@instrument("index")
+async def aindex_node(state: ResearchState) -> dict:
+    return await asyncio.to_thread(_remember, state)
+
+
+def route_after_dedup(state: ResearchState) -> str:
+    return "done" if state.summary else "summarize"
@@ -0,0 +1,224 @@
+"""
+Single-pass streaming HTML text extractor.
+
+Feeds the page into lxml's incremental HTML parser with a parser target, so no
+document tree is ever built. One pass collects everything the loader needs:
+
+  1. <h1 class="title hypothesis_container">
+  2. <h2 id="html-abstract-title">
+  3. all <div class="html-p"> elements (joined as paragraphs)
+  Fallback: visible page text (script, style, header, footer, ... skipped)
+
+The result follows that priority order and matches what the previous
+BeautifulSoup implementation returned. Each collector stops growing at
+max_chars, and feed() reports when nothing later in the page can change the
+result, so the caller can stop reading the response.
+"""
+
+from typing import List, Optional, Union
+
+from lxml import etree
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Text inside these tags is never page text (BeautifulSoup's get_text skips it too)
+NON_TEXT_TAGS = {"script", "style", "template"}
+# Tags removed before the visible-text fallback
+INVISIBLE_TAGS = {"script", "style", "noscript", "iframe", "header", "footer", "svg"}
+
+
+class _Collector:
+    """Stripped text fragments of one element, bounded by max_chars."""
+
+    def __init__(self, max_chars: Optional[int]):
+        self.parts: List[str] = []
+        self.size = 0
+        self.max_chars = max_chars
+
+    @property
+    def full(self) -> bool:
+        return self.max_chars is not None and self.size >= self.max_chars
+
+    def add(self, text: str) -> None:
+        if not self.full:
+            self.parts.append(text)
+            self.size += len(text) + 1
+
+    def text(self) -> str:
+        return " ".join(self.parts)
+
+
+class _Target:
+    """lxml parser target: receives start/end/data events for the whole page."""
+
+    def __init__(self, max_chars: Optional[int]):
+        self.max_chars = max_chars
+        self._buffer: List[str] = []
+        self._non_text_depth = 0
+        self._invisible_depth = 0
+        self.visible = _Collector(max_chars)
+
+        self.h1: Optional[_Collector] = None
+        self._h1_depth = 0
+        self.h1_closed = False
+        self.h2: Optional[_Collector] = None
+        self._h2_depth = 0
+
+        # (collector, nesting depth) for every div.html-p still open
+        self._open_paragraphs: List[list] = []
+        self.paragraphs: List[_Collector] = []
+        self.paragraph_chars = 0
+
+    # -- text handling -------------------------------------------------
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        text = "".join(self._buffer).strip()
+        self._buffer.clear()
+        if not text or self._non_text_depth:
+            return
+        if not self._invisible_depth:
+            self.visible.add(text)
+        if self._h1_depth:
+            self.h1.add(text)
+        if self._h2_depth:
+            self.h2.add(text)
+        for collector, _ in self._open_paragraphs:
+            collector.add(text)
+            self.paragraph_chars += len(text) + 1
+
+    def data(self, text: str) -> None:
+        self._buffer.append(text)
+
+    def comment(self, text: str) -> None:
+        self._flush()
+
+    # -- element handling ----------------------------------------------
+    def start(self, tag: str, attrib) -> None:
+        self._flush()
+        tag = tag.lower()
+        if tag in NON_TEXT_TAGS:
+            self._non_text_depth += 1
+        if tag in INVISIBLE_TAGS:
+            self._invisible_depth += 1
+
+        if self._h1_depth:
+            self._h1_depth += 1
+        elif tag == "h1" and self.h1 is None:
+            classes = (attrib.get("class") or "").split()
+            if "title" in classes and "hypothesis_container" in classes:
+                self.h1 = _Collector(self.max_chars)
+                self._h1_depth = 1
+
+        if self._h2_depth:
+            self._h2_depth += 1
+        elif tag == "h2" and self.h2 is None and attrib.get("id") == "html-abstract-title":
+            self.h2 = _Collector(self.max_chars)
+            self._h2_depth = 1
+
+        for entry in self._open_paragraphs:
+            entry[1] += 1
+        if tag == "div" and "html-p" in (attrib.get("class") or "").split():
+            collector = _Collector(self.max_chars)
+            self.paragraphs.append(collector)
+            self._open_paragraphs.append([collector, 1])
+
+    def end(self, tag: str) -> None:
+        self._flush()
+        tag = tag.lower()
+        if tag in NON_TEXT_TAGS:
+            self._non_text_depth = max(0, self._non_text_depth - 1)
+        if tag in INVISIBLE_TAGS:
+            self._invisible_depth = max(0, self._invisible_depth - 1)
+
+        if self._h1_depth:
+            self._h1_depth -= 1
+            self.h1_closed = self._h1_depth == 0
+        if self._h2_depth:
+            self._h2_depth -= 1
+
+        for entry in self._open_paragraphs:
+            entry[1] -= 1
+        self._open_paragraphs = [e for e in self._open_paragraphs if e[1] > 0]
+
+    def close(self) -> None:
+        self._flush()
+
+
+class StreamingExtractor:
+    """
+    Incremental page-text extractor.
+
+    Args:
+        max_chars (int): cap on the extracted text (and on what is buffered).
+        encoding (str): page encoding when known from the HTTP headers;
+            otherwise lxml detects it from the document.
+
+    Usage:
+        extractor = StreamingExtractor(max_chars=MAX_CHARS)
+        for chunk in response.iter_content(65536):
+            if extractor.feed(chunk):
+                break
+        content = extractor.close()
+    """
+
+    def __init__(self, max_chars: Optional[int] = None, encoding: Optional[str] = None):
+        self.max_chars = max_chars
+        self._target = _Target(max_chars)
+        self._parser = etree.HTMLParser(target=self._target, encoding=encoding, recover=True)
+        self._closed = False
+        # Which rule produced the result: "h1", "h2", "paragraphs", "visible" or "none"
+        self.source = "none"
+
+    @property
+    def done(self) -> bool:
+        """True once more input cannot change the result."""
+        t = self._target
+        if t.h1_closed and t.h1.parts:
+            return True
+        # Article headings come before the body, so a full set of paragraphs is final
+        return self.max_chars is not None and t.paragraph_chars >= self.max_chars
+
+    def feed(self, data: Union[bytes, str]) -> bool:
+        """Parse the next piece of the document. Returns self.done."""
+        if data:
+            self._parser.feed(data)
+        return self.done
+
+    def close(self) -> str:
+        if not self._closed:
+            self._closed = True
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                # Empty or unparseable document: keep whatever was collected
+                pass
+        return self._result()
+
+    def _result(self) -> str:
+        t = self._target
+        if t.h1 is not None and t.h1.parts:
+            logger.info("Extracted content using selector: h1.title.hypothesis_container")
+            content, self.source = t.h1.text(), "h1"
+        elif t.h2 is not None and t.h2.parts:
+            logger.info("Extracted content using selector: h2#html-abstract-title")
+            content, self.source = t.h2.text(), "h2"
+        else:
+            paragraphs = [p.text() for p in t.paragraphs if p.parts]
+            if paragraphs:
+                logger.info("Extracted content using selector: div.html-p (joined %d paragraphs)", len(paragraphs))
+                content, self.source = "\n\n".join(paragraphs), "paragraphs"
+            elif t.visible.parts:
+                content, self.source = t.visible.text(), "visible"
+            else:
+                content, self.source = "No content", "none"
+        return content[:self.max_chars] if self.max_chars is not None else content
+
+
+def extract_text(html: Union[bytes, str], max_chars: Optional[int] = None) -> str:
+    """Extract page text from a complete HTML document."""
+    extractor = StreamingExtractor(max_chars=max_chars)
+    extractor.feed(html)
+    return extractor.close()
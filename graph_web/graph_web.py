@@ -1,18 +1,95 @@
-from langgraph.graph import StateGraph, END
+"""
+Web Graph
+
+Workflow:
+  search -> load -> compress -> dedup -> summarize -> index -> END
+                                  \
+                                   -> END   (near-duplicate of a page already summarized)
+
+compress strips boilerplate, back matter and low-information sentences from
+the page text, and fits it to a token budget when one is set (see compress.py). dedup looks the page text up in the near-duplicate index (see dedup.py) and
+reuses a stored summary when it finds one; index stores new summaries.
+
+load, compress, dedup, summarize and index have sync and async implementations, so the
+compiled graph works with both invoke/stream and ainvoke/astream.
+
+The graph is compiled on first use: get_web_graph(), or the module attribute
+`web_graph`.
+
+summarize_url() runs the graph for one URL; requests for the same page made
+while it runs (same canonical URL, see utils.urls, and the same API token)
+share that run instead of fetching and summarizing it again.
+"""
+
+from functools import lru_cache
+
+from langchain_core.runnables import RunnableLambda
 from shared import ResearchState
+from utils.checkpoint import get_checkpointer
+from utils.models import token_digest
+from utils.singleflight import SingleFlight
+from utils.urls import canonical_url
 from .search import search_node
 # from .loader import load_node
-from .loader_deployment import load_node
-from .summarizer import summarize_node
+from .loader_deployment import load_node, aload_node
+from .summarizer import summarize_node, asummarize_node
+from .compress import acompress_node, compress_node
+from .dedup import adedup_node, aindex_node, dedup_node, index_node, route_after_dedup
+
+
+def get_web_graph(durable: bool = False):
+    """
+    Return the compiled web graph.
+
+    With durable=True and CHECKPOINT_DB set, the graph checkpoints after every
+    node so a failed run can be resumed by thread id (see utils.checkpoint).
+    """
+    return _compile(get_checkpointer() if durable else None)
+
+
+@lru_cache(maxsize=None)
+def _compile(checkpointer=None):
+    # langgraph is only imported once a graph is actually needed
+    from langgraph.graph import StateGraph, END
+
+    builder = StateGraph(ResearchState)
+    builder.add_node("search", search_node)
+    builder.add_node("load", RunnableLambda(load_node, afunc=aload_node, name="load"))
+    builder.add_node("compress", RunnableLambda(compress_node, afunc=acompress_node, name="compress"))
+    builder.add_node("dedup", RunnableLambda(dedup_node, afunc=adedup_node, name="dedup"))
+    builder.add_node("summarize", RunnableLambda(summarize_node, afunc=asummarize_node, name="summarize"))
+    builder.add_node("index", RunnableLambda(index_node, afunc=aindex_node, name="index"))
+
+    builder.set_entry_point("search")
+    builder.add_edge("search", "load")
+    builder.add_edge("load", "compress")
+    builder.add_edge("compress", "dedup")
+    builder.add_conditional_edges("dedup", route_after_dedup, {"summarize": "summarize", "done": END})
+    builder.add_edge("summarize", "index")
+    builder.add_edge("index", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def __getattr__(name):
+    if name == "web_graph":
+        return get_web_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+web_flight = SingleFlight("web")
+
+
+def web_request_key(state: ResearchState) -> tuple:
+    """Requests for the same page made with the same API token share a run."""
+    return canonical_url(str(state.url)), token_digest()
+
 
-builder = StateGraph(ResearchState)
-builder.add_node("search", search_node)
-builder.add_node("load", load_node)
-builder.add_node("summarize", summarize_node)
+def summarize_url(url, config=None) -> dict:
+    """Run the web graph for `url`, sharing the run with concurrent requests for the same page."""
+    state = ResearchState(url=url)
+    return web_flight.do(web_request_key(state), get_web_graph().invoke, state, config)
 
-builder.set_entry_point("search")
-builder.add_edge("search", "load")
-builder.add_edge("load", "summarize")
-builder.add_edge("summarize", END)
 
-web_graph = builder.compile()
\ No newline at end of file
+async def asummarize_url(url, config=None) -> dict:
+    state = ResearchState(url=url)
+    return await web_flight.ado(web_request_key(state), get_web_graph().ainvoke, state, config)
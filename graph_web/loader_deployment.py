@@ -1,6 +1,6 @@
 # graph_web/loader.py
 """
-HTML loader using requests + BeautifulSoup with targeted extraction.
+HTML loader using requests + a single-pass streaming extractor.
 
 Priority extraction order:
   1. <h1 class="title hypothesis_container">
@@ -8,122 +8,237 @@ Priority extraction order:
   3. all <div class="html-p"> elements (joined as paragraphs)
 Fallback: full visible-page text extraction.
 
+The response body is fed to the extractor (see extractor.py) as it arrives,
+and reading stops as soon as the result is final or MAX_CHARS is reached.
+Fetches go through the pooled, rate-limited clients in http_client.py.
+
+`aload_node` is the asyncio variant (streamed httpx fetch).
+Fetched pages go through the on-disk page cache (see page_cache.py).
+
+When the static result is thin (fewer than BROWSER_MIN_WORDS words from the
+visible-text fallback) and the page has scripts, it is most likely rendered
+by JavaScript: the page is then rendered in a pooled headless browser (see
+browser_pool.py) and the richer of the two results is kept and cached.
+
 Returns: {"content": <truncated_text>}
 """
 
 from shared import ResearchState
-from typing import Dict, Optional
+from typing import Dict, NamedTuple, Optional
+import asyncio
 import logging
-import requests
-from bs4 import BeautifulSoup
+import os
+import re
+import time
+from utils.metrics import instrument, record
+from .browser_pool import get_browser_pool
+from .extractor import StreamingExtractor
+from .http_client import get_async_fetch_client, get_fetch_client
+from .page_cache import get_page_cache
 
 logger = logging.getLogger(__name__)
 
-# Limit content length to ~100,000 characters (≈ 32,000 tokens max)
-MAX_CHARS = 100_000
+# Limit content length to ~400,000 characters (≈ 128,000 tokens max) to bound
+# memory per page; long content is summarised in chunks, not truncated again.
+MAX_CHARS = 400_000
+
+# Bytes read from the response between extractor feeds
+CHUNK_SIZE = 64 * 1024
+
+# Static results shorter than this (in words) are retried in a browser
+DEFAULT_BROWSER_MIN_WORDS = 50
+_SCRIPT = re.compile(r"<script\b", re.IGNORECASE)
+
+class FetchedPage(NamedTuple):
+    status: int
+    headers: Dict[str, str]  # lower-cased names
+    html: str = ""
+    content: str = ""
+    source: str = ""  # extractor rule that produced content
+
+
+def _lower(headers) -> Dict[str, str]:
+    return {k.lower(): v for k, v in headers.items()}
+
+
+def _declared_encoding(content_type: Optional[str]) -> Optional[str]:
+    """Charset from a Content-Type header, if the server sent one."""
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip("\"'")
+    return None
+
+
+class _PageReader:
+    """Feeds body chunks to the extractor while keeping the raw bytes for the cache."""
+
+    def __init__(self, content_type: Optional[str]):
+        self.encoding = _declared_encoding(content_type)
+        self.extractor = StreamingExtractor(max_chars=MAX_CHARS, encoding=self.encoding)
+        self.raw = bytearray()
+        self.parse_seconds = 0.0
+
+    def feed(self, chunk: bytes) -> bool:
+        self.raw += chunk
+        start = time.perf_counter()
+        done = self.extractor.feed(chunk)
+        self.parse_seconds += time.perf_counter() - start
+        return done
 
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36"
-    )
-}
+    def page(self, status: int, headers) -> FetchedPage:
+        html = self.raw.decode(self.encoding or "utf-8", errors="replace")
+        start = time.perf_counter()
+        content = self.extractor.close()
+        record(fetch_bytes=len(self.raw), parse_seconds=self.parse_seconds + time.perf_counter() - start)
+        return FetchedPage(status, _lower(headers), html, content, self.extractor.source)
 
 
-def _fetch_html(url: str) -> Optional[str]:
+def _fetch_page(url: str, headers: Optional[Dict[str, str]] = None) -> Optional[FetchedPage]:
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
-        resp.raise_for_status()
-        return resp.text
+        with get_fetch_client().stream(url, headers, CHUNK_SIZE) as (resp, body):
+            if resp.status_code == 304:
+                return FetchedPage(304, _lower(resp.headers))
+            resp.raise_for_status()
+            reader = _PageReader(resp.headers.get("Content-Type"))
+            for chunk in body:
+                if reader.feed(chunk):
+                    break
+            return reader.page(resp.status_code, resp.headers)
     except Exception as e:
         logger.warning("requests fetch failed for %s: %s", url, e)
         return None
 
 
-def _extract_targeted(soup: BeautifulSoup) -> Optional[str]:
+async def _afetch_page(url: str, headers: Optional[Dict[str, str]] = None) -> Optional[FetchedPage]:
+    try:
+        async with get_async_fetch_client().stream(url, headers, CHUNK_SIZE) as (resp, body):
+            if resp.status_code == 304:
+                return FetchedPage(304, _lower(resp.headers))
+            resp.raise_for_status()
+            reader = _PageReader(resp.headers.get("Content-Type"))
+            async for chunk in body:
+                if reader.feed(chunk):
+                    break
+            return reader.page(resp.status_code, resp.headers)
+    except Exception as e:
+        logger.warning("httpx fetch failed for %s: %s", url, e)
+        return None
+
+
+def needs_browser(page: FetchedPage) -> bool:
+    """True for a thin static result from a page with scripts: a JavaScript shell or client-rendered page."""
+    if page.source not in ("visible", "none"):
+        return False
+    min_words = int(os.getenv("BROWSER_MIN_WORDS", DEFAULT_BROWSER_MIN_WORDS))
+    if page.source == "visible" and len(page.content.split()) >= min_words:
+        return False
+    return bool(_SCRIPT.search(page.html))
+
+
+def _render(url: str, page: FetchedPage) -> FetchedPage:
+    """The page rendered in the browser pool, if that yields more text than the static fetch."""
+    pool = get_browser_pool()
+    if pool is None:
+        return page
+    logger.info("Static fetch of %s looks like a JavaScript page, rendering it in a browser", url)
+    record(browser_fallbacks=1)
+    try:
+        html = pool.render(url)
+    except Exception as e:
+        logger.warning("browser render failed for %s: %r", url, e)
+        return page
+    extractor = StreamingExtractor(max_chars=MAX_CHARS)
+    extractor.feed(html)
+    content = extractor.close()
+    if extractor.source == "none" or len(content.split()) <= len(page.content.split()):
+        return page
+    return FetchedPage(page.status, page.headers, html, content, extractor.source)
+
+
+def _from_cache(cache, cached, page) -> Optional[str]:
     """
-    Try the prioritized selectors:
-      - h1.title.hypothesis_container
-      - h2#html-abstract-title
-      - div.html-p (join as paragraphs)
-    Return the first match's text or None if none found.
+    Return cached text when the response lets us reuse it: a 304 revalidation,
+    or a failed fetch with a stale copy on hand.
     """
-    # 1) h1 with both classes 'title' and 'hypothesis_container'
-    el = soup.select_one("h1.title.hypothesis_container")
-    if el:
-        text = el.get_text(separator=" ", strip=True)
-        if text:
-            logger.info("Extracted content using selector: h1.title.hypothesis_container")
-            return text
-
-    # 2) h2 with id html-abstract-title
-    el = soup.select_one("h2#html-abstract-title")
-    if el:
-        text = el.get_text(separator=" ", strip=True)
-        if text:
-            logger.info("Extracted content using selector: h2#html-abstract-title")
-            return text
-
-    # 3) all div.html-p (collect paragraphs)
-    divs = soup.select("div.html-p")
-    if divs:
-        paragraphs = []
-        for d in divs:
-            ptext = d.get_text(separator=" ", strip=True)
-            if ptext:
-                paragraphs.append(ptext)
-        if paragraphs:
-            joined = "\n\n".join(paragraphs)
-            logger.info("Extracted content using selector: div.html-p (joined %d paragraphs)", len(paragraphs))
-            return joined
-
+    if cached is None:
+        return None
+    if page is None:
+        logger.info("Serving stale cached copy of %s after fetch failure", cached.url)
+        return cached.text
+    if page.status == 304:
+        cache.touch(cached.url)
+        logger.info("Revalidated cached copy of %s", cached.url)
+        return cached.text
     return None
 
 
-def _extract_visible_text(soup: BeautifulSoup) -> str:
-    """Fallback generic visible text extraction."""
-    for tag in soup(["script", "style", "noscript", "iframe", "header", "footer", "svg"]):
-        try:
-            tag.decompose()
-        except Exception:
-            pass
-
-    texts = list(soup.stripped_strings)
-    if not texts:
-        return "No content"
-    return " ".join(texts)
+def _store(cache, url: str, page: FetchedPage) -> None:
+    # A page nothing could be extracted from is fetched again next time
+    if cache and page.source != "none":
+        cache.put(url, page.html, page.content, page.headers.get("etag"), page.headers.get("last-modified"))
 
 
+@instrument("load")
 def load_node(state: ResearchState) -> Dict[str, str]:
     """
-    Load the page content from state.url using requests + BeautifulSoup,
-    preferring targeted selectors first.
+    Load the page content from state.url, preferring targeted selectors first.
+    Pages are served from the page cache while fresh and revalidated with
+    ETag / Last-Modified once stale.
     """
     if not state.url:
         return {"content": "No URL to load"}
 
     url = str(state.url)
-    html = _fetch_html(url)
-    if not html:
+    cache = get_page_cache()
+    cached = cache.get(url) if cache else None
+    if cached and cached.is_fresh(cache.ttl):
+        logger.info("Page cache hit for %s", url)
+        record(page_cache_hits=1)
+        return {"content": cached.text}
+    record(page_cache_misses=1)
+
+    page = _fetch_page(url, cached.validators() if cached else None)
+    reused = _from_cache(cache, cached, page)
+    if reused is not None:
+        return {"content": reused}
+    if page is None or page.status == 304:
         return {"content": "No content"}
+    if needs_browser(page):
+        page = _render(url, page)
 
-    # Parse using lxml if available for speed, else fallback
-    try:
-        soup = BeautifulSoup(html, "lxml")
-    except Exception:
-        soup = BeautifulSoup(html, "html.parser")
+    _store(cache, url, page)
+    return {"content": page.content}
 
-    # Try targeted extraction
-    try:
-        targeted = _extract_targeted(soup)
-        if targeted:
-            content = targeted
-        else:
-            # Fallback to full visible text
-            content = _extract_visible_text(soup)
-    except Exception as e:
-        logger.exception("Error during extraction for %s: %s", url, e)
-        content = "No content"
 
-    truncated = content[:MAX_CHARS]
-    return {"content": truncated}
+@instrument("load")
+async def aload_node(state: ResearchState) -> Dict[str, str]:
+    """
+    Async variant of load_node: streams the page with httpx so the event loop
+    is never blocked on the network.
+    """
+    if not state.url:
+        return {"content": "No URL to load"}
+
+    url = str(state.url)
+    cache = get_page_cache()
+    cached = await asyncio.to_thread(cache.get, url) if cache else None
+    if cached and cached.is_fresh(cache.ttl):
+        logger.info("Page cache hit for %s", url)
+        record(page_cache_hits=1)
+        return {"content": cached.text}
+    record(page_cache_misses=1)
+
+    page = await _afetch_page(url, cached.validators() if cached else None)
+    # A 304 refreshes the entry in SQLite: off the event loop
+    reused = await asyncio.to_thread(_from_cache, cache, cached, page)
+    if reused is not None:
+        return {"content": reused}
+    if page is None or page.status == 304:
+        return {"content": "No content"}
+    if needs_browser(page):
+        # Selenium is synchronous: render in a worker thread
+        page = await asyncio.to_thread(_render, url, page)
+
+    await asyncio.to_thread(_store, cache, url, page)
+    return {"content": page.content}
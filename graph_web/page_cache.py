@@ -0,0 +1,201 @@
+"""
+Persistent cache of fetched pages for the web loader.
+
+Layout of the cache directory:
+  index.sqlite        normalized URL -> validators, timestamps, extracted text
+  objects/ab/<sha256> raw HTML, stored by content hash so mirrors share a blob
+
+A fresh entry (younger than the TTL) is served without touching the network
+or the HTML parser. A stale entry keeps its ETag / Last-Modified so the loader
+can revalidate it with a conditional request. The total size is bounded and
+the least recently used entries are evicted first.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils.logger import setup_logger
+from utils.paths import cache_path
+from utils.urls import normalize_url
+
+logger = setup_logger(__name__)
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    text TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at);
+"""
+
+
+@dataclass
+class CachedPage:
+    url: str
+    digest: str
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Thread-safe on-disk page cache.
+
+    Args:
+        directory: where the index and HTML blobs are stored.
+        ttl (float): seconds an entry is served without revalidation.
+        max_bytes (int): total size (HTML + text) kept before LRU eviction.
+    """
+
+    def __init__(self, directory, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.directory / "index.sqlite", check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        key = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, text, etag, last_modified, fetched_at FROM pages WHERE url = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), key))
+            self._db.commit()
+        return CachedPage(key, *row)
+
+    def read_html(self, page: CachedPage) -> Optional[str]:
+        try:
+            return self._blob_path(page.digest).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def put(self, url: str, html: str, text: str,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        key = normalize_url(url)
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(exist_ok=True)
+            tmp = blob.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(raw)
+            tmp.replace(blob)
+
+        now = time.time()
+        size = len(raw) + len(text.encode("utf-8"))
+        with self._lock:
+            old = self._db.execute("SELECT digest FROM pages WHERE url = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, digest, text, etag, last_modified, now, now, size),
+            )
+            if old and old[0] != digest:
+                self._drop_blob_if_unused(old[0])
+            self._evict()
+            self._db.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark an entry as freshly validated (e.g. after a 304 Not Modified)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, normalize_url(url)),
+            )
+            self._db.commit()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            digests = [r[0] for r in self._db.execute("SELECT DISTINCT digest FROM pages")]
+            self._db.execute("DELETE FROM pages")
+            self._db.commit()
+            for digest in digests:
+                self._blob_path(digest).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, digest, size FROM pages ORDER BY accessed_at").fetchall()
+        for url, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self._drop_blob_if_unused(digest)
+            total -= size
+            logger.info(f"page cache evicted {url}")
+
+    def _drop_blob_if_unused(self, digest: str) -> None:
+        in_use = self._db.execute("SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if not in_use:
+            self._blob_path(digest).unlink(missing_ok=True)
+
+
+_default_cache: Optional[PageCache] = None
+_default_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """
+    Return the process-wide page cache, configured from the environment:
+
+      PAGE_CACHE_DIR     cache directory (default "pages" in the user cache
+                         directory, see utils.paths; empty disables)
+      PAGE_CACHE_TTL     freshness lifetime in seconds (default 86400)
+      PAGE_CACHE_MAX_MB  size bound in megabytes (default 256)
+    """
+    global _default_cache
+    directory = os.getenv("PAGE_CACHE_DIR", cache_path("pages"))
+    if not directory:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PageCache(
+                directory,
+                ttl=float(os.getenv("PAGE_CACHE_TTL", DEFAULT_TTL)),
+                max_bytes=int(float(os.getenv("PAGE_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 2**20)) * 2**20),
+            )
+        return _default_cache
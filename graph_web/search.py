@@ -1,8 +1,10 @@
 from shared import ResearchState
 from pydantic import ValidationError
+from utils.metrics import instrument
 
 DEFAULT_URL = "https://www.mdpi.com/2076-3417/11/20/9772"
 
+@instrument("search")
 def search_node(state: ResearchState) -> dict:
     if state.url:
         return {"url": str(state.url)}
@@ -1,44 +1,133 @@
 import os
-from utils.retry import retry
+import asyncio
+from collections import deque
+from functools import partial
+from utils.retry import retry, async_retry
 from requests.exceptions import Timeout
-from langchain.prompts import PromptTemplate
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 
+from utils.llm_cache import CachedChain
+from utils.models import LLM_TIMEOUT, get_chat_model
 from utils.logger import setup_logger
+from utils.metrics import instrument
+from utils.streaming import PARTIAL_TAG
+from utils.tokens import count_tokens
+from .chunking import pack, split_into_chunks
 
 logger = setup_logger(__name__)
 
-HUGGINGFACEHUB_API_TOKEN = os.getenv("HUGGINGFACEHUB_API_TOKEN")
 repo_id = "mistralai/Mistral-7B-Instruct-v0.3"
 
 model_kwargs = {
     "temperature": 0.1,
     "max_new_tokens": 100,
-    "timeout": 6000,
+    "timeout": LLM_TIMEOUT,
 }
 
-llm = HuggingFaceEndpoint(
-    repo_id=repo_id,
-    huggingfacehub_api_token=HUGGINGFACEHUB_API_TOKEN,
-    **model_kwargs
-)
-chat_model = ChatHuggingFace(llm=llm)
-
-prompt = PromptTemplate.from_template(
+prompt = (
     "Summarize the following content concisely:\n\n{content}\n\nSummary:"
 )
-summarize_chain = prompt | chat_model
+summarize_chain = CachedChain("summarize", prompt, partial(get_chat_model, repo_id, model_kwargs, name="summarize"), repo_id, model_kwargs)
+
+# Content longer than this (in estimated tokens) is summarised with map-reduce:
+# chunks are summarised in parallel, then the partial summaries are merged
+# level by level until one summary is left.
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 2000))
+MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", 8))
+
+
+def _summarize_text(text, is_partial=True):
+    # Intermediate summaries are tagged so token streaming shows only the final one
+    if is_partial:
+        return summarize_chain.invoke({"content": text}, {"tags": [PARTIAL_TAG]}).content
+    return summarize_chain.invoke({"content": text}).content
+
+
+def _bounded_map(func, items, concurrency):
+    """Yield func(item) in order, with at most 2 * concurrency items in flight."""
+    with ContextThreadPoolExecutor(max_workers=concurrency) as pool:
+        window = deque()
+        for item in items:
+            if len(window) >= 2 * concurrency:
+                yield window.popleft().result()
+            window.append(pool.submit(func, item))
+        while window:
+            yield window.popleft().result()
+
+
+def _reduce_groups(summaries):
+    """Group partial summaries into prompts that fit one chunk (at least two per group)."""
+    groups = list(pack(summaries, CHUNK_TOKENS))
+    if len(groups) == len(summaries):
+        groups = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+    return groups
+
+
+def map_reduce_summarize(content):
+    summaries = list(_bounded_map(_summarize_text, split_into_chunks(content, CHUNK_TOKENS), MAP_CONCURRENCY))
+    logger.info(f"map_reduce_summarize: summarised {len(summaries)} chunks")
+    while len(summaries) > 1:
+        groups = _reduce_groups(summaries)
+        reduce = partial(_summarize_text, is_partial=len(groups) > 1)
+        summaries = list(_bounded_map(reduce, groups, MAP_CONCURRENCY))
+        logger.info(f"map_reduce_summarize: reduced to {len(summaries)} summaries")
+    return summaries[0]
+
+
+async def _amap_summaries(texts, concurrency, is_partial=True):
+    semaphore = asyncio.Semaphore(concurrency)
+    config = {"tags": [PARTIAL_TAG]} if is_partial else None
 
-@retry((Timeout,))
+    async def one(text):
+        async with semaphore:
+            return (await summarize_chain.ainvoke({"content": text}, config)).content
+
+    return list(await asyncio.gather(*(one(t) for t in texts)))
+
+
+async def amap_reduce_summarize(content):
+    summaries = await _amap_summaries(split_into_chunks(content, CHUNK_TOKENS), MAP_CONCURRENCY)
+    logger.info(f"amap_reduce_summarize: summarised {len(summaries)} chunks")
+    while len(summaries) > 1:
+        groups = _reduce_groups(summaries)
+        summaries = await _amap_summaries(groups, MAP_CONCURRENCY, is_partial=len(groups) > 1)
+        logger.info(f"amap_reduce_summarize: reduced to {len(summaries)} summaries")
+    return summaries[0]
+
+
+@instrument("summarize")
+@retry((Timeout,), circuit=repo_id)
 def summarize_node(state):
     logger.info("summarize_node started")
     if not state.content:
         logger.warning("summarize_node found no content to summarize")
         return {"summary": "No content to summarize"}
     try:
-        result = summarize_chain.invoke({"content": state.content})
+        if count_tokens(state.content) > CHUNK_TOKENS:
+            summary = map_reduce_summarize(state.content)
+        else:
+            summary = summarize_chain.invoke({"content": state.content}).content
         logger.info("summarize_node successfully generated summary")
-        return {"summary": result.content}
+        return {"summary": summary}
     except Exception as e:
         logger.error(f"summarize_node error: {e}")
         raise
+
+
+@instrument("summarize")
+@async_retry((Timeout, asyncio.TimeoutError), circuit=repo_id)
+async def asummarize_node(state):
+    logger.info("asummarize_node started")
+    if not state.content:
+        logger.warning("asummarize_node found no content to summarize")
+        return {"summary": "No content to summarize"}
+    try:
+        if count_tokens(state.content) > CHUNK_TOKENS:
+            summary = await amap_reduce_summarize(state.content)
+        else:
+            summary = (await summarize_chain.ainvoke({"content": state.content})).content
+        logger.info("asummarize_node successfully generated summary")
+        return {"summary": summary}
+    except Exception as e:
+        logger.error(f"asummarize_node error: {e}")
+        raise
@@ -1,13 +1,19 @@
 from shared import ResearchState
-from graph_article.graph_article import article_graph
-from graph_web.graph_web import web_graph
+from graph_article.graph_article import get_article_graph
+from graph_web.graph_web import get_web_graph
 from dotenv import load_dotenv
 from graph_web.search import DEFAULT_URL
 from pydantic import ValidationError
-from utils.visualizer import graph_visualiser
 # Import evaluation tool
 from utils.evaluation import evaluate_abstract  
+from utils.llm_cache import cache_stats
+from utils.streaming import GraphStream
+from utils.metrics import run_trace, write_prometheus
+from utils.retry import deadline
+from utils.checkpoint import can_resume, checkpointing_enabled, graph_name_of, new_thread_id, thread_config
 
+import argparse
+import json
 import os
 load_dotenv('.env')  # Load environment variables
 
@@ -16,6 +22,120 @@ LANGSMITH_TRACING = os.getenv("LANGSMITH_TRACING")
 LANGSMITH_PROJECT = os.getenv("LANGSMITH_PROJECT")
 LANGSMITH_ENDPOINT = os.getenv("LANGSMITH_ENDPOINT")
 
+def print_cache_stats():
+    stats = cache_stats()
+    print(f"\n📦 LLM cache: {stats['hits']} hits / {stats['misses']} misses")
+
+
+def save_run_metrics(trace):
+    """Print per-node timings and export the trace/metrics if TRACE_DIR / METRICS_FILE are set."""
+    print(f"\n⏱️ {trace.summary()}")
+    trace_dir = os.getenv("TRACE_DIR")
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(trace_dir, f"{trace.name}-{trace.run_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(trace.to_json(indent=2))
+        print(f"📝 Trace saved to {path}")
+    metrics_file = os.getenv("METRICS_FILE")
+    if metrics_file:
+        write_prometheus(metrics_file)
+
+
+GRAPHS = {"article": get_article_graph, "web": get_web_graph}
+
+
+def stream_to_console(graph, init_state, name, config=None):
+    """Run a graph, printing model tokens as they arrive. Returns the finished GraphStream."""
+    stream = GraphStream(graph, init_state, config)
+    streamed = False
+    with run_trace(name) as trace:
+        for kind, node, payload in stream:
+            if kind == "token":
+                if not streamed:
+                    print(f"\n--- ✍️ {node} ---")
+                    streamed = True
+                print(payload, end="", flush=True)
+            elif node in ("critic", "speculate") and payload.get("critique"):
+                print(f"\n[critic: {payload['critique']}]")
+                streamed = False
+    if streamed:
+        print()
+    save_run_metrics(trace)
+    return stream
+
+
+def run_graph(name, init_state, thread_id=None):
+    """
+    Stream a run of the `name` graph and return the finished GraphStream
+    (final_state, streamed_nodes), or None if it failed.
+
+    With CHECKPOINT_DB set the run is checkpointed, and a failed run can be
+    resumed from its last completed node. Pass init_state=None with the
+    thread_id of a failed run to resume it. The whole run, retries
+    included, is bounded by RUN_DEADLINE_SECONDS.
+    """
+    graph = GRAPHS[name](durable=True)
+    config = None
+    if checkpointing_enabled():
+        thread_id = thread_id or new_thread_id(name)
+        config = thread_config(thread_id)
+    try:
+        with deadline():
+            return stream_to_console(graph, init_state, name, config)
+    except Exception as e:
+        print(f"\n❌ The {name} run failed: {e}")
+        if config and can_resume(graph, thread_id):
+            print(f"💾 Progress saved. Resume with option 3 or: python main.py resume {thread_id}")
+        return None
+
+
+def print_abstract(final_state):
+    if final_state.get("final_abstract"):
+        print("\n--- ✅ Final Abstract ---")
+        print(final_state["final_abstract"])
+
+        # 🧠 Run Evaluation
+        evaluation = evaluate_abstract(final_state["final_abstract"])
+        print("\n--- 📊 Evaluation ---")
+        print(f"Word Count: {evaluation['word_count']}")
+        print(f"Keyword Match Score: {evaluation['keyword_match_score']}")
+        print(f"Keywords Present: {', '.join(evaluation['keywords_present'])}")
+        print(f"Readability (Flesch): {evaluation['flesch_reading_ease']:.1f}")
+
+    else:
+        print("\n❌ No final abstract was accepted by the critic.")
+
+
+def print_summary(run):
+    # A streamed summary is already on screen; cached and duplicate pages arrive without tokens
+    if "summarize" in run.streamed_nodes:
+        return
+    print("\n--- Webpage Summary ---")
+    print(run.final_state["summary"])
+
+
+def resume_run(thread_id):
+    """Continue a failed checkpointed run from its last completed node."""
+    name = graph_name_of(thread_id)
+    if name not in GRAPHS:
+        print(f"❌ Unknown run id: {thread_id}")
+        return
+    if not checkpointing_enabled():
+        print("❌ Resuming needs CHECKPOINT_DB to be set (and langgraph-checkpoint-sqlite installed).")
+        return
+    if not can_resume(GRAPHS[name](durable=True), thread_id):
+        print(f"❌ Nothing to resume for {thread_id}: it finished or was never started.")
+        return
+    run = run_graph(name, None, thread_id)
+    if run:
+        if name == "article":
+            print_abstract(run.final_state)
+        else:
+            print_summary(run)
+        print_cache_stats()
+
+
 def main():
     print("=== Welcome to the LangGraph Research Assistant ===")
 
@@ -23,29 +143,24 @@ def main():
         print("\nSelect a task to perform:")
         print("1. Generate Research Abstract")
         print("2. Summarize Webpages")
-        print("3. Exit")
+        print("3. Resume a failed run")
+        print("4. Exit")
 
-        choice = input("Enter your choice (1/2/3): ").strip()
+        choice = input("Enter your choice (1/2/3/4): ").strip()
 
         if choice == "1":
             title = input("Enter research title: ")
             category = input("Enter category: ")
-            init_state = ResearchState(input=title, category=category)
-            final_state = article_graph.invoke(init_state)
-
-            if final_state.get("final_abstract"):
-                print("\n--- ✅ Final Abstract ---")
-                print(final_state["final_abstract"])
-
-                # 🧠 Run Evaluation
-                evaluation = evaluate_abstract(final_state["final_abstract"])
-                print("\n--- 📊 Evaluation ---")
-                print(f"Word Count: {evaluation['word_count']}")
-                print(f"Keyword Match Score: {evaluation['keyword_match_score']}")
-                print(f"Keywords Present: {', '.join(evaluation['keywords_present'])}")
-
-            else:
-                print("\n❌ No final abstract was accepted by the critic.")
+            candidates = input("Candidate abstracts per round [1]: ").strip()
+            init_state = ResearchState(
+                input=title,
+                category=category,
+                candidates=int(candidates) if candidates.isdigit() and int(candidates) > 0 else 1,
+            )
+            run = run_graph("article", init_state)
+            if run:
+                print_abstract(run.final_state)
+            print_cache_stats()
 
         elif choice == "2":
             print("\n📄 Web Summarizer Mode (Press Enter to exit anytime)")
@@ -57,22 +172,184 @@ def main():
 
                 try:
                     init_state = ResearchState(url=user_input)
-                    final_state = web_graph.invoke(init_state)
-                    print("\n--- Webpage Summary ---")
-                    print(final_state["summary"])
+                    run = run_graph("web", init_state)
+                    if run:
+                        print_summary(run)
+                    print_cache_stats()
                 except ValidationError as e:
                     print(f"❌ Invalid URL: {e}")
 
         elif choice == "3":
+            thread_id = input("Enter the run id to resume: ").strip()
+            if thread_id:
+                resume_run(thread_id)
+
+        elif choice == "4":
             print("👋 Goodbye!")
             break
 
         else:
             print("❌ Invalid input. Try again.")
 
+def run_batch(args):
+    """Summarize every URL in args.urls / args.file and print or save the results."""
+    from graph_web.batch import read_urls, summarize_batch
+
+    urls = list(args.urls)
+    if args.file:
+        urls.extend(read_urls(args.file))
+    if not urls:
+        print("❌ No URLs given. Pass URLs or --file <path>.")
+        return
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    ok = 0
+    try:
+        for result in summarize_batch(
+            urls,
+            max_fetch=args.fetch_workers,
+            max_summarize=args.summarize_workers,
+            ordered=not args.as_completed,
+        ):
+            ok += result.ok
+            if out:
+                out.write(json.dumps(result.to_dict()) + "\n")
+                out.flush()
+            if result.ok:
+                print(f"\n--- [{result.index}] {result.url} ---")
+                print(result.summary)
+            else:
+                print(f"\n❌ [{result.index}] {result.url}: {result.error}")
+    finally:
+        if out:
+            out.close()
+    print(f"\n✅ Summarized {ok}/{len(urls)} URLs")
+    print_cache_stats()
+    if os.getenv("METRICS_FILE"):
+        write_prometheus(os.getenv("METRICS_FILE"))
+
+
+def run_abstracts(args):
+    """Generate abstracts for every job in args.jobs, appending results to args.output."""
+    from graph_article.batch import JobLedger, iter_abstracts, read_jobs
+
+    jobs = read_jobs(args.jobs)
+    ledger = JobLedger(args.ledger or f"{os.path.splitext(args.output)[0]}.ledger.sqlite")
+    done_keys = ledger.done_keys()
+    already_done = sum(job.key in done_keys for job in jobs)
+    print(f"📚 {len(jobs)} jobs, {already_done} already done, writing to {args.output}")
+
+    ok = failed = 0
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            for result in iter_abstracts(
+                jobs,
+                max_workers=args.workers,
+                ledger=ledger,
+                candidates=args.candidates,
+                max_iterations=args.max_iterations,
+                max_failures=args.max_failures,
+            ):
+                out.write(json.dumps(result.to_dict()) + "\n")
+                out.flush()
+                if result.ok:
+                    ok += 1
+                    verdict = "accepted" if result.accepted else "not accepted"
+                    print(f"✅ [{result.index}] {result.title} ({verdict}, {result.iterations} drafts)")
+                else:
+                    failed += 1
+                    print(f"❌ [{result.index}] {result.title}: {result.error}")
+        counts = ledger.counts()
+    finally:
+        ledger.close()
+    print(f"\n✅ {ok} generated, {failed} failed this run; "
+          f"{counts.get('done', 0)}/{len(jobs)} done overall. Re-run the same command to resume.")
+    print_cache_stats()
+    if os.getenv("METRICS_FILE"):
+        write_prometheus(os.getenv("METRICS_FILE"))
+
+
+def run_evaluate(args):
+    """Score every abstract in args.input and write one CSV row of metrics per abstract."""
+    import csv
+    from utils.evaluation import DEFAULT_KEYWORDS, evaluate_abstracts, load_keywords, read_abstracts
+
+    abstracts = read_abstracts(args.input)
+    keywords = load_keywords(args.keywords) if args.keywords else DEFAULT_KEYWORDS
+    evaluation = evaluate_abstracts(abstracts, keywords)
+    if not len(evaluation):
+        print("❌ No abstracts found.")
+        return
+
+    with open(args.output, "w", encoding="utf-8", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(["index", *evaluation.COLUMNS, "keywords_present"])
+        columns = [evaluation.columns()[name].tolist() for name in evaluation.COLUMNS]
+        for i, values in enumerate(zip(*columns)):
+            writer.writerow([i, *values, ";".join(evaluation.keywords_present(i))])
+
+    print(f"📊 Scored {len(evaluation)} abstracts against {len(evaluation.terms)} keywords -> {args.output}")
+    print(f"Mean word count: {evaluation.word_count.mean():.1f}")
+    print(f"Mean readability (Flesch): {evaluation.flesch_reading_ease.mean():.1f}")
+    print(f"Mean keyword coverage: {evaluation.keyword_coverage.mean():.1%}")
+    documents_with = (evaluation.keyword_hits > 0).sum(axis=0)
+    top = sorted(zip(documents_with.tolist(), evaluation.terms), reverse=True)[:10]
+    print("Most common keywords: " + ", ".join(f"{term} ({n})" for n, term in top if n))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LangGraph Research Assistant")
+    sub = parser.add_subparsers(dest="command")
+
+    batch = sub.add_parser("batch", help="Summarize many webpages concurrently")
+    batch.add_argument("urls", nargs="*", help="URLs to summarize")
+    batch.add_argument("-f", "--file", help="Text file with one URL per line")
+    batch.add_argument("-o", "--output", help="Write results to this JSONL file")
+    batch.add_argument("--fetch-workers", type=int, default=8, help="Max pages fetched at once")
+    batch.add_argument("--summarize-workers", type=int, default=2, help="Max summaries generated at once")
+    batch.add_argument("--as-completed", action="store_true",
+                       help="Print results as they finish instead of in input order")
+
+    resume = sub.add_parser("resume", help="Resume a failed run (needs CHECKPOINT_DB)")
+    resume.add_argument("thread_id", help="Run id printed when the run failed")
+
+    abstracts = sub.add_parser("abstracts", help="Generate abstracts for a CSV/JSONL file of titles")
+    abstracts.add_argument("jobs", help="CSV (title,category header) or JSONL file of jobs")
+    abstracts.add_argument("-o", "--output", default="abstracts.jsonl", help="JSONL file results are appended to")
+    abstracts.add_argument("--ledger", help="SQLite progress ledger (default: next to the output file)")
+    abstracts.add_argument("--workers", type=int, default=4, help="Max abstracts generated at once")
+    abstracts.add_argument("--candidates", type=int, default=1, help="Candidate abstracts per round")
+    abstracts.add_argument("--max-iterations", type=int, default=5, help="Max abstracts tried per job")
+    abstracts.add_argument("--max-failures", type=int, default=5,
+                           help="Stop after this many jobs fail in a row (0: never)")
+
+    evaluate = sub.add_parser("evaluate", help="Score a file of abstracts (length, readability, keywords)")
+    evaluate.add_argument("input", help="JSONL (abstract field), CSV (abstract column) or text file")
+    evaluate.add_argument("-k", "--keywords", help="Keyword file, one term per line (\"method*\" matches prefixes)")
+    evaluate.add_argument("-o", "--output", default="evaluation.csv", help="CSV file of per-abstract metrics")
+
+    visualize = sub.add_parser("visualize", help="Draw both graphs (SVG and Mermaid) without network access")
+    visualize.add_argument("-d", "--directory", default="visuals", help="Folder the drawings are written to")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    # Optional: visualize LangGraphs
-    graph_visualiser(web_graph, filename="visuals/web_graph.jpg")
-    graph_visualiser(article_graph, filename="visuals/article_graph.jpg")
+    args = parse_args()
+    if args.command == "batch":
+        run_batch(args)
+    elif args.command == "abstracts":
+        run_abstracts(args)
+    elif args.command == "evaluate":
+        run_evaluate(args)
+    elif args.command == "resume":
+        resume_run(args.thread_id)
+    elif args.command == "visualize":
+        from utils.visualizer import render_graphs
+        written = render_graphs(GRAPHS, args.directory)
+        print(f"🖼️ {len(written)} drawings updated in {args.directory}" if written else "🖼️ Drawings are up to date")
+    else:
+        # Redraw the graphs off the startup path; skipped when their topology is unchanged
+        from utils.visualizer import render_in_background
+        render_in_background(GRAPHS)
 
-    main()
\ No newline at end of file
+        main()
\ No newline at end of file
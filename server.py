@@ -0,0 +1,422 @@
+"""
+HTTP API for both graphs, for running graph work apart from the UI.
+
+  POST /summarize          {"url": ...}                          run and wait
+  POST /abstract           {"title": ..., "category": ...,       run and wait
+                            "candidates": 1, "max_iterations": 5}
+  POST /jobs/summarize     same bodies; returns 202 and a job id
+  POST /jobs/abstract
+  GET  /jobs/<id>          job status, plus its result or error once finished
+  GET  /healthz            liveness and queue depth
+  GET  /metrics            Prometheus text format
+
+Every request becomes a job on one bounded queue, served by a fixed pool of
+worker threads. When the queue is full, new work is refused with 429 and a
+Retry-After estimate, so a burst can't pile up unbounded work. Identical
+concurrent requests made with the same token share one graph run (see
+utils.singleflight).
+
+An "Authorization: Bearer <HF token>" header runs the job with that key;
+otherwise HUGGINGFACEHUB_API_TOKEN is used. Jobs live in this process only,
+so poll the instance that accepted the job.
+
+On SIGTERM / SIGINT the server stops accepting work (503), gives queued and
+running jobs up to --grace seconds to finish, then exits.
+
+Usage:
+    python server.py --port 8000 --workers 4 --queue-size 32
+"""
+
+import argparse
+import json
+import math
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from shared import ResearchState
+from utils.logger import setup_logger
+from utils.metrics import REGISTRY, render_prometheus
+from utils.models import use_api_token
+from utils.retry import deadline
+
+logger = setup_logger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+
+QUEUE_DEPTH = REGISTRY.gauge("research_api_queue_depth", "Jobs waiting for a worker")
+BUSY_WORKERS = REGISTRY.gauge("research_api_busy_workers", "Workers running a job")
+API_REQUESTS = REGISTRY.counter("research_api_requests_total", "API requests by route and status")
+JOB_SECONDS = REGISTRY.histogram("research_api_job_duration_seconds", "Time from job start to finish")
+
+
+class BadRequest(ValueError):
+    """The request body is not a valid job."""
+
+
+# -- Tasks: parse a request body, run the graph, shape the result ------------------
+def parse_summarize(body: dict) -> ResearchState:
+    if not body.get("url"):
+        raise BadRequest('"url" is required')
+    return ResearchState(url=body["url"])
+
+
+def run_summarize(state: ResearchState) -> dict:
+    from graph_web.graph_web import summarize_url
+
+    final_state = summarize_url(str(state.url))
+    return {"url": str(state.url), "summary": final_state.get("summary")}
+
+
+def parse_abstract(body: dict) -> ResearchState:
+    if not body.get("title") or not body.get("category"):
+        raise BadRequest('"title" and "category" are required')
+    state = ResearchState(
+        input=body["title"], category=body["category"],
+        candidates=body.get("candidates", 1), max_iterations=body.get("max_iterations", 5),
+    )
+    # Same limits as the Streamlit form
+    if not 1 <= state.candidates <= 5 or not 1 <= state.max_iterations <= 20:
+        raise BadRequest('"candidates" must be 1-5 and "max_iterations" 1-20')
+    return state
+
+
+def run_abstract(state: ResearchState) -> dict:
+    from graph_article.graph_article import generate_abstract
+    from utils.evaluation import evaluate_abstract
+
+    final_state = generate_abstract(state)
+    abstract = final_state.get("final_abstract") or final_state.get("abstract")
+    return {
+        "title": state.input,
+        "category": state.category,
+        "abstract": abstract,
+        "accepted": bool(final_state.get("final_abstract")),
+        "iterations": final_state.get("iterations", 0),
+        "evaluation": evaluate_abstract(abstract) if abstract else {},
+    }
+
+
+TASKS: Dict[str, Tuple[Callable[[dict], ResearchState], Callable[[ResearchState], dict]]] = {
+    "summarize": (parse_summarize, run_summarize),
+    "abstract": (parse_abstract, run_abstract),
+}
+
+
+# -- Jobs and workers --------------------------------------------------------------
+@dataclass
+class Job:
+    kind: str
+    state: ResearchState
+    token: Optional[str] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def finish(self, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        self.result, self.error = result, error
+        self.status = "failed" if error is not None else "done"
+        self.finished_at = time.time()
+        self.done.set()
+
+    def to_dict(self) -> dict:
+        data = {"job_id": self.id, "kind": self.kind, "status": self.status,
+                "created_at": self.created_at, "started_at": self.started_at, "finished_at": self.finished_at}
+        if self.status == "done":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("queue full")
+        self.retry_after = retry_after
+
+
+class ShuttingDown(Exception):
+    pass
+
+
+class JobRunner:
+    """
+    Bounded job queue served by a fixed pool of worker threads.
+
+    Args:
+        workers (int): jobs run at once.
+        queue_size (int): jobs that may wait for a worker; more are refused.
+        job_ttl (float): seconds a finished job stays available to poll.
+        tasks (dict): kind -> (parse, run); defaults to TASKS.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 32, job_ttl: float = 3600, tasks=None):
+        if workers < 1 or queue_size < 1:
+            raise ValueError("workers and queue_size must be at least 1")
+        self.tasks = tasks or TASKS
+        self.workers = workers
+        self.job_ttl = job_ttl
+        self.accepting = True
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(queue_size)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._avg_seconds = 10.0
+        self._threads = [threading.Thread(target=self._work, name=f"api-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, kind: str, body: dict, token: Optional[str] = None) -> Job:
+        """Validate and enqueue a job; raises BadRequest, ValidationError, QueueFull or ShuttingDown."""
+        if not self.accepting:
+            raise ShuttingDown()
+        parse, _ = self.tasks[kind]
+        job = Job(kind, parse(body), token)
+        self._prune()
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFull(self.retry_after()) from None
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        return max(1, math.ceil(self._avg_seconds * self._queue.qsize() / self.workers))
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            QUEUE_DEPTH.set(self._queue.qsize())
+            BUSY_WORKERS.inc()
+            job.status, job.started_at = "running", time.time()
+            _, run = self.tasks[job.kind]
+            try:
+                with use_api_token(job.token), deadline():
+                    result = run(job.state)
+            except Exception as e:
+                logger.warning(f"{job.kind} job {job.id} failed: {e}")
+                job.finish(error=str(e))
+            else:
+                job.finish(result=result)
+            finally:
+                BUSY_WORKERS.inc(-1)
+            seconds = job.finished_at - job.started_at
+            JOB_SECONDS.observe(seconds, kind=job.kind, status=job.status)
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.job_ttl
+        with self._lock:
+            expired = [i for i, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def shutdown(self, grace: float = 30.0) -> None:
+        """Stop accepting jobs, let queued and running ones finish for up to `grace` seconds."""
+        self.accepting = False
+        ends_at = time.monotonic() + grace
+        for _ in self._threads:
+            # Sentinels queue up behind the remaining jobs
+            while True:
+                try:
+                    self._queue.put(None, timeout=max(0.01, ends_at - time.monotonic()))
+                    break
+                except queue.Full:
+                    if time.monotonic() >= ends_at:
+                        break
+        for thread in self._threads:
+            thread.join(max(0.0, ends_at - time.monotonic()))
+        with self._lock:
+            unfinished = [job for job in self._jobs.values() if not job.done.is_set()]
+        for job in unfinished:
+            job.finish(error="server shut down before the job finished")
+        if unfinished:
+            logger.warning(f"shutdown: {len(unfinished)} job(s) did not finish within {grace:g}s")
+
+
+# -- HTTP --------------------------------------------------------------------------
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "ResearchAssistantAPI/1.0"
+
+    @property
+    def runner(self) -> JobRunner:
+        return self.server.runner
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _reply(self, status: int, payload: dict, headers: Optional[dict] = None, route: str = "") -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+        API_REQUESTS.inc(route=route or self.path, status=status)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise BadRequest("request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise BadRequest(f"invalid JSON: {e}") from None
+        if not isinstance(body, dict):
+            raise BadRequest("expected a JSON object")
+        return body
+
+    def _token(self) -> Optional[str]:
+        scheme, _, token = self.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            return None
+        return token.strip() or None
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._reply(200, {"status": "ok" if self.runner.accepting else "shutting down",
+                              "queue_depth": self.runner.depth()}, route="/healthz")
+        elif self.path == "/metrics":
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith("/jobs/"):
+            job = self.runner.get(self.path[len("/jobs/"):])
+            if job is None:
+                self._reply(404, {"error": "unknown or expired job"}, route="/jobs/<id>")
+            else:
+                self._reply(200, job.to_dict(), route="/jobs/<id>")
+        else:
+            self._reply(404, {"error": "not found"}, route="other")
+
+    def do_POST(self):
+        route = self.path
+        is_job = route.startswith("/jobs/")
+        kind = route[len("/jobs/"):] if is_job else route.lstrip("/")
+        if kind not in self.runner.tasks:
+            self._reply(404, {"error": "not found"}, route="other")
+            return
+        try:
+            job = self.runner.submit(kind, self._body(), self._token())
+        except (BadRequest, ValidationError) as e:
+            self._reply(400, {"error": str(e)}, route=route)
+            return
+        except QueueFull as e:
+            self._reply(429, {"error": "server busy, retry later"}, {"Retry-After": e.retry_after}, route=route)
+            return
+        except ShuttingDown:
+            self._reply(503, {"error": "server is shutting down"}, {"Retry-After": 5}, route=route)
+            return
+
+        if is_job:
+            self._reply(202, {"job_id": job.id, "status_url": f"/jobs/{job.id}"},
+                        {"Location": f"/jobs/{job.id}"}, route=route)
+            return
+        if not job.done.wait(self.server.sync_timeout):
+            # Still running: hand the caller the job to poll instead of holding the connection
+            self._reply(504, {"error": "still running", "job_id": job.id, "status_url": f"/jobs/{job.id}"},
+                        route=route)
+        elif job.status == "done":
+            self._reply(200, job.result, route=route)
+        else:
+            self._reply(502, {"error": job.error, "job_id": job.id}, route=route)
+
+
+class ApiServer(ThreadingHTTPServer):
+    # Non-daemon handler threads, so server_close() waits for replies in progress
+    daemon_threads = False
+
+    def __init__(self, address, runner: JobRunner, sync_timeout: float = 600):
+        super().__init__(address, ApiHandler)
+        self.runner = runner
+        self.sync_timeout = sync_timeout
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self, grace: float = 30.0) -> None:
+        """Graceful shutdown: refuse new work, drain jobs, then stop serving. Call from another thread."""
+        logger.info(f"shutting down: draining jobs for up to {grace:g}s")
+        self.runner.shutdown(grace)
+        self.shutdown()
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", 4)),
+                        help="Jobs run at once")
+    parser.add_argument("--queue-size", type=int, default=int(os.getenv("API_QUEUE_SIZE", 32)),
+                        help="Jobs waiting for a worker before requests get 429")
+    parser.add_argument("--sync-timeout", type=float, default=float(os.getenv("API_SYNC_TIMEOUT", 600)),
+                        help="Seconds /summarize and /abstract wait before answering 504 with a job id")
+    parser.add_argument("--job-ttl", type=float, default=float(os.getenv("API_JOB_TTL", 3600)),
+                        help="Seconds finished jobs can still be polled")
+    parser.add_argument("--grace", type=float, default=float(os.getenv("API_SHUTDOWN_GRACE", 30)),
+                        help="Seconds to finish queued and running jobs on shutdown")
+    args = parser.parse_args(argv)
+
+    runner = JobRunner(args.workers, args.queue_size, args.job_ttl)
+    server = ApiServer((args.host, args.port), runner, args.sync_timeout)
+
+    def on_signal(signum, frame):
+        # serve_forever runs on this thread, so stop it from another one
+        threading.Thread(target=server.stop, args=(args.grace,), daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    prewarm = int(os.getenv("BROWSER_PREWARM", 0))
+    if prewarm:
+        # Start browsers for JavaScript pages in the background, before the first one is needed
+        from graph_web.browser_pool import get_browser_pool
+
+        pool = get_browser_pool()
+        if pool is not None:
+            threading.Thread(target=pool.warm, args=(prewarm,), name="browser-warmup", daemon=True).start()
+    logger.info(f"serving on {server.url} with {args.workers} workers, queue size {args.queue_size}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+    logger.info("server stopped")
+
+
+if __name__ == "__main__":
+    main()
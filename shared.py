@@ -1,5 +1,6 @@
+import operator
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import Annotated, Optional
 
 class ResearchState(BaseModel):
     # For article graph
@@ -8,8 +9,13 @@ class ResearchState(BaseModel):
     abstract: Optional[str] = None
     critique: Optional[str] = None
     final_abstract: Optional[str] = None
+    # Abstracts written so far (nodes return increments) and the budget for them
+    iterations: Annotated[int, operator.add] = 0
+    max_iterations: int = 5
+    # Candidates written and reviewed in parallel per round (1 = sequential loop)
+    candidates: int = 1
 
     # For web summarizer graph
     url: Optional[HttpUrl] = None
     content: Optional[str] = None
-    summary: Optional[str] = None
\ No newline at end of file
+    summary: Optional[str] = None
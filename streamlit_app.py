@@ -1,9 +1,14 @@
 import streamlit as st
 from shared import ResearchState
-from graph_article.graph_article import article_graph
-from graph_web.graph_web import web_graph
+from graph_article.graph_article import article_flight, article_request_key, get_article_graph
+from graph_web.graph_web import get_web_graph, web_flight, web_request_key
 from pydantic import ValidationError
-import os
+from utils.llm_cache import cache_stats
+from utils.streaming import GraphStream
+from utils.metrics import run_trace
+from utils.models import use_api_token
+from utils.retry import deadline
+from utils.checkpoint import can_resume, checkpointing_enabled, new_thread_id, thread_config
 
 st.title("Agentic Research Abstract Generator and Web Content Summariser Agent With Langraph")
 
@@ -31,34 +36,168 @@ if not hf_api_key:
     st.warning("Please enter your HuggingFace API key to use the app.")
     st.stop()
 
-# Set the environment variable so underlying libs can authenticate
-os.environ["HUGGINGFACEHUB_API_TOKEN"] = hf_api_key
+# Runs below use this session's key. Model clients are pooled per key, so
+# reruns and other sessions with the same key reuse warm clients, and
+# concurrent sessions never see each other's key.
+def show_run_metrics(trace):
+    with st.expander(f"Run metrics ({trace.duration:.2f}s)"):
+        st.json(trace.node_totals())
+        st.download_button(
+            "Download trace (JSON)", trace.to_json(indent=2),
+            file_name=f"{trace.name}-{trace.run_id}.json", mime="application/json",
+        )
 
-option = st.selectbox("Select a task", ["Generate Research Abstract", "Summarize Webpage"])
+
+def show_cache_stats():
+    stats = cache_stats()
+    st.sidebar.subheader("LLM response cache")
+    st.sidebar.metric("Hits", stats["hits"])
+    st.sidebar.metric("Misses", stats["misses"])
+
+
+def show_error(e):
+    err_str = str(e)
+    if CREDITS_EXCEEDED_MSG in err_str:
+        st.error(CREDITS_EXCEEDED_MSG)
+    else:
+        st.error(f"Error: {err_str}")
+
+
+# Runs are checkpointed when CHECKPOINT_DB is set; a failed run's id is kept
+# per graph so it can be resumed from its last completed node.
+if "failed_runs" not in st.session_state:
+    st.session_state.failed_runs = {}
+
+
+def run_config(name, config=None, thread_id=None):
+    """Return (config, thread_id) for a new run, or for resuming thread_id."""
+    if not checkpointing_enabled():
+        return config, None
+    thread_id = thread_id or new_thread_id(name)
+    return thread_config(thread_id, config), thread_id
+
+
+def handle_failure(name, graph, thread_id, e):
+    show_error(e)
+    if thread_id and can_resume(graph, thread_id):
+        st.session_state.failed_runs[name] = thread_id
+        st.info(f"Progress was saved (run {thread_id}). Resume to continue from the last completed step.")
+
+
+def run_article(init_state, config, thread_id):
+    """
+    Stream an article run (init_state=None resumes thread_id), drafts shown as they are written.
+
+    A request identical to one already running in another session waits for
+    that run and shows its result instead of starting a second one.
+    """
+    graph = get_article_graph(durable=True)
+    trace = None
+
+    def stream_run():
+        nonlocal trace
+        stream = GraphStream(graph, init_state, config)
+        draft, text = st.empty(), ""
+        with run_trace("article") as trace:
+            for kind, node, payload in stream:
+                if kind == "token":
+                    text += payload
+                    draft.markdown(text)
+                elif node in ("critic", "speculate") and payload.get("critique") != "ACCEPTED":
+                    st.caption("The critic rejected this draft, rewriting...")
+                    draft, text = st.empty(), ""
+        draft.empty()
+        return stream.final_state
+
+    try:
+        with use_api_token(hf_api_key), deadline():
+            if init_state is None:
+                final_state = stream_run()
+            else:
+                final_state = article_flight.do(article_request_key(init_state), stream_run)
+        st.session_state.failed_runs.pop("article", None)
+        if trace is None:
+            st.info("The same request was already running, so its result is shown.")
+        if final_state.get("final_abstract"):
+            st.success("Final Abstract:")
+            st.write(final_state["final_abstract"])
+        else:
+            st.warning("No abstract was accepted by the critic.")
+        if trace is not None:
+            show_run_metrics(trace)
+    except Exception as e:
+        handle_failure("article", graph, thread_id, e)
+
+
+def run_web(init_state, config, thread_id):
+    """Stream a webpage summary (init_state=None resumes thread_id); requests for a page already running share its run."""
+    graph = get_web_graph(durable=True)
+    trace = None
+
+    def stream_run():
+        nonlocal trace
+        stream = GraphStream(graph, init_state, config)
+        st.success("Summary:")
+        # Cached summaries arrive without tokens, so fall back to the final state
+        with run_trace("web") as trace:
+            streamed = st.write_stream(stream.tokens())
+        if not streamed:
+            st.write(stream.final_state.get("summary", "No summary available."))
+        return stream.final_state
+
+    try:
+        with use_api_token(hf_api_key), deadline():
+            if init_state is None:
+                stream_run()
+            else:
+                final_state = web_flight.do(web_request_key(init_state), stream_run)
+                if trace is None:
+                    st.info("The same page was already being summarized, so its result is shown.")
+                    st.success("Summary:")
+                    st.write(final_state.get("summary", "No summary available."))
+        st.session_state.failed_runs.pop("web", None)
+        if trace is not None:
+            show_run_metrics(trace)
+    except Exception as e:
+        handle_failure("web", graph, thread_id, e)
+
+
+option = st.selectbox(
+    "Select a task",
+    ["Generate Research Abstract", "Summarize Webpage", "Summarize Multiple Webpages"],
+)
 
 if option == "Generate Research Abstract":
     title = st.text_input("Enter research title")
     category = st.text_input("Enter category")
+    candidates = st.number_input(
+        "Candidate abstracts per round", min_value=1, max_value=5, value=1,
+        help="Above 1, candidates are written and reviewed in parallel and the first accepted one is returned.",
+    )
+    max_iterations = st.number_input("Maximum abstracts to try", min_value=1, max_value=20, value=5)
+    reuse_cached = st.checkbox(
+        "Reuse a cached abstract for the same title and category",
+        help="The writer samples at a high temperature, so its output is only cached when enabled. "
+             "Only abstracts the critic accepted are reused.",
+    )
 
     if st.button("Generate Abstract"):
         if not title or not category:
             st.error("Please enter both title and category.")
         else:
             with st.spinner("Generating abstract..."):
-                init_state = ResearchState(input=title, category=category)
-                try:
-                    final_state = article_graph.invoke(init_state)
-                    if final_state.get("final_abstract"):
-                        st.success("Final Abstract:")
-                        st.write(final_state["final_abstract"])
-                    else:
-                        st.warning("No abstract was accepted by the critic.")
-                except Exception as e:
-                    err_str = str(e)
-                    if CREDITS_EXCEEDED_MSG in err_str:
-                        st.error(CREDITS_EXCEEDED_MSG)
-                    else:
-                        st.error(f"Error: {err_str}")
+                init_state = ResearchState(
+                    input=title, category=category,
+                    candidates=candidates, max_iterations=max_iterations,
+                )
+                config, thread_id = run_config("article", {"configurable": {"cache_writer": reuse_cached}})
+                run_article(init_state, config, thread_id)
+
+    failed_run = st.session_state.failed_runs.get("article")
+    if failed_run and st.button("Resume failed run"):
+        with st.spinner("Resuming abstract generation..."):
+            config, thread_id = run_config("article", {"configurable": {"cache_writer": reuse_cached}}, failed_run)
+            run_article(None, config, thread_id)
 
 elif option == "Summarize Webpage":
     url = st.text_input("Enter URL to summarize")
@@ -70,14 +209,39 @@ elif option == "Summarize Webpage":
             with st.spinner("Summarizing..."):
                 try:
                     init_state = ResearchState(url=url)
-                    final_state = web_graph.invoke(init_state)
-                    st.success("Summary:")
-                    st.write(final_state.get("summary", "No summary available."))
                 except ValidationError as ve:
                     st.error(f"Invalid URL: {ve}")
-                except Exception as e:
-                    err_str = str(e)
-                    if CREDITS_EXCEEDED_MSG in err_str:
-                        st.error(CREDITS_EXCEEDED_MSG)
-                    else:
-                        st.error(f"Error: {err_str}")
\ No newline at end of file
+                else:
+                    config, thread_id = run_config("web")
+                    run_web(init_state, config, thread_id)
+
+    failed_run = st.session_state.failed_runs.get("web")
+    if failed_run and st.button("Resume failed run"):
+        with st.spinner("Resuming..."):
+            config, thread_id = run_config("web", thread_id=failed_run)
+            run_web(None, config, thread_id)
+
+elif option == "Summarize Multiple Webpages":
+    urls_text = st.text_area("Enter URLs to summarize (one per line)")
+
+    if st.button("Summarize All"):
+        urls = [u.strip() for u in urls_text.splitlines() if u.strip()]
+        if not urls:
+            st.error("Please enter at least one URL.")
+        else:
+            from graph_web.batch import summarize_batch
+
+            progress = st.progress(0.0, text=f"Summarizing 0/{len(urls)}...")
+            with use_api_token(hf_api_key):
+                for done, result in enumerate(summarize_batch(urls, ordered=False), start=1):
+                    progress.progress(done / len(urls), text=f"Summarizing {done}/{len(urls)}...")
+                    with st.expander(result.url, expanded=True):
+                        if result.ok:
+                            st.write(result.summary)
+                        elif CREDITS_EXCEEDED_MSG in result.error:
+                            st.error(CREDITS_EXCEEDED_MSG)
+                        else:
+                            st.error(f"Error: {result.error}")
+            progress.empty()
+
+show_cache_stats()
@@ -18,7 +18,7 @@ class _MockResponse:
 
 
 @pytest.fixture(autouse=True)
-def no_real_llm_calls(monkeypatch):
+def no_real_llm_calls(monkeypatch, tmp_path_factory):
     """
     Autouse fixture that prevents real LLM/endpoint calls during tests
     by monkeypatching chain-like objects to return dummy responses.
@@ -81,7 +81,18 @@ def no_real_llm_calls(monkeypatch):
 
         monkeypatch.setattr(lch_mod, "ChatHuggingFace", DummyChat, raising=False)
 
-    # 5) As an extra safe fallback, if modules aren't importable, try to monkeypatch the
+    # 5) Keep the near-duplicate index from reusing summaries across tests
+    monkeypatch.setenv("DEDUP_INDEX", "")
+    # ... and prompt compression from downloading a tokenizer
+    monkeypatch.setenv("COMPRESS_TOKENIZER", "")
+    # ... and the loader from starting a headless browser
+    monkeypatch.setenv("BROWSER_POOL_SIZE", "0")
+    # ... and the on-disk caches from writing outside the test's temp directory
+    monkeypatch.setenv("RESEARCH_CACHE_DIR", str(tmp_path_factory.getbasetemp() / "cache"))
+    monkeypatch.delenv("PAGE_CACHE_DIR", raising=False)
+    monkeypatch.delenv("LLM_CACHE_PATH", raising=False)
+
+    # 6) As an extra safe fallback, if modules aren't importable, try to monkeypatch the
     # dotted names but don't let import errors propagate (monkeypatch.setattr with strings
     # can still try to import — we avoid that by only patching module objects above).
     yield
\ No newline at end of file
@@ -0,0 +1,81 @@
+import json
+
+from graph_article.batch import AbstractJob, JobLedger, iter_abstracts, read_jobs
+
+
+class DummyResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+def patch_chains(mocker, writer_side_effect):
+    mock_writer_chain = mocker.Mock()
+    mock_writer_chain.invoke.side_effect = writer_side_effect
+    mocker.patch("graph_article.writer.writer_chain", mock_writer_chain)
+
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.return_value = DummyResponse("ACCEPTED")
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+    return mock_writer_chain
+
+
+def test_read_jobs_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "jobs.csv"
+    csv_path.write_text("title,category\nFirst,Physics\n,Skipped\nSecond,Biology\n", encoding="utf-8")
+    jsonl_path = tmp_path / "jobs.jsonl"
+    jsonl_path.write_text('{"input": "Third", "category": "Chemistry"}\n\n', encoding="utf-8")
+
+    assert [(j.index, j.title, j.category) for j in read_jobs(csv_path)] == [
+        (0, "First", "Physics"), (1, "Second", "Biology")
+    ]
+    assert [(j.title, j.category) for j in read_jobs(jsonl_path)] == [("Third", "Chemistry")]
+
+
+def test_iter_abstracts_records_results_and_evaluation(mocker, tmp_path):
+    patch_chains(mocker, lambda inputs, **kwargs: DummyResponse(f"A research method for {inputs['input']}"))
+    jobs_path = tmp_path / "jobs.jsonl"
+    jobs_path.write_text("".join(json.dumps({"title": f"T{i}", "category": "C"}) + "\n" for i in range(5)))
+    ledger = JobLedger(str(tmp_path / "ledger.sqlite"))
+
+    results = list(iter_abstracts(read_jobs(jobs_path), max_workers=2, ledger=ledger))
+
+    assert sorted(r.index for r in results) == [0, 1, 2, 3, 4]
+    assert all(r.ok and r.accepted for r in results)
+    assert results[0].evaluation["keywords_present"] == ["research", "method"]
+    assert ledger.counts() == {"done": 5}
+
+
+def test_iter_abstracts_resumes_from_ledger(mocker, tmp_path):
+    def writer(inputs, **kwargs):
+        if inputs["input"] == "T2":
+            raise RuntimeError("out of credits")
+        return DummyResponse("Abstract")
+
+    writer_chain = patch_chains(mocker, writer)
+    jobs_path = tmp_path / "jobs.csv"
+    jobs_path.write_text("title,category\n" + "".join(f"T{i},C\n" for i in range(4)))
+    ledger_path = str(tmp_path / "ledger.sqlite")
+
+    first = list(iter_abstracts(read_jobs(jobs_path), ledger=JobLedger(ledger_path)))
+    assert [r.title for r in first if not r.ok] == ["T2"]
+
+    writer_chain.invoke.reset_mock()
+    writer_chain.invoke.side_effect = lambda inputs, **kwargs: DummyResponse("Abstract")
+    ledger = JobLedger(ledger_path)
+    second = list(iter_abstracts(read_jobs(jobs_path), ledger=ledger))
+
+    assert [r.title for r in second] == ["T2"]
+    assert writer_chain.invoke.call_count == 1
+    assert ledger.counts() == {"done": 4}
+
+
+def test_iter_abstracts_stops_after_consecutive_failures(mocker):
+    patch_chains(mocker, RuntimeError("credits exhausted"))
+    jobs = [AbstractJob(i, f"T{i}", "C") for i in range(20)]
+
+    results = list(iter_abstracts(jobs, max_workers=1, max_failures=3))
+
+    # Nothing is started after the third failure; of the 2 * max_workers jobs
+    # queued then, at most the one other still finishes
+    assert len(results) in (3, 4)
+    assert not any(r.ok for r in results)
@@ -0,0 +1,52 @@
+import asyncio
+from graph_article.graph_article import article_graph
+from graph_web.summarizer import asummarize_node
+from shared import ResearchState
+from utils.retry import async_retry
+
+
+class DummyResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+def test_article_graph_ainvoke(mocker):
+    mock_writer_chain = mocker.Mock()
+    mock_writer_chain.ainvoke = mocker.AsyncMock(return_value=DummyResponse("Async abstract"))
+    mocker.patch("graph_article.writer.writer_chain", mock_writer_chain)
+
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.ainvoke = mocker.AsyncMock(return_value=DummyResponse("ACCEPTED"))
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+    init_state = ResearchState(input="Title", category="Category")
+    final_state = asyncio.run(article_graph.ainvoke(init_state))
+
+    assert final_state["final_abstract"] == "Async abstract"
+    mock_writer_chain.invoke.assert_not_called()
+
+
+def test_asummarize_node(mocker):
+    mock_chain = mocker.Mock()
+    mock_chain.ainvoke = mocker.AsyncMock(return_value=DummyResponse("Async summary"))
+    mocker.patch("graph_web.summarizer.summarize_chain", mock_chain)
+
+    result = asyncio.run(asummarize_node(ResearchState(content="Some content")))
+    assert result["summary"] == "Async summary"
+
+
+def test_async_retry_backs_off_without_blocking(mocker):
+    sleep = mocker.patch("utils.retry.asyncio.sleep", mocker.AsyncMock())
+    # Full jitter waits uniform(0, ceiling); pin it to the ceiling of the schedule
+    mocker.patch("utils.retry.random.uniform", side_effect=lambda low, high: high)
+    calls = {"count": 0}
+
+    @async_retry((TimeoutError,), tries=3, delay=1)
+    async def flaky():
+        calls["count"] += 1
+        if calls["count"] < 3:
+            raise TimeoutError("slow")
+        return "ok"
+
+    assert asyncio.run(flaky()) == "ok"
+    assert [c.args[0] for c in sleep.await_args_list] == [1, 2]
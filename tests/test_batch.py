@@ -0,0 +1,43 @@
+import time
+from graph_web.batch import read_urls, summarize_batch
+
+URLS = [f"https://example.com/{i}" for i in range(6)]
+
+
+def fake_load_node(state):
+    # Later URLs finish first so ordering is actually exercised
+    time.sleep(0.01 * (6 - int(str(state.url).rsplit("/", 1)[1])))
+    return {"content": f"content of {state.url}"}
+
+
+def fake_summarize_node(state):
+    if state.url and str(state.url).endswith("/3"):
+        raise RuntimeError("model down")
+    return {"summary": f"summary of {state.content}"}
+
+
+def test_summarize_batch_in_order(mocker):
+    mocker.patch("graph_web.batch.load_node", fake_load_node)
+    mocker.patch("graph_web.batch.summarize_node", fake_summarize_node)
+
+    results = list(summarize_batch(URLS, max_fetch=3, max_summarize=2))
+
+    assert [r.index for r in results] == list(range(6))
+    assert results[0].summary == "summary of content of https://example.com/0"
+    assert not results[3].ok and results[3].error == "model down"
+
+
+def test_summarize_batch_as_completed(mocker):
+    mocker.patch("graph_web.batch.load_node", fake_load_node)
+    mocker.patch("graph_web.batch.summarize_node", fake_summarize_node)
+
+    results = list(summarize_batch(URLS, max_fetch=6, max_summarize=6, ordered=False))
+
+    assert sorted(r.index for r in results) == list(range(6))
+    assert results[0].index != 0
+
+
+def test_read_urls(tmp_path):
+    path = tmp_path / "urls.txt"
+    path.write_text("# comment\nhttps://a.com\n\n  https://b.com  \n")
+    assert read_urls(path) == ["https://a.com", "https://b.com"]
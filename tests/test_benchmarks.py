@@ -0,0 +1,53 @@
+import pytest
+import requests
+from langchain_huggingface.chat_models.huggingface import ChatHuggingFace
+
+from benchmarks.bench_graphs import percentile
+from benchmarks.servers import CorpusServer, MockInferenceServer
+from utils import models
+
+
+@pytest.fixture
+def endpoint_models(monkeypatch):
+    """Real ChatHuggingFace clients (conftest stubs the class out) built fresh for each test."""
+    monkeypatch.setattr("langchain_huggingface.ChatHuggingFace", ChatHuggingFace)
+    models.clear_model_cache()
+    yield
+    models.clear_model_cache()
+
+
+def test_chat_model_talks_to_mock_endpoint(endpoint_models, monkeypatch):
+    with MockInferenceServer(latency=0, tokens_per_second=10_000, max_tokens=5) as server:
+        monkeypatch.setenv("LLM_ENDPOINT_URL", server.url)
+        model = models.get_chat_model("repo/model", {"temperature": 0.1}, token="hf_test")
+
+        reply = model.invoke("Write something")
+        streamed = "".join(chunk.content for chunk in model.stream("Write something"))
+        verdict = model.invoke("Review this. Respond with 'ACCEPTED' or 'REJECTED'.")
+
+    assert len(reply.content.split()) == 5
+    assert len(streamed.split()) == 5
+    assert verdict.content == "ACCEPTED"
+    assert server.stats["requests"] == 3
+
+
+def test_mock_endpoint_injects_errors(endpoint_models, monkeypatch):
+    with MockInferenceServer(latency=0, error_rate=1.0, error_status=(503,)) as server:
+        monkeypatch.setenv("LLM_ENDPOINT_URL", server.url)
+        model = models.get_chat_model("repo/model", {}, token="hf_test")
+        with pytest.raises(Exception):
+            model.invoke("Write something")
+    assert server.stats["errors_503"] >= 1
+
+
+def test_corpus_server_serves_pages():
+    with CorpusServer({"page": "<html><body>Hello</body></html>"}) as server:
+        assert requests.get(server.url_for("page"), timeout=5).text == "<html><body>Hello</body></html>"
+        assert requests.get(server.url_for("missing"), timeout=5).status_code == 404
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from graph_web.browser_pool import BrowserPool, BrowserUnavailable
+from graph_web.loader_deployment import FetchedPage, load_node, needs_browser
+from shared import ResearchState
+
+SHELL = '<html><head><title>App</title><script src="/app.js"></script></head><body><div id="root"></div></body></html>'
+RENDERED = "<html><body>" + "".join(f'<div class="html-p">Rendered paragraph {i} of the article.</div>' for i in range(5))
+
+
+class FakeDriver:
+    def __init__(self, log):
+        self.log = log
+        self.page_source = ""
+        log.append("start")
+
+    def get(self, url):
+        time.sleep(0.02)
+        self.page_source = RENDERED
+
+    def execute_script(self, script):
+        return "complete"
+
+    def quit(self):
+        self.log.append("quit")
+
+
+def make_pool(log, **kwargs):
+    return BrowserPool(driver_factory=lambda: FakeDriver(log), **kwargs)
+
+
+def test_pool_reuses_a_bounded_number_of_browsers():
+    log = []
+    pool = make_pool(log, size=2)
+    busy, peak, lock = [0], [0], threading.Lock()
+
+    def render(i):
+        with pool.browser() as driver:
+            with lock:
+                busy[0] += 1
+                peak[0] = max(peak[0], busy[0])
+            driver.get(f"https://example.com/{i}")
+            with lock:
+                busy[0] -= 1
+
+    with ThreadPoolExecutor(6) as executor:
+        list(executor.map(render, range(12)))
+
+    assert peak[0] <= 2
+    assert log.count("start") <= 2 and pool.alive == log.count("start")
+    pool.shutdown()
+    assert log.count("quit") == log.count("start") and pool.alive == 0
+    with pytest.raises(BrowserUnavailable):
+        pool.render("https://example.com/")
+
+
+def test_browsers_are_recycled_after_max_pages_and_over_the_memory_cap(mocker):
+    log = []
+    pool = make_pool(log, size=1, max_pages=2)
+    for i in range(5):
+        assert "Rendered paragraph" in pool.render(f"https://example.com/{i}")
+    assert log == ["start", "quit", "start", "quit", "start"]
+
+    log.clear()
+    pool = make_pool(log, size=1, max_rss_mb=100)
+    mocker.patch("graph_web.browser_pool.process_tree_rss", return_value=200 * 2 ** 20)
+    pool.render("https://example.com/a")
+    pool.render("https://example.com/b")
+    assert log == ["start", "quit", "start", "quit"]
+
+
+def test_busy_pool_times_out():
+    release = threading.Event()
+    pool = make_pool([], size=1, acquire_timeout=0.05)
+
+    def hold():
+        with pool.browser():
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while pool.alive == 0:
+        time.sleep(0.01)
+    with pytest.raises(BrowserUnavailable):
+        pool.render("https://example.com/")
+    release.set()
+    holder.join()
+
+
+def test_loader_renders_only_javascript_shells(mocker):
+    log = []
+    pool = make_pool(log, size=1)
+    mocker.patch("graph_web.loader_deployment.get_browser_pool", return_value=pool)
+    mocker.patch("graph_web.loader_deployment.get_page_cache", return_value=None)
+    fetch = mocker.patch("graph_web.loader_deployment._fetch_page",
+                         return_value=FetchedPage(200, {}, SHELL, "App", "visible"))
+
+    content = load_node(ResearchState(url="https://example.com/app"))["content"]
+    assert content.startswith("Rendered paragraph 0 of the article.")
+    assert log == ["start"]
+
+    # An article title from the static page is a complete result, however short
+    fetch.return_value = FetchedPage(200, {}, SHELL, "Short title", "h1")
+    assert load_node(ResearchState(url="https://example.com/title"))["content"] == "Short title"
+    assert not needs_browser(FetchedPage(200, {}, "<html><body>No scripts</body></html>", "No scripts", "visible"))
+    assert log == ["start"]
@@ -0,0 +1,46 @@
+import pytest
+
+from graph_article.graph_article import get_article_graph
+from shared import ResearchState
+from utils.checkpoint import can_resume, graph_name_of, new_thread_id, thread_config
+
+
+class DummyResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+@pytest.fixture
+def checkpoint_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_DB", str(tmp_path / "checkpoints.sqlite"))
+
+
+def test_durable_graph_is_plain_without_checkpoint_db(monkeypatch):
+    monkeypatch.delenv("CHECKPOINT_DB", raising=False)
+    assert get_article_graph(durable=True) is get_article_graph()
+    assert get_article_graph().checkpointer is None
+
+
+def test_failed_run_resumes_without_rewriting(mocker, checkpoint_db):
+    mock_writer_chain = mocker.Mock()
+    mock_writer_chain.invoke.return_value = DummyResponse("Test abstract")
+    mocker.patch("graph_article.writer.writer_chain", mock_writer_chain)
+
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.side_effect = [RuntimeError("endpoint down"), DummyResponse("ACCEPTED")]
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+    graph = get_article_graph(durable=True)
+    thread_id = new_thread_id("article")
+    config = thread_config(thread_id)
+
+    with pytest.raises(RuntimeError):
+        graph.invoke(ResearchState(input="Title", category="Category"), config)
+    assert can_resume(graph, thread_id)
+
+    final_state = graph.invoke(None, config)
+
+    assert final_state["final_abstract"] == "Test abstract"
+    assert mock_writer_chain.invoke.call_count == 1
+    assert not can_resume(graph, thread_id)
+    assert graph_name_of(thread_id) == "article"
@@ -0,0 +1,96 @@
+from graph_web import graph_web
+from graph_web.compress import compress, compress_node
+from shared import ResearchState
+
+INTRO = "Graph neural networks learn molecular representations directly from atoms and bonds."
+METHOD = "Our model propagates messages along chemical bonds and pools atom embeddings into molecule vectors."
+RESULT = "Experiments on eight benchmark datasets show consistent accuracy gains over descriptor baselines."
+
+PAGE = "\n\n".join([
+    "Home > Journals > Molecules > Volume 12",
+    "Introduction",
+    f"{INTRO} Click here.",
+    "Figure 2. Validation loss of every model during training on the benchmark datasets.",
+    f"{METHOD} {INTRO}",
+    "Results",
+    RESULT,
+    "Share This Article On Twitter Facebook Or LinkedIn Today",
+    "Acknowledgments",
+    "We thank the anonymous reviewers and the computing center for their generous support of this work.",
+    "References",
+    "1. Smith, J.; Doe, A. Message passing for chemistry. J. Chem. Inf. 2020, 5, 123-130.",
+    "2. Lee, K. Molecular graphs revisited. Nature Chem. 2019; 11(3): 45-52. doi:10.1000/xyz",
+])
+
+
+def words(texts):
+    return [len(t.split()) for t in texts]
+
+
+def test_compress_drops_boilerplate_back_matter_and_duplicates():
+    result = compress(PAGE, max_tokens=0, counter=words)
+
+    assert result.text == f"{INTRO}\n\n{METHOD}\n\n{RESULT}"
+    assert result.tokens_before == len(PAGE.split())
+    assert result.tokens_after == len(result.text.split())
+    assert result.ratio < 0.4
+
+
+def test_unstructured_text_loses_its_reference_list():
+    text = f"{INTRO} {METHOD} References [1] Smith, J. Message passing. J. Chem. 2020, 5, 123. [2] Lee, K. 2019; 11(3): 45."
+
+    assert compress(text, max_tokens=0, counter=words).text == f"{INTRO} {METHOD}"
+
+
+def test_budget_keeps_the_most_salient_sentences_in_page_order():
+    filler = "Weather forecasts mention sunshine tomorrow across coastal towns nearby."
+    text = " ".join([INTRO, filler, METHOD, "Graph networks improve molecular property prediction accuracy.", RESULT])
+
+    result = compress(text, max_tokens=30, counter=words)
+
+    assert result.tokens_after <= 30
+    assert filler not in result.text
+    assert result.text.startswith(INTRO)
+
+
+def test_no_budget_by_default(monkeypatch):
+    monkeypatch.delenv("COMPRESS_MAX_TOKENS", raising=False)
+    properties = ["solubility", "toxicity", "binding", "stability", "permeability", "synthesis", "charge", "polarity"]
+    settings = ["aqueous", "organic", "crystal", "protein", "membrane", "polymer", "catalytic", "gaseous"]
+    scales = ["small", "large", "noisy", "sparse", "dense", "public", "private", "synthetic"]
+    text = "\n\n".join(f"Graph models predict molecular {p} from atoms in {s} settings on {d} datasets."
+                         for p in properties for s in settings for d in scales)
+
+    result = compress(text, counter=words)
+    assert result.tokens_before > 5000 and result.text == text
+
+
+def test_tokenizers_are_cached_per_api_token_and_only_once_loaded(mocker):
+    from graph_web import compress as compress_module
+    from utils.models import use_api_token
+
+    loaded = mocker.Mock(name="tokenizer")
+    from_pretrained = mocker.patch("tokenizers.Tokenizer.from_pretrained", side_effect=[OSError("offline"), loaded, loaded])
+    mocker.patch.dict(compress_module._tokenizers, clear=True)
+
+    with use_api_token("key-a"):
+        assert compress_module._load_tokenizer("org/tokenizer") is None
+        assert compress_module._load_tokenizer("org/tokenizer") is loaded
+        assert compress_module._load_tokenizer("org/tokenizer") is loaded
+    with use_api_token("key-b"):
+        assert compress_module._load_tokenizer("org/tokenizer") is loaded
+    assert [c.kwargs["token"] for c in from_pretrained.call_args_list] == ["key-a", "key-a", "key-b"]
+
+
+def test_web_graph_summarizes_the_compressed_page(mocker):
+    mocker.patch("graph_web.graph_web.load_node", return_value={"content": PAGE})
+    summarize = mocker.patch("graph_web.graph_web.summarize_node", return_value={"summary": "summary"})
+    graph_web._compile.cache_clear()
+    try:
+        graph_web.get_web_graph().invoke(ResearchState(url="https://example.com/paper"))
+    finally:
+        graph_web._compile.cache_clear()
+
+    content = summarize.call_args.args[0].content
+    assert INTRO in content and "References" not in content and "Smith" not in content
+    assert compress_node(ResearchState(content="No content")) == {}
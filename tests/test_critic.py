@@ -1,5 +1,9 @@
 import pytest
+from langchain_core.messages import AIMessage
+
 from graph_article.critic import critic_node
+from graph_article.prescreen import prescreen
+from shared import ResearchState
 
 @pytest.mark.parametrize(
     "mock_content,expected_abstract",
@@ -23,4 +27,60 @@ def test_critic_node(mock_content, expected_abstract, mocker):
 
     result = critic_node(DummyState())
     assert result["critique"] == mock_content
-    assert result["final_abstract"] == expected_abstract
\ No newline at end of file
+    assert result["final_abstract"] == expected_abstract
+
+TITLE = "Graph neural networks for molecule property prediction"
+ON_TOPIC = (
+    "We study graph neural networks that predict molecular properties from structure. "
+    "Our method encodes each molecule as a graph of atoms and bonds, learns message passing "
+    "representations, and improves prediction accuracy on standard benchmarks while reducing "
+    "training cost compared with previous approaches."
+)
+
+
+@pytest.mark.parametrize(
+    "abstract",
+    [
+        "",
+        " ... ",
+        "Generate an abstract for the paper titled 'Graph neural networks' in the domain of chemistry.",
+        f"'{TITLE}'",
+        # As long as the writer's token limit and cut off mid-sentence
+        (ON_TOPIC + " ") * 3 + "Furthermore the model",
+        # Long enough to judge, but about something else entirely
+        " ".join(["The recipe combines butter, sugar and flour into a soft dough."] * 4),
+    ],
+)
+def test_prescreen_rejects_without_calling_the_critic(abstract, mocker):
+    mock_chain = mocker.Mock()
+    mocker.patch("graph_article.critic.critic_chain", mock_chain)
+
+    result = critic_node(ResearchState(input=TITLE, category="Chemistry", abstract=abstract))
+
+    assert result == {"critique": "REJECTED", "final_abstract": None}
+    mock_chain.invoke.assert_not_called()
+
+
+@pytest.mark.parametrize("abstract", [ON_TOPIC, "A short abstract without a topic check"])
+def test_plausible_abstracts_reach_the_critic(abstract, mocker):
+    mock_chain = mocker.Mock()
+    mock_chain.invoke.return_value = AIMessage(content="ACCEPTED")
+    mocker.patch("graph_article.critic.critic_chain", mock_chain)
+
+    result = critic_node(ResearchState(input=TITLE, category="Chemistry", abstract=abstract))
+
+    assert result["final_abstract"] == abstract
+    mock_chain.invoke.assert_called_once()
+
+
+def test_embedding_similarity_check(mocker, monkeypatch):
+    monkeypatch.setenv("CRITIC_EMBEDDING_MODEL", "some/embedder")
+    similarity = mocker.patch("graph_article.prescreen.topic_similarity", return_value=0.05)
+    state = ResearchState(input=TITLE, category="Chemistry", abstract=ON_TOPIC)
+
+    assert prescreen(state) == "off-topic"
+    similarity.assert_called_once_with(ON_TOPIC, f"{TITLE} (Chemistry)", "some/embedder")
+    similarity.return_value = 0.6
+    assert prescreen(state) is None
+    monkeypatch.setenv("CRITIC_PRESCREEN", "0")
+    assert prescreen(state.model_copy(update={"abstract": ""})) is None
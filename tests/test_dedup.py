@@ -0,0 +1,59 @@
+import random
+
+from graph_web.dedup import DedupIndex, hamming, simhash
+from graph_web import graph_web
+from shared import ResearchState
+from utils.urls import canonical_url
+
+rng = random.Random(0)
+VOCAB = [f"word{i}" for i in range(500)]
+ARTICLE = " ".join(rng.choice(VOCAB) for _ in range(400))
+# The same article with a different header line, as on a mirror or an /htm view
+MIRROR = "Full text view. " + ARTICLE + " Download PDF"
+OTHER = " ".join(rng.choice(VOCAB) for _ in range(400))
+
+
+def test_canonical_url_collapses_variants():
+    base = "https://www.mdpi.com/2076-3417/11/20/9772"
+    for variant in (base + "/htm", base + "/pdf", base + "/", base + "?utm_source=x&utm_medium=email",
+                    "HTTPS://www.MDPI.com/2076-3417/11/20/9772/htm#sec1"):
+        assert canonical_url(variant) == base
+    assert canonical_url("https://a.com/x?id=3&fbclid=9") == "https://a.com/x?id=3"
+
+
+def test_simhash_is_close_for_near_duplicates():
+    assert hamming(simhash(ARTICLE), simhash(MIRROR)) <= 3
+    assert hamming(simhash(ARTICLE), simhash(OTHER)) > 10
+
+
+def test_index_finds_near_duplicates_and_persists(tmp_path):
+    index = DedupIndex(tmp_path / "dedup.sqlite")
+    assert index.add("https://www.mdpi.com/1/2/3/htm?utm_source=x", ARTICLE, "stored summary")
+    assert not index.add("https://a.com/short", "too short", "summary")
+
+    reopened = DedupIndex(tmp_path / "dedup.sqlite")
+    match = reopened.find(MIRROR)
+    assert match.summary == "stored summary"
+    assert match.url == "https://www.mdpi.com/1/2/3"
+    assert reopened.find(OTHER) is None
+
+    # An updated page replaces its entry rather than adding one
+    reopened.add("https://www.mdpi.com/1/2/3/pdf", OTHER, "new summary")
+    assert len(reopened) == 1
+
+
+def test_web_graph_reuses_summary_of_duplicate(tmp_path, mocker):
+    index = DedupIndex(tmp_path / "dedup.sqlite")
+    mocker.patch("graph_web.dedup.get_dedup_index", return_value=index)
+    pages = {"https://example.com/a": ARTICLE, "https://mirror.example.org/a/htm": MIRROR}
+    mocker.patch("graph_web.graph_web.load_node", lambda state: {"content": pages[str(state.url)]})
+    summarize = mocker.patch("graph_web.graph_web.summarize_node", return_value={"summary": "fresh summary"})
+    graph_web._compile.cache_clear()
+
+    graph = graph_web.get_web_graph()
+    first = graph.invoke(ResearchState(url="https://example.com/a"))
+    second = graph.invoke(ResearchState(url="https://mirror.example.org/a/htm"))
+
+    assert first["summary"] == second["summary"] == "fresh summary"
+    assert summarize.call_count == 1
+    graph_web._compile.cache_clear()
@@ -0,0 +1,47 @@
+import numpy as np
+
+from utils.evaluation import KeywordMatcher, evaluate_abstract, evaluate_abstracts
+
+
+def test_evaluate_abstract_keeps_default_keywords():
+    result = evaluate_abstract("Our research method shows results. In conclusion, it works.")
+
+    assert result["word_count"] == 9
+    assert result["keyword_match_score"] == 4
+    assert result["keywords_present"] == ["research", "method", "result", "conclusion"]
+    assert result["sentence_count"] == 2
+    assert 0 < result["flesch_reading_ease"] < 100
+
+
+def test_matcher_respects_word_boundaries_and_prefixes():
+    matcher = KeywordMatcher(["method", "net*", "neural network", "he"])
+    counts = matcher.count([
+        "Methodology is not a method. The Neural\nnetwork: networks, nets.",
+        "",
+        "the hero said he",
+    ])
+
+    assert matcher.terms == ["method", "net", "neural network", "he"]
+    assert counts.tolist() == [[1, 3, 1, 0], [0, 0, 0, 0], [0, 0, 0, 1]]
+
+
+def test_phrases_do_not_span_abstracts():
+    counts = KeywordMatcher(["neural network"]).count(["a neural", "network b"])
+    assert counts.tolist() == [[0], [0]]
+
+
+def test_batch_matches_one_at_a_time():
+    keywords = ["deep learning", "model*", "data", "graph*"]
+    abstracts = [
+        "Deep learning models need data.",
+        "Graphs and graph neural models.",
+        "Nothing to see here",
+        "DATA data Data; deep-learning!",
+    ]
+    batch = evaluate_abstracts(abstracts, keywords)
+
+    assert batch.keyword_hits.shape == (4, 4)
+    assert batch.keyword_hits[3].tolist() == [1, 0, 3, 0]
+    for i, abstract in enumerate(abstracts):
+        assert batch.row(i) == evaluate_abstract(abstract, keywords)
+    assert isinstance(batch.columns()["word_count"], np.ndarray)
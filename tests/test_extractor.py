@@ -0,0 +1,41 @@
+from graph_web.extractor import StreamingExtractor, extract_text
+
+PAGE = """<!DOCTYPE html><html><head><title>Page</title><style>.x{}</style></head><body>
+<header>Site navigation</header>
+<h2 id="html-abstract-title">Abstract <script>track();</script>heading</h2>
+<div class="html-p">First <b>bold</b> paragraph.</div>
+<div class="html-p">Second paragraph.</div>
+<footer>Footer text</footer>
+</body></html>"""
+
+
+def test_priority_order():
+    title = '<h1 class="title hypothesis_container">Paper <i>title</i></h1>'
+    assert extract_text(PAGE.replace("<header>", title + "<header>")) == "Paper title"
+    assert extract_text(PAGE) == "Abstract heading"
+    paragraphs_only = PAGE.replace('id="html-abstract-title"', "")
+    assert extract_text(paragraphs_only) == "First bold paragraph.\n\nSecond paragraph."
+
+
+def test_visible_text_fallback_skips_invisible_tags():
+    html = "<html><head><title>T</title></head><body><header>nav</header><p>Body &amp; text</p>" \
+           "<script>var a;</script><footer>foot</footer></body></html>"
+    assert extract_text(html) == "T Body & text"
+    assert extract_text("<html><body><script>x</script></body></html>") == "No content"
+
+
+def test_streaming_feed_stops_once_result_is_final():
+    html = ('<h1 class="title hypothesis_container">Title</h1>' + "<p>filler</p>" * 10_000).encode()
+    extractor = StreamingExtractor(max_chars=1000)
+    fed = 0
+    for start in range(0, len(html), 256):
+        fed += 1
+        if extractor.feed(html[start:start + 256]):
+            break
+    assert extractor.close() == "Title"
+    assert fed * 256 < len(html)
+
+
+def test_max_chars_bounds_output():
+    html = "<div class='html-p'>" + "word " * 10_000 + "</div>"
+    assert len(extract_text(html, max_chars=100)) == 100
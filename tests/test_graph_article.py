@@ -48,3 +48,107 @@ def test_article_graph_reject_then_accept(mocker):
 
     assert final_state["final_abstract"] == "Test abstract" or final_state["final_abstract"] == "Final abstract"
     assert final_state["critique"] == "ACCEPTED"
+
+
+def test_article_graph_stops_after_max_iterations(mocker):
+    mock_writer_chain = mocker.Mock()
+    mock_writer_chain.invoke.return_value = DummyResponse("Test abstract")
+    mocker.patch("graph_article.writer.writer_chain", mock_writer_chain)
+
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.return_value = DummyResponse("REJECTED")
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+    init_state = ResearchState(input="Title", category="Category", max_iterations=3)
+    final_state = article_graph.invoke(init_state)
+
+    assert final_state["final_abstract"] is None
+    assert final_state["iterations"] == 3
+    assert mock_writer_chain.invoke.call_count == 3
+
+
+def test_article_graph_speculative_returns_first_accepted(mocker):
+    drafts = iter(["Draft 1", "Draft 2", "Draft 3"])
+    mock_writer_chain = mocker.Mock()
+    mock_writer_chain.invoke.side_effect = lambda *a, **kw: DummyResponse(next(drafts))
+    mocker.patch("graph_article.writer.writer_chain", mock_writer_chain)
+
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.side_effect = lambda inputs: DummyResponse(
+        "ACCEPTED" if inputs["abstract"] == "Draft 2" else "REJECTED"
+    )
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+    init_state = ResearchState(input="Title", category="Category", candidates=3)
+    final_state = article_graph.invoke(init_state)
+
+    assert final_state["final_abstract"] == "Draft 2"
+    assert final_state["critique"] == "ACCEPTED"
+    assert final_state["iterations"] == 3
+
+
+def test_cached_writer_never_serves_a_rejected_draft(mocker):
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+    from utils.llm_cache import CachedChain, InMemoryLLMCache
+
+    drafts = iter(f"Draft {i}" for i in range(1, 10))
+    writer_chain = CachedChain("writer", "{input} {category}", RunnableLambda(lambda _: AIMessage(content=next(drafts))),
+                               "repo/writer", {}, cache_by_default=True, cache=InMemoryLLMCache())
+    mocker.patch("graph_article.writer.writer_chain", writer_chain)
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.side_effect = lambda inputs: DummyResponse(
+        "ACCEPTED" if inputs["abstract"] == "Draft 2" else "REJECTED"
+    )
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+    # The rewrite after a rejection is a fresh draft, not the cached first one
+    first = article_graph.invoke(ResearchState(input="Title", category="Category"))
+    assert first["final_abstract"] == "Draft 2" and first["iterations"] == 2
+
+    # Accepted drafts stay cached ...
+    again = article_graph.invoke(ResearchState(input="Title", category="Category"))
+    assert again["final_abstract"] == "Draft 2" and again["iterations"] == 1
+
+    # ... rejected ones are evicted
+    writer_chain.evict({"input": "Title", "category": "Category"})
+    rejected = article_graph.invoke(ResearchState(input="Title", category="Category", max_iterations=1))
+    assert rejected["abstract"] == "Draft 3" and rejected["final_abstract"] is None
+    retried = article_graph.invoke(ResearchState(input="Title", category="Category", max_iterations=1))
+    assert retried["abstract"] == "Draft 4"
+
+
+def test_speculative_losers_stop_before_the_critic(mocker):
+    import itertools
+    import threading
+    from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+    pools = []
+    mocker.patch("graph_article.speculative.ContextThreadPoolExecutor",
+                 side_effect=lambda **kw: pools.append(ContextThreadPoolExecutor(**kw)) or pools[-1])
+    release, calls, writing = threading.Event(), itertools.count(1), threading.Barrier(3, timeout=5)
+
+    def write(*args, **kwargs):
+        i = next(calls)
+        writing.wait()
+        if i > 1:
+            # Still writing when the first candidate is accepted
+            assert release.wait(5)
+        return DummyResponse(f"Draft {i}")
+
+    mock_writer_chain = mocker.Mock()
+    mock_writer_chain.invoke.side_effect = write
+    mocker.patch("graph_article.writer.writer_chain", mock_writer_chain)
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.return_value = DummyResponse("ACCEPTED")
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+    try:
+        final_state = article_graph.invoke(ResearchState(input="Title", category="Category", candidates=3))
+    finally:
+        release.set()
+        pools[0].shutdown(wait=True)
+
+    assert final_state["final_abstract"] == "Draft 1"
+    assert mock_writer_chain.invoke.call_count == 3
+    mock_critic_chain.invoke.assert_called_once()
@@ -0,0 +1,36 @@
+import asyncio
+
+from graph_web.http_client import HostRateLimiter, TokenBucket, _limited, get_async_fetch_client
+
+
+def test_token_bucket_allows_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=10, burst=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.08 < waits[2] < 0.11
+    assert 0.18 < waits[3] < 0.21
+
+
+def test_rate_limiter_is_per_host():
+    limiter = HostRateLimiter(rate=1, burst=1)
+    assert limiter.reserve("https://www.mdpi.com/a") == 0.0
+    assert limiter.reserve("https://example.com/a") == 0.0
+    assert limiter.reserve("https://WWW.mdpi.com/b") > 0.9
+    assert HostRateLimiter(rate=0, burst=1).reserve("https://a.com") == 0.0
+
+
+def test_body_is_capped_at_max_bytes():
+    chunks = [b"a" * 40, b"b" * 40, b"c" * 40]
+    assert b"".join(_limited(iter(chunks), 100, "https://a.com")) == b"a" * 40 + b"b" * 40 + b"c" * 20
+
+
+def test_async_client_is_closed_when_its_loop_ends():
+    async def use():
+        client = get_async_fetch_client()
+        assert get_async_fetch_client() is client
+        return client
+
+    first = asyncio.run(use())
+    assert first.client.is_closed
+    second = asyncio.run(use())
+    assert second is not first and second.client.is_closed
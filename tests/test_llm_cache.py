@@ -0,0 +1,66 @@
+from langchain_core.prompts import PromptTemplate
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from utils.llm_cache import CachedChain, InMemoryLLMCache, SQLiteLLMCache, make_key
+
+PROMPT = PromptTemplate.from_template("Summarize: {content}")
+
+
+def make_chain(cache, calls, **kwargs):
+    def fake_model(prompt_value):
+        calls.append(prompt_value.to_string())
+        return AIMessage(content=f"response {len(calls)}")
+
+    return CachedChain("test", PROMPT, RunnableLambda(fake_model), "repo/model",
+                       {"temperature": 0.1}, cache=cache, **kwargs)
+
+
+def test_cached_chain_hits_on_identical_prompt():
+    cache, calls = InMemoryLLMCache(), []
+    chain = make_chain(cache, calls)
+
+    first = chain.invoke({"content": "abc"})
+    second = chain.invoke({"content": "abc"})
+    chain.invoke({"content": "other"})
+
+    assert first.content == second.content == "response 1"
+    assert len(calls) == 2
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+
+def test_cached_chain_opt_in_through_run_config():
+    cache, calls = InMemoryLLMCache(), []
+    chain = make_chain(cache, calls, cache_by_default=False)
+    runner = RunnableLambda(lambda inputs: chain.invoke(inputs))
+
+    runner.invoke({"content": "abc"})
+    runner.invoke({"content": "abc"})
+    assert len(calls) == 2
+
+    opt_in = {"configurable": {"cache_test": True}}
+    runner.invoke({"content": "abc"}, config=opt_in)
+    runner.invoke({"content": "abc"}, config=opt_in)
+    assert len(calls) == 3
+
+
+def test_key_depends_on_model_and_kwargs():
+    base = make_key("repo/a", {"temperature": 0.1}, "prompt")
+    assert base == make_key("repo/a", {"temperature": 0.1}, "prompt")
+    assert base != make_key("repo/b", {"temperature": 0.1}, "prompt")
+    assert base != make_key("repo/a", {"temperature": 0.2}, "prompt")
+
+
+def test_in_memory_cache_is_bounded():
+    cache = InMemoryLLMCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+
+def test_sqlite_cache_persists(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    SQLiteLLMCache(path).put("k", "value")
+    assert SQLiteLLMCache(path).get("k") == "value"
@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from utils import local_llm, models
+from utils.local_llm import BatchingEngine, LocalChatModel, LocalQueueFull, generation_kwargs
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+
+class CharTokenizer:
+    """One token per character; 0 pads, 1 starts, 2 ends."""
+
+    pad_token_id = 0
+    eos_token_id = 2
+    chat_template = None
+
+    def __call__(self, text, add_special_tokens=True):
+        ids = [3 + ord(c) % 61 for c in text]
+        return {"input_ids": ([1] if add_special_tokens else []) + ids}
+
+    def decode(self, ids, skip_special_tokens=False):
+        return "".join(chr(ord("a") + i % 26) for i in ids if not (skip_special_tokens and i < 3))
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=512,
+        pad_token_id=0, bos_token_id=1, eos_token_id=2,
+    )
+    return transformers.LlamaForCausalLM(config).eval()
+
+
+@pytest.fixture
+def engine(tiny_model):
+    engine = BatchingEngine(tiny_model, CharTokenizer(), max_batch=8, max_wait=0.2, min_prefix=8)
+    yield engine
+    engine.close()
+
+
+GREEDY = {"max_new_tokens": 6, "do_sample": False}
+PROMPTS = [f"Summarize the following content concisely: {topic}" for topic in ("cats", "graph theory", "x")]
+
+
+def reference(model, prompt):
+    ids = torch.tensor([CharTokenizer()(prompt)["input_ids"]])
+    output = model.generate(ids, attention_mask=torch.ones_like(ids), pad_token_id=0, **GREEDY)
+    return CharTokenizer().decode(output[0, ids.shape[1]:].tolist(), skip_special_tokens=True)
+
+
+def test_generation_kwargs_drop_endpoint_only_settings():
+    assert generation_kwargs({"max_new_tokens": 5, "max_length": 100, "temperature": 0.1, "timeout": 120}) == {
+        "max_new_tokens": 5, "temperature": 0.1, "do_sample": True,
+    }
+    assert generation_kwargs({"temperature": 0, "top_p": 0.9}) == {"max_new_tokens": 256, "do_sample": False}
+
+
+def test_concurrent_requests_are_batched_over_a_shared_prefix(engine, tiny_model, mocker):
+    generate = mocker.spy(tiny_model, "generate")
+
+    with ThreadPoolExecutor(len(PROMPTS)) as pool:
+        results = list(pool.map(lambda p: engine.generate(p, GREEDY, timeout=30), PROMPTS))
+
+    # One generate call for the batch, and the same text as running each prompt alone
+    assert generate.call_count == 1
+    assert [text for text, *_ in results] == [reference(tiny_model, p) for p in PROMPTS]
+    prefix = len(CharTokenizer()("Summarize the following content concisely: ")["input_ids"])
+    assert all(prefix_tokens == prefix for *_, prefix_tokens in results)
+
+    # A later lone prompt reuses the learned prefix
+    text, _, _, prefix_tokens = engine.generate("Summarize the following content concisely: dogs", GREEDY, 30)
+    assert prefix_tokens == prefix
+    assert text == reference(tiny_model, "Summarize the following content concisely: dogs")
+
+
+def test_full_queue_raises_after_the_timeout():
+    release = threading.Event()
+
+    class SlowModel:
+        def generate(self, inputs, **kwargs):
+            release.wait(5)
+            return inputs
+
+    engine = BatchingEngine(SlowModel(), CharTokenizer(), max_batch=1, max_wait=0, queue_size=1)
+    try:
+        running = engine.submit("a", GREEDY)
+        while running.running() is False:
+            pass
+        queued = engine.submit("b", GREEDY)
+        with pytest.raises(LocalQueueFull):
+            engine.submit("c", GREEDY, timeout=0.05)
+        release.set()
+        assert running.result(5)[0] == "" and queued.result(5)[0] == ""
+    finally:
+        release.set()
+        engine.close()
+
+
+def test_chain_backend_is_chosen_per_chain(engine, monkeypatch, mocker):
+    monkeypatch.setenv("LLM_BACKEND", "local")
+    monkeypatch.setenv("LLM_BACKEND_CRITIC", "remote")
+    monkeypatch.setenv("LOCAL_MODEL", "tiny/model")
+    get_engine = mocker.patch("utils.local_llm.get_engine", return_value=engine)
+    mocker.patch("utils.models._build_chat_model", return_value="remote client")
+    models.clear_model_cache()
+    try:
+        writer = models.get_chat_model("repo/writer", {"max_new_tokens": 4, "temperature": 0}, name="writer")
+        critic = models.get_chat_model("repo/critic", {"max_new_tokens": 4}, name="critic")
+    finally:
+        models.clear_model_cache()
+
+    assert isinstance(writer, LocalChatModel)
+    assert critic == "remote client"
+    get_engine.assert_called_once_with("tiny/model", mocker.ANY)
+    assert models.cache_model_id("writer", "repo/writer") == "local:tiny/model"
+    assert models.cache_model_id("critic", "repo/critic") == "repo/critic"
+
+    message = writer.invoke([HumanMessage(content="Generate an abstract")])
+    assert message.usage_metadata["input_tokens"] == len("Generate an abstract") + 1
+    assert message.usage_metadata["output_tokens"] <= 4
+
+
+def test_load_passes_torch_dtype(tiny_model, mocker):
+    tokenizer = mocker.patch("transformers.AutoTokenizer.from_pretrained", return_value=CharTokenizer())
+    model = mocker.patch("transformers.AutoModelForCausalLM.from_pretrained", return_value=tiny_model)
+    engine = local_llm._load("tiny/model", "hf_token")
+    try:
+        tokenizer.assert_called_once_with("tiny/model", token="hf_token")
+        model.assert_called_once_with("tiny/model", token="hf_token", torch_dtype=torch.float32)
+    finally:
+        engine.close()
+
+
+def test_slow_load_blocks_only_its_own_model(mocker):
+    release, loads = threading.Event(), []
+
+    def load(model_id, token):
+        loads.append(model_id)
+        if model_id == "tiny/slow":
+            assert release.wait(5)
+        return mocker.Mock(name=model_id)
+
+    mocker.patch("utils.local_llm._load", side_effect=load)
+    local_llm.clear_engines()
+    try:
+        with ThreadPoolExecutor(2) as pool:
+            slow = [pool.submit(local_llm.get_engine, "tiny/slow") for _ in range(2)]
+            while "tiny/slow" not in loads:
+                time.sleep(0.01)
+            # Loaded while tiny/slow is still loading
+            assert local_llm.get_engine("tiny/fast") is not None
+            release.set()
+            assert slow[0].result(5) is slow[1].result(5)
+        assert sorted(loads) == ["tiny/fast", "tiny/slow"]
+    finally:
+        release.set()
+        local_llm.clear_engines()
@@ -0,0 +1,44 @@
+import json
+from graph_article.graph_article import article_graph
+from shared import ResearchState
+from utils.metrics import REGISTRY, instrument, record, render_prometheus, run_trace
+
+
+class DummyResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+def test_run_trace_records_node_spans(mocker):
+    mock_writer_chain = mocker.Mock()
+    mock_writer_chain.invoke.return_value = DummyResponse("Test abstract")
+    mocker.patch("graph_article.writer.writer_chain", mock_writer_chain)
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.return_value = DummyResponse("ACCEPTED")
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+    with run_trace("article") as trace:
+        article_graph.invoke(ResearchState(input="Title", category="Category"))
+
+    totals = trace.node_totals()
+    assert totals["writer"]["runs"] == 1
+    assert totals["critic"]["runs"] == 1
+    data = json.loads(trace.to_json())
+    assert [s["node"] for s in data["spans"]] == ["writer", "critic"]
+    assert "research_node_duration_seconds_bucket" in render_prometheus()
+
+
+def test_record_attaches_fields_to_current_span():
+    @instrument("test_node")
+    def node():
+        record(fetch_bytes=100, retries=1)
+        record(fetch_bytes=50)
+
+    before = REGISTRY.counter("research_fetch_bytes_total").value(node="test_node")
+    with run_trace("test") as trace:
+        node()
+
+    assert trace.node_totals()["test_node"]["fetch_bytes"] == 150
+    assert trace.spans[0].fields["retries"] == 1
+    assert REGISTRY.counter("research_fetch_bytes_total").value(node="test_node") == before + 150
+    assert 'research_fetch_bytes_total{node="test_node"}' in render_prometheus()
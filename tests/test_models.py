@@ -0,0 +1,108 @@
+from functools import partial
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from graph_article.graph_article import article_graph
+from shared import ResearchState
+from utils import models
+from utils.llm_cache import CachedChain
+
+
+@pytest.fixture
+def built(mocker):
+    """Replace client construction with fakes that answer with the token they were built for."""
+    tokens = []
+
+    def fake_build(repo_id, model_kwargs, token):
+        tokens.append(token)
+        return RunnableLambda(lambda _: AIMessage(content=f"built for {token}"))
+
+    mocker.patch("utils.models._build_chat_model", side_effect=fake_build)
+    models.clear_model_cache()
+    yield tokens
+    models.clear_model_cache()
+
+
+def test_get_chat_model_is_memoized(built):
+    first = models.get_chat_model("repo/a", {"temperature": 0.1, "max_new_tokens": 5}, token="t")
+    again = models.get_chat_model("repo/a", {"max_new_tokens": 5, "temperature": 0.1}, token="t")
+    other = models.get_chat_model("repo/a", {"temperature": 0.2, "max_new_tokens": 5}, token="t")
+
+    assert first is again
+    assert other is not first
+    assert len(built) == 2
+
+
+def test_clients_are_pooled_per_api_key(built, monkeypatch):
+    monkeypatch.setenv("HUGGINGFACEHUB_API_TOKEN", "env-key")
+
+    with models.use_api_token("alice"):
+        alice = models.get_chat_model("repo/a", {})
+        assert models.get_chat_model("repo/a", {}) is alice
+    with models.use_api_token("bob"):
+        bob = models.get_chat_model("repo/a", {})
+    models.get_chat_model("repo/a", {})
+
+    assert alice is not bob
+    assert built == ["alice", "bob", "env-key"]
+
+
+def test_pool_evicts_least_recently_used(built, monkeypatch):
+    monkeypatch.setattr(models, "POOL_SIZE", 2)
+
+    a = models.get_chat_model("repo/a", {}, token="k")
+    models.get_chat_model("repo/b", {}, token="k")
+    models.get_chat_model("repo/a", {}, token="k")
+    models.get_chat_model("repo/c", {}, token="k")
+
+    assert models.pool_size() == 2
+    assert models.get_chat_model("repo/a", {}, token="k") is a
+    models.get_chat_model("repo/b", {}, token="k")
+    assert built == ["k", "k", "k", "k"]
+
+
+def test_graph_nodes_use_the_session_key(built, mocker):
+    writer_model = partial(models.get_chat_model, "repo/writer", {})
+    mocker.patch("graph_article.writer.writer_chain",
+                 CachedChain("writer", "{input} {category}", writer_model, "repo/writer", {},
+                             cache_by_default=False))
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.return_value = AIMessage(content="ACCEPTED")
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+    with models.use_api_token("session-key"):
+        final_state = article_graph.invoke(ResearchState(input="Title", category="Category"))
+
+    assert final_state["final_abstract"] == "built for session-key"
+    assert built == ["session-key"]
+
+
+def test_slow_build_blocks_only_its_own_key(mocker):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    release, builds = threading.Event(), []
+
+    def fake_build(repo_id, model_kwargs, token):
+        builds.append(repo_id)
+        if repo_id == "repo/slow":
+            assert release.wait(5)
+        return RunnableLambda(lambda _: AIMessage(content=repo_id))
+
+    mocker.patch("utils.models._build_chat_model", side_effect=fake_build)
+    models.clear_model_cache()
+    try:
+        with ThreadPoolExecutor(3) as pool:
+            slow = [pool.submit(models.get_chat_model, "repo/slow", {}, token="t") for _ in range(2)]
+            while "repo/slow" not in builds:
+                time.sleep(0.01)
+            # Built while repo/slow is still loading
+            assert models.get_chat_model("repo/fast", {}, token="t") is not None
+            release.set()
+            assert slow[0].result(5) is slow[1].result(5)
+        assert sorted(builds) == ["repo/fast", "repo/slow"]
+    finally:
+        models.clear_model_cache()
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+from graph_web.loader_deployment import FetchedPage, aload_node, load_node
+from graph_web.page_cache import PageCache
+from shared import ResearchState
+
+HTML = "<html><body><div class='html-p'>Cached paragraph</div></body></html>"
+
+
+def test_page_cache_roundtrip_and_normalized_key(tmp_path):
+    cache = PageCache(tmp_path)
+    cache.put("https://Example.com/a?b=2&a=1#frag", HTML, "text", etag='"v1"')
+
+    page = cache.get("https://example.com/a?a=1&b=2")
+    assert page.text == "text"
+    assert page.validators() == {"If-None-Match": '"v1"'}
+    assert cache.read_html(page) == HTML
+    assert page.is_fresh(ttl=60)
+
+
+def test_page_cache_evicts_least_recently_used(tmp_path):
+    cache = PageCache(tmp_path, max_bytes=250)
+    cache.put("https://a.com", "a" * 100, "a")
+    cache.put("https://b.com", "b" * 100, "b")
+    cache.get("https://a.com")
+    cache.put("https://c.com", "c" * 100, "c")
+
+    assert cache.get("https://b.com") is None
+    assert cache.get("https://a.com") is not None
+    assert cache.total_bytes() <= 250
+
+
+def test_load_node_uses_cache_and_revalidates(tmp_path, mocker):
+    cache = PageCache(tmp_path, ttl=60)
+    mocker.patch("graph_web.loader_deployment.get_page_cache", return_value=cache)
+    fetch = mocker.patch(
+        "graph_web.loader_deployment._fetch_page",
+        return_value=FetchedPage(200, {"etag": '"v1"'}, HTML, "Cached paragraph"),
+    )
+    state = ResearchState(url="https://example.com/article")
+
+    assert load_node(state)["content"] == "Cached paragraph"
+    # Fresh hit: no network call
+    assert load_node(state)["content"] == "Cached paragraph"
+    assert fetch.call_count == 1
+
+    # Stale entry: conditional request, 304 reuses the cached text
+    cache.ttl = 0
+    fetch.return_value = FetchedPage(304, {})
+    assert load_node(state)["content"] == "Cached paragraph"
+    assert fetch.call_args.args[1] == {"If-None-Match": '"v1"'}
+
+
+def test_caches_default_to_the_user_cache_directory(monkeypatch, tmp_path):
+    from graph_web import page_cache
+    from utils.paths import cache_dir
+
+    monkeypatch.delenv("RESEARCH_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert cache_dir() == str(tmp_path / "research-assistant")
+
+    monkeypatch.setattr(page_cache, "_default_cache", None)
+    cache = page_cache.get_page_cache()
+    assert cache.directory == tmp_path / "research-assistant" / "pages"
+
+
+def test_pages_without_content_are_not_cached(tmp_path, mocker):
+    cache = PageCache(tmp_path, ttl=60)
+    mocker.patch("graph_web.loader_deployment.get_page_cache", return_value=cache)
+    fetch = mocker.patch(
+        "graph_web.loader_deployment._fetch_page",
+        return_value=FetchedPage(200, {}, "<html></html>", "No content", "none"),
+    )
+    state = ResearchState(url="https://example.com/empty")
+
+    assert load_node(state)["content"] == "No content"
+    assert cache.get("https://example.com/empty") is None
+    fetch.return_value = FetchedPage(200, {}, HTML, "Cached paragraph", "paragraphs")
+    assert load_node(state)["content"] == "Cached paragraph"
+    assert fetch.call_count == 2
+
+
+def test_async_revalidation_touches_the_cache_off_the_event_loop(tmp_path, mocker):
+    cache = PageCache(tmp_path, ttl=0)
+    cache.put("https://example.com/article", HTML, "Cached paragraph", etag='"v1"')
+    mocker.patch("graph_web.loader_deployment.get_page_cache", return_value=cache)
+    mocker.patch("graph_web.loader_deployment._afetch_page", mocker.AsyncMock(return_value=FetchedPage(304, {})))
+    touched = []
+    mocker.patch.object(cache, "touch", side_effect=lambda url: touched.append(threading.current_thread()))
+
+    state = ResearchState(url="https://example.com/article")
+    assert asyncio.run(aload_node(state))["content"] == "Cached paragraph"
+    assert touched and touched[0] is not threading.main_thread()
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.retry import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, async_retry, deadline, is_retryable, retry, time_left,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, headers)
+
+
+def flaky(errors, result="ok"):
+    """A function raising each error in turn, then returning result."""
+    errors = list(errors)
+    calls = []
+
+    def func():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+    return func, calls
+
+
+def test_classifies_retryable_errors():
+    assert is_retryable(HTTPError(429))
+    assert is_retryable(HTTPError(503))
+    assert is_retryable(ConnectionResetError())
+    assert not is_retryable(HTTPError(401))
+    assert not is_retryable(HTTPError(402))
+    assert not is_retryable(ValueError("bad input"))
+    assert is_retryable(ValueError("custom"), (ValueError,))
+
+
+def test_retry_uses_jittered_backoff_and_retry_after(mocker):
+    sleep = mocker.patch("utils.retry.time.sleep")
+    mocker.patch("utils.retry.random.uniform", side_effect=lambda low, high: high / 2)
+    func, calls = flaky([HTTPError(503), HTTPError(429, {"Retry-After": "7"})])
+
+    assert retry(tries=3, delay=2)(func)() == "ok"
+    assert len(calls) == 3
+    assert [c.args[0] for c in sleep.call_args_list] == [1.0, 7.0]
+
+
+def test_retry_raises_non_retryable_at_once(mocker):
+    sleep = mocker.patch("utils.retry.time.sleep")
+    func, calls = flaky([HTTPError(402)])
+
+    with pytest.raises(HTTPError):
+        retry(tries=5)(func)()
+    assert len(calls) == 1
+    sleep.assert_not_called()
+
+
+def test_retry_gives_up_rather_than_sleep_past_deadline(mocker):
+    sleep = mocker.patch("utils.retry.time.sleep")
+    func, calls = flaky([HTTPError(503, {"Retry-After": "60"})])
+
+    with deadline(5), pytest.raises(HTTPError):
+        retry(tries=3)(func)()
+    assert len(calls) == 1
+    sleep.assert_not_called()
+
+
+def test_expired_deadline_stops_new_attempts():
+    func, calls = flaky([])
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            retry()(func)()
+    assert calls == []
+
+
+def test_nested_deadline_only_shortens():
+    with deadline(100):
+        with deadline(1000):
+            assert time_left() <= 100
+        with deadline(1):
+            assert time_left() <= 1
+    assert time_left() is None
+
+
+def test_circuit_breaker_opens_fails_fast_and_recovers(mocker):
+    mocker.patch("utils.retry.time.sleep")
+    breaker = CircuitBreaker("test-endpoint", failure_threshold=2, reset_timeout=30)
+    mocker.patch("utils.retry.get_breaker", return_value=breaker)
+    func, calls = flaky([HTTPError(503), HTTPError(503)])
+    guarded = retry(tries=2, circuit="test-endpoint")(func)
+
+    with pytest.raises(HTTPError):
+        guarded()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        guarded()
+    assert len(calls) == 2
+
+    breaker.opened_at -= breaker.reset_timeout
+    assert breaker.state == "half-open"
+    assert guarded() == "ok"
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_call_does_not_wedge_the_circuit(mocker):
+    breaker = CircuitBreaker("test-endpoint", failure_threshold=1, reset_timeout=30)
+    mocker.patch("utils.retry.get_breaker", return_value=breaker)
+    calls = []
+
+    @async_retry(tries=1, circuit="test-endpoint")
+    async def call(hang):
+        calls.append(hang)
+        if hang:
+            await asyncio.sleep(10)
+        return "ok"
+
+    async def scenario():
+        breaker.on_failure()
+        breaker.opened_at -= breaker.reset_timeout
+        trial = asyncio.create_task(call(True))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await call(False)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return await call(False)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert calls == [True, False]
+    assert breaker.state == "closed"
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from server import ApiServer, JobRunner, parse_abstract, parse_summarize, run_summarize
+
+
+def request(server, method, path, body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(server.url + path, data=data, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.loads(resp.read()), resp.headers
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read()), e.headers
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(run, workers=1, queue_size=4):
+        tasks = {"summarize": (parse_summarize, run), "abstract": (parse_abstract, run)}
+        server = ApiServer(("127.0.0.1", 0), JobRunner(workers, queue_size, tasks=tasks), sync_timeout=5)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        if server.runner.accepting:
+            server.stop(grace=1)
+        server.server_close()
+
+
+def test_sync_and_job_endpoints(serve):
+    seen_tokens = []
+
+    def run(state):
+        from utils.models import current_api_token
+        seen_tokens.append(current_api_token())
+        return {"url": str(state.url), "summary": "a summary"}
+
+    server = serve(run)
+    status, body, _ = request(server, "POST", "/summarize", {"url": "https://example.com/a"},
+                              {"Authorization": "Bearer hf_user"})
+    assert (status, body["summary"]) == (200, "a summary")
+    assert seen_tokens == ["hf_user"]
+
+    status, body, headers = request(server, "POST", "/jobs/summarize", {"url": "https://example.com/b"})
+    assert status == 202 and headers["Location"] == body["status_url"]
+    job = server.runner.get(body["job_id"])
+    job.done.wait(5)
+    status, body, _ = request(server, "GET", body["status_url"])
+    assert body["status"] == "done" and body["result"]["url"] == "https://example.com/b"
+
+
+def test_bad_requests_and_failures(serve):
+    def run(state):
+        raise RuntimeError("model down")
+
+    server = serve(run)
+    assert request(server, "POST", "/summarize", {"url": "not a url"})[0] == 400
+    assert request(server, "POST", "/abstract", {"title": "T"})[0] == 400
+    assert request(server, "POST", "/abstract", {"title": "T", "category": "C", "candidates": 50})[0] == 400
+    assert request(server, "GET", "/jobs/unknown")[0] == 404
+
+    status, body, _ = request(server, "POST", "/abstract", {"title": "T", "category": "C"})
+    assert (status, body["error"]) == (502, "model down")
+
+
+def test_full_queue_gets_429_and_shutdown_drains(serve):
+    release = threading.Event()
+
+    def run(state):
+        release.wait(5)
+        return {"summary": str(state.url)}
+
+    server = serve(run, workers=1, queue_size=1)
+    first = request(server, "POST", "/jobs/summarize", {"url": "https://example.com/1"})[1]
+    # Wait until the worker holds the first job, so the second fills the queue
+    while server.runner.get(first["job_id"]).status != "running":
+        time.sleep(0.01)
+    queued = request(server, "POST", "/jobs/summarize", {"url": "https://example.com/2"})[1]
+
+    status, _, headers = request(server, "POST", "/jobs/summarize", {"url": "https://example.com/3"})
+    assert status == 429 and int(headers["Retry-After"]) >= 1
+
+    stopper = threading.Thread(target=server.stop, args=(5,))
+    stopper.start()
+    while server.runner.accepting:
+        time.sleep(0.01)
+    release.set()
+    stopper.join()
+
+    assert server.runner.get(queued["job_id"]).status == "done"
+    assert server.runner.get(first["job_id"]).status == "done"
+
+
+def test_identical_jobs_with_different_tokens_run_separately(serve, mocker):
+    from graph_web import graph_web
+    from utils.models import current_api_token
+    tokens = []
+
+    def invoke(state, config=None):
+        tokens.append(current_api_token())
+        time.sleep(0.2)
+        if current_api_token() == "hf_revoked":
+            raise RuntimeError("401 Unauthorized")
+        return {"summary": "a summary"}
+
+    mocker.patch.object(graph_web, "get_web_graph", return_value=mocker.Mock(invoke=invoke))
+    server = serve(run_summarize, workers=2)
+    results = {}
+
+    def call(token):
+        results[token] = request(server, "POST", "/summarize", {"url": "https://example.com/paper"},
+                                 {"Authorization": f"Bearer {token}"})
+
+    threads = [threading.Thread(target=call, args=(t,)) for t in ("hf_revoked", "hf_good")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(tokens) == ["hf_good", "hf_revoked"]
+    assert results["hf_good"][:2] == (200, {"url": "https://example.com/paper", "summary": "a summary"})
+    assert results["hf_revoked"][0] == 502
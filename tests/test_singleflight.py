@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from graph_article.graph_article import article_request_key
+from graph_web import graph_web
+from shared import ResearchState
+from utils.singleflight import SingleFlight
+
+
+def slow(calls, result="done", delay=0.1, error=None):
+    def func():
+        calls.append(threading.get_ident())
+        time.sleep(delay)
+        if error:
+            raise error
+        return result
+    return func
+
+
+def test_concurrent_identical_calls_share_one_run():
+    flight, calls = SingleFlight("test"), []
+    with ThreadPoolExecutor(5) as pool:
+        results = list(pool.map(lambda _: flight.do("key", slow(calls)), range(5)))
+
+    assert results == ["done"] * 5
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+    # Finished calls are forgotten: the next request runs again
+    assert flight.do("key", slow(calls)) == "done"
+    assert len(calls) == 2
+
+
+def test_error_reaches_every_waiter():
+    flight, calls = SingleFlight("test"), []
+    func = slow(calls, error=RuntimeError("model down"))
+
+    def call(_):
+        with pytest.raises(RuntimeError, match="model down"):
+            flight.do("key", func)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(call, range(4)))
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_async_callers_share_a_call_led_by_a_thread():
+    flight, calls = SingleFlight("test"), []
+    leader = threading.Thread(target=flight.do, args=("key", slow(calls, delay=0.2)))
+    leader.start()
+    time.sleep(0.05)
+
+    async def never_called():
+        raise AssertionError("followers must not run the call")
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", never_called) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["done"] * 3
+    leader.join()
+    assert len(calls) == 1
+
+
+def test_summarize_url_coalesces_url_variants(mocker):
+    calls = []
+
+    def invoke(state, config=None):
+        calls.append(str(state.url))
+        time.sleep(0.1)
+        return {"summary": "shared summary"}
+
+    mocker.patch.object(graph_web, "get_web_graph", return_value=mocker.Mock(invoke=invoke))
+    urls = [
+        "https://www.mdpi.com/2076-3417/11/20/9772",
+        "https://www.mdpi.com/2076-3417/11/20/9772/htm",
+        "https://WWW.mdpi.com/2076-3417/11/20/9772?utm_source=slack",
+    ]
+    with ThreadPoolExecutor(3) as pool:
+        results = list(pool.map(graph_web.summarize_url, urls))
+
+    assert [r["summary"] for r in results] == ["shared summary"] * 3
+    assert len(calls) == 1
+
+
+def test_cancelled_async_leader_hands_the_call_to_a_follower():
+    flight, calls = SingleFlight("test"), []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return f"run {len(calls)}"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("key", work))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(flight.ado("key", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(main()) == ["run 2"] * 3
+    assert len(calls) == 2
+    assert flight.in_flight() == 0
+
+
+def test_interrupted_thread_leader_hands_the_call_to_a_follower():
+    flight, calls = SingleFlight("test"), []
+    started = threading.Event()
+
+    def interrupted():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        raise KeyboardInterrupt
+
+    def leader():
+        with pytest.raises(KeyboardInterrupt):
+            flight.do("key", interrupted)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    started.wait()
+    assert flight.do("key", slow(calls)) == "done"
+    thread.join()
+    assert len(calls) == 2
+
+
+def test_request_keys_include_the_api_token():
+    from utils.models import use_api_token
+
+    state = ResearchState(url="https://example.com/paper")
+    article = ResearchState(input="Title", category="AI")
+    with use_api_token("hf_a"):
+        keys_a = graph_web.web_request_key(state), article_request_key(article)
+    with use_api_token("hf_b"):
+        keys_b = graph_web.web_request_key(state), article_request_key(article)
+    assert keys_a[0] != keys_b[0] and keys_a[1] != keys_b[1]
+    assert "hf_a" not in repr(keys_a)
+
+
+def test_article_request_key_ignores_case_and_spacing():
+    a = ResearchState(input="Graph  Neural Networks", category="AI")
+    b = ResearchState(input="graph neural networks ", category=" ai")
+    c = ResearchState(input="Graph Neural Networks", category="AI", candidates=3)
+    assert article_request_key(a) == article_request_key(b)
+    assert article_request_key(a) != article_request_key(c)
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from utils.llm_cache import CachedChain, InMemoryLLMCache
+
+
+def test_entry_points_do_not_import_heavy_packages():
+    code = (
+        "import sys, main, graph_web.graph_web, graph_article.graph_article; "
+        "print(sorted(m for m in ('transformers', 'torch', 'langchain_huggingface', 'langgraph', 'IPython') "
+        "if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_cached_chain_builds_model_on_first_use():
+    factory_calls = []
+
+    def factory():
+        factory_calls.append(1)
+        return RunnableLambda(lambda prompt_value: AIMessage(content=prompt_value.to_string()))
+
+    chain = CachedChain("lazy", "Echo: {content}", factory, "repo/model", {}, cache=InMemoryLLMCache())
+    assert factory_calls == []
+
+    assert chain.invoke({"content": "abc"}).content == "Echo: abc"
+    assert factory_calls == [1]
@@ -0,0 +1,59 @@
+import asyncio
+import itertools
+from langchain_core.prompts import PromptTemplate
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from graph_article.graph_article import article_graph
+from shared import ResearchState
+from utils.llm_cache import CachedChain
+from utils.streaming import GraphStream
+
+
+class DummyResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+def patch_chains(mocker):
+    model = GenericFakeChatModel(messages=itertools.cycle([AIMessage(content="A streamed abstract")]))
+    writer_chain = CachedChain("writer", PromptTemplate.from_template("{input} {category}"),
+                               model, "repo", {}, cache_by_default=False)
+    mocker.patch("graph_article.writer.writer_chain", writer_chain)
+
+    mock_critic_chain = mocker.Mock()
+    mock_critic_chain.invoke.return_value = DummyResponse("ACCEPTED")
+    mock_critic_chain.ainvoke = mocker.AsyncMock(return_value=DummyResponse("ACCEPTED"))
+    mocker.patch("graph_article.critic.critic_chain", mock_critic_chain)
+
+
+def test_graph_stream_yields_writer_tokens_and_final_state(mocker):
+    patch_chains(mocker)
+    stream = GraphStream(article_graph, ResearchState(input="Title", category="Category"))
+    events = list(stream)
+
+    tokens = [payload for kind, node, payload in events if kind == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "A streamed abstract"
+    assert ("update", "critic", {"critique": "ACCEPTED", "final_abstract": "A streamed abstract"}) in events
+    assert stream.final_state["final_abstract"] == "A streamed abstract"
+
+
+def test_graph_stream_async(mocker):
+    patch_chains(mocker)
+    stream = GraphStream(article_graph, ResearchState(input="Title", category="Category"))
+
+    async def collect():
+        return [payload async for kind, _, payload in stream if kind == "token"]
+
+    assert "".join(asyncio.run(collect())) == "A streamed abstract"
+
+
+def test_speculate_streams_one_candidate_per_round(mocker):
+    patch_chains(mocker)
+    stream = GraphStream(article_graph, ResearchState(input="Title", category="Category", candidates=3))
+    events = list(stream)
+
+    tokens = [payload for kind, node, payload in events if kind == "token" and node == "speculate"]
+    assert "".join(tokens) == "A streamed abstract"
+    assert stream.streamed_nodes == {"speculate"}
+    assert stream.final_state["final_abstract"] == "A streamed abstract"
@@ -19,4 +19,34 @@ def test_summarize_node_with_content(mocker):
 def test_summarize_node_no_content():
     state = ResearchState(content=None)
     result = summarize_node(state)
-    assert result["summary"] == "No content to summarize"
\ No newline at end of file
+    assert result["summary"] == "No content to summarize"
+
+def test_summarize_node_map_reduces_long_content(mocker):
+    class FakeResponse:
+        def __init__(self, content):
+            self.content = content
+
+    mocker.patch("graph_web.summarizer.CHUNK_TOKENS", 50)
+    mock_chain = mocker.Mock()
+    mock_chain.invoke.side_effect = lambda inputs, *a: FakeResponse(f"summary({len(inputs['content'])})")
+    mocker.patch("graph_web.summarizer.summarize_chain", mock_chain)
+
+    paragraphs = [f"Paragraph {i} " + "word " * 20 for i in range(12)]
+    state = ResearchState(content="\n\n".join(paragraphs))
+    result = summarize_node(state)
+
+    # 12 paragraphs of ~40 tokens → 12 map calls, then at least one reduce call
+    assert mock_chain.invoke.call_count > 12
+    assert result["summary"].startswith("summary(")
+
+
+def test_split_into_chunks_respects_budget_and_paragraphs():
+    from graph_web.chunking import split_into_chunks
+    from utils.tokens import count_tokens
+
+    text = "\n\n".join(["short para"] * 5 + ["long sentence. " * 100])
+    chunks = list(split_into_chunks(text, max_tokens=60))
+
+    assert chunks[0].startswith("short para\n\nshort para")
+    assert all(count_tokens(c) <= 60 for c in chunks)
+    assert "".join(chunks).count("long sentence.") == 100
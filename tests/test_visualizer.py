@@ -0,0 +1,43 @@
+import xml.etree.ElementTree as ET
+
+from graph_article.graph_article import get_article_graph
+from graph_web.graph_web import get_web_graph
+from utils.visualizer import graph_visualiser, render_graphs, topology
+
+
+def test_topology_hash_is_stable_and_tells_graphs_apart():
+    web, article = topology(get_web_graph()), topology(get_article_graph())
+
+    assert web.digest == topology(get_web_graph()).digest
+    assert web.digest != article.digest
+    assert "compress" in web.nodes
+    assert any(e.source == e.target == "speculate" and e.conditional for e in article.edges)
+
+
+def test_svg_is_drawn_offline_and_skipped_when_unchanged(tmp_path, mocker):
+    graph = get_article_graph()
+    remote = mocker.patch("langchain_core.runnables.graph.Graph.draw_mermaid_png", side_effect=AssertionError)
+    path = tmp_path / "article.svg"
+
+    assert graph_visualiser(graph, str(path))
+    svg = ET.parse(path).getroot()
+    labels = {t.text for t in svg.iter("{http://www.w3.org/2000/svg}text")}
+    assert {"__start__", "writer", "critic", "speculate", "__end__", "True", "False"} <= labels
+    assert topology(graph).digest in path.read_text()
+
+    mtime = path.stat().st_mtime_ns
+    assert not graph_visualiser(graph, str(path))
+    assert path.stat().st_mtime_ns == mtime
+    remote.assert_not_called()
+
+    # A different graph under the same name is redrawn
+    assert graph_visualiser(get_web_graph(), str(path))
+
+
+def test_render_graphs_writes_svg_and_mermaid(tmp_path):
+    written = render_graphs({"web": get_web_graph}, str(tmp_path))
+
+    assert sorted(p.name for p in written) == ["web_graph.mmd", "web_graph.svg"]
+    mermaid = (tmp_path / "web_graph.mmd").read_text()
+    assert "load --> compress;" in mermaid and "dedup -.->|done| __end__;" in mermaid
+    assert render_graphs({"web": get_web_graph}, str(tmp_path)) == []
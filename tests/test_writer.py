@@ -13,6 +13,13 @@ def test_writer_node_basic(mocker):
     class DummyState:
         input = "Test Title"
         category = "Science"
+        iterations = 0
 
     result = writer_node(DummyState())
     assert result["abstract"] == "This is a generated abstract."
+    mock_chain.invoke.assert_called_once_with({"input": "Test Title", "category": "Science"}, use_cache=True)
+
+    # A rewrite follows a rejection: it must not come from the cache
+    DummyState.iterations = 1
+    writer_node(DummyState())
+    assert mock_chain.invoke.call_args.kwargs == {"use_cache": False}
@@ -0,0 +1,86 @@
+"""
+Durable (checkpointed) graph runs.
+
+With CHECKPOINT_DB set, e.g. CHECKPOINT_DB=.cache/checkpoints.sqlite, graphs
+compiled with durable=True save their state to a local SQLite file after
+every node. A run that fails part way (say summarize_node runs out of
+retries) can then be resumed by its thread id: completed nodes such as
+load_node are not run again.
+
+    thread_id = new_thread_id("web")
+    config = thread_config(thread_id)
+    try:
+        graph.invoke(state, config)
+    except Exception:
+        ...
+    if can_resume(graph, thread_id):
+        graph.invoke(None, config)   # None = continue from the last checkpoint
+
+Needs the optional langgraph-checkpoint-sqlite package. Durable graphs use the
+synchronous SqliteSaver, so run them with invoke/stream.
+"""
+
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, Optional
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_checkpointers: Dict[str, object] = {}
+_checkpointer_lock = threading.Lock()
+
+
+def checkpoint_path() -> str:
+    return os.getenv("CHECKPOINT_DB", "")
+
+
+def checkpointing_enabled() -> bool:
+    return get_checkpointer() is not None
+
+
+def get_checkpointer():
+    """Return the SQLite checkpointer for CHECKPOINT_DB, or None if it is unset or unavailable."""
+    path = checkpoint_path()
+    if not path:
+        return None
+    with _checkpointer_lock:
+        if path not in _checkpointers:
+            try:
+                from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+                from langgraph.checkpoint.sqlite import SqliteSaver
+            except ImportError:
+                logger.warning("CHECKPOINT_DB is set but langgraph-checkpoint-sqlite is not installed; "
+                               "runs will not be resumable")
+                return None
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            # ResearchState.url is a pydantic HttpUrl, which msgpack can't encode
+            _checkpointers[path] = SqliteSaver(conn, serde=JsonPlusSerializer(pickle_fallback=True))
+        return _checkpointers[path]
+
+
+def new_thread_id(graph_name: str) -> str:
+    """A fresh thread id, prefixed with the graph name so a resume knows which graph to use."""
+    return f"{graph_name}-{uuid.uuid4().hex[:12]}"
+
+
+def graph_name_of(thread_id: str) -> str:
+    return thread_id.split("-", 1)[0]
+
+
+def thread_config(thread_id: str, config: Optional[dict] = None) -> dict:
+    config = dict(config or {})
+    config["configurable"] = {**config.get("configurable", {}), "thread_id": thread_id}
+    return config
+
+
+def can_resume(graph, thread_id: str) -> bool:
+    """True if the thread has a saved run that stopped before reaching END."""
+    if getattr(graph, "checkpointer", None) is None:
+        return False
+    return bool(graph.get_state(thread_config(thread_id)).next)
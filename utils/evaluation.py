@@ -1,17 +1,310 @@
 """
 Evaluation utilities for abstract quality.
+
+  evaluate_abstract(text)        metrics for one abstract, as a dict
+  evaluate_abstracts(texts)      the same metrics for many abstracts, as
+                                 columns (numpy arrays) in an Evaluation
+  KeywordMatcher(terms)          counts hundreds of keyword terms in one pass
+
+Keyword terms are matched case-insensitively on word boundaries: "method"
+does not match "methodology". A trailing "*" makes a term a prefix, so
+"method*" matches "method", "methods" and "methodology". Terms may contain
+several words ("neural network", "state-of-the-art"); punctuation between
+the words is ignored.
+
+The matcher tokenizes a batch in one pass and looks each distinct word up
+once, in a dictionary of exact words and a trie of prefixes, so the cost
+barely grows with the number of terms. Hits are then expanded with numpy into
+a (texts x terms) count matrix; multi-word terms are matched by narrowing the
+positions of their first word.
+
+Readability uses the Flesch reading ease score, with syllables estimated as
+vowel groups. It is cheap and approximate, but fine for comparing abstracts.
 """
 
-def evaluate_abstract(abstract: str) -> dict:
+import csv
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_KEYWORDS = ("research*", "method*", "result*", "conclusion*")
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"[.!?]+(?:\s|$)")
+_VOWEL_GROUP = re.compile(r"[aeiouy]+")
+
+
+def load_keywords(path) -> List[str]:
+    """Read keyword terms from a text file, one per line; blank lines and "#" comments are skipped."""
+    terms = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            terms.append(line)
+    return terms
+
+
+def read_abstracts(path) -> List[str]:
+    """
+    Read abstracts from a .jsonl file (the "abstract" field, as written by
+    `main.py abstracts`), a .csv file with an "abstract" column, or a text
+    file with one abstract per line.
     """
-    Example heuristic evaluation: checks length and keyword presence.
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with path.open(encoding="utf-8", newline="") as f:
+        if suffix in (".jsonl", ".ndjson"):
+            return [json.loads(line).get("abstract") or "" for line in f if line.strip()]
+        if suffix == ".csv":
+            return [row.get("abstract") or "" for row in csv.DictReader(f)]
+        return [line.strip() for line in f if line.strip()]
+
+
+class Tokens(NamedTuple):
+    """
+    A batch of texts as lower-cased word tokens.
+
+    vocab lists the distinct words; ids[i] is the vocab index of token i and
+    doc[i] the index of the text it came from.
     """
-    word_count = len(abstract.split())
-    keywords = ["research", "method", "result", "conclusion"]
-    score = sum(1 for kw in keywords if kw in abstract.lower())
 
-    return {
-        "word_count": word_count,
-        "keyword_match_score": score,
-        "keywords_present": [kw for kw in keywords if kw in abstract.lower()]
-    }
\ No newline at end of file
+    texts: int
+    vocab: List[str]
+    ids: "np.ndarray"
+    doc: "np.ndarray"
+
+
+def tokenize(texts: Sequence[str]) -> Tokens:
+    import numpy as np
+
+    per_text = [_WORD.findall(t.lower()) if t else [] for t in texts]
+    lengths = np.fromiter(map(len, per_text), dtype=np.int64, count=len(per_text))
+    flat = list(chain.from_iterable(per_text))
+    vocab = list(dict.fromkeys(flat))
+    index = {word: i for i, word in enumerate(vocab)}
+    ids = np.fromiter(map(index.__getitem__, flat), dtype=np.int64, count=len(flat))
+    return Tokens(len(per_text), vocab, ids, np.repeat(np.arange(len(per_text)), lengths))
+
+
+class KeywordMatcher:
+    """
+    Multi-term keyword counter.
+
+    Args:
+        terms: keyword terms; a trailing "*" makes the last word a prefix.
+
+    Attributes:
+        terms (list): term names, without the "*", in column order.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = []
+        self._phrases: List[Tuple[int, Tuple[int, ...]]] = []   # (column, symbols) for multi-word terms
+        self._single: Dict[int, List[int]] = {}                  # symbol -> columns of one-word terms
+        self._exact: Dict[str, int] = {}                          # word -> symbol
+        self._prefix_trie: List[Dict[str, int]] = [{}]            # char trie of prefix symbols
+        self._prefix_at: Dict[int, int] = {}                      # trie node -> symbol ending there
+        self._symbols = 0
+        seen = set()
+        for term in terms:
+            words = _WORD.findall(term.lower())
+            prefix = term.rstrip().endswith("*")
+            key = (tuple(words), prefix)
+            if not words or key in seen:
+                continue
+            seen.add(key)
+            column = len(self.terms)
+            self.terms.append(" ".join(words))
+            symbols = tuple(self._symbol(w) for w in words[:-1]) + (self._symbol(words[-1], prefix),)
+            if len(symbols) == 1:
+                self._single.setdefault(symbols[0], []).append(column)
+            else:
+                self._phrases.append((column, symbols))
+
+    def _symbol(self, word: str, prefix: bool = False) -> int:
+        if not prefix:
+            if word not in self._exact:
+                self._exact[word] = self._new_symbol()
+            return self._exact[word]
+        node = 0
+        for ch in word:
+            node = self._prefix_trie[node].setdefault(ch, len(self._prefix_trie))
+            if node == len(self._prefix_trie):
+                self._prefix_trie.append({})
+        if node not in self._prefix_at:
+            self._prefix_at[node] = self._new_symbol()
+        return self._prefix_at[node]
+
+    def _new_symbol(self) -> int:
+        self._symbols += 1
+        return self._symbols - 1
+
+    def _matches(self, word: str) -> List[int]:
+        """Symbols a word matches: its exact symbol and every prefix symbol along its trie path."""
+        found = []
+        if word in self._exact:
+            found.append(self._exact[word])
+        node, trie = 0, self._prefix_trie
+        for ch in word:
+            node = trie[node].get(ch)
+            if node is None:
+                break
+            if node in self._prefix_at:
+                found.append(self._prefix_at[node])
+        return found
+
+    def count(self, texts: Sequence[str]):
+        """Return an int32 array of shape (len(texts), len(terms)) with the number of hits of each term."""
+        return self.count_tokens(tokenize(texts))
+
+    def count_tokens(self, tokens: "Tokens"):
+        """count() for texts already split by tokenize()."""
+        import numpy as np
+
+        vocab, ids, doc = tokens.vocab, tokens.ids, tokens.doc
+        counts = np.zeros((tokens.texts, len(self.terms)), dtype=np.int32)
+        if not len(ids) or not self.terms:
+            return counts
+
+        # Match each distinct word once, not each occurrence
+        single_cols: List[List[int]] = []
+        vocab_of_symbol: Dict[int, List[int]] = {}
+        for word_id, word in enumerate(vocab):
+            cols = []
+            for symbol in self._matches(word):
+                cols.extend(self._single.get(symbol, ()))
+                vocab_of_symbol.setdefault(symbol, []).append(word_id)
+            single_cols.append(cols)
+
+        # One-word terms: expand every token into the columns its word hits
+        per_word = np.fromiter(map(len, single_cols), dtype=np.int64, count=len(single_cols))
+        if per_word.any():
+            indptr = np.concatenate(([0], np.cumsum(per_word)))
+            flat = np.fromiter((c for cols in single_cols for c in cols), dtype=np.int64, count=int(indptr[-1]))
+            k = per_word[ids]
+            hit_tokens = np.repeat(np.arange(len(ids)), k)
+            offsets = np.arange(len(hit_tokens)) - np.repeat(np.cumsum(k) - k, k)
+            np.add.at(counts, (doc[hit_tokens], flat[indptr[ids[hit_tokens]] + offsets]), 1)
+
+        # Multi-word terms: narrow the positions matching the first word, word by word
+        masks: Dict[int, "np.ndarray"] = {}
+
+        def mask(symbol):
+            if symbol not in masks:
+                masks[symbol] = np.zeros(len(vocab), dtype=bool)
+                masks[symbol][vocab_of_symbol.get(symbol, [])] = True
+            return masks[symbol]
+
+        for column, symbols in self._phrases:
+            n = len(symbols)
+            if len(ids) < n:
+                continue
+            starts = np.flatnonzero(mask(symbols[0])[ids[:len(ids) - n + 1]])
+            for j, symbol in enumerate(symbols[1:], 1):
+                starts = starts[mask(symbol)[ids[starts + j]]]
+            starts = starts[doc[starts] == doc[starts + n - 1]]
+            np.add.at(counts[:, column], doc[starts], 1)
+        return counts
+
+
+@lru_cache(maxsize=32)
+def _matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+@dataclass
+class Evaluation:
+    """
+    Column-wise metrics for a batch of abstracts; every array has one entry per abstract.
+
+    keyword_hits is a (abstracts x terms) matrix of hit counts, with columns
+    in `terms` order. keyword_match_score counts the distinct terms present.
+    """
+
+    terms: List[str]
+    word_count: "np.ndarray"
+    char_count: "np.ndarray"
+    sentence_count: "np.ndarray"
+    avg_sentence_length: "np.ndarray"
+    avg_word_length: "np.ndarray"
+    syllables_per_word: "np.ndarray"
+    flesch_reading_ease: "np.ndarray"
+    keyword_hits: "np.ndarray"
+    keyword_match_score: "np.ndarray"
+    keyword_coverage: "np.ndarray"
+
+    COLUMNS = ("word_count", "char_count", "sentence_count", "avg_sentence_length", "avg_word_length",
+               "syllables_per_word", "flesch_reading_ease", "keyword_match_score", "keyword_coverage")
+
+    def __len__(self) -> int:
+        return len(self.word_count)
+
+    def keywords_present(self, i: int) -> List[str]:
+        return [term for term, hits in zip(self.terms, self.keyword_hits[i]) if hits]
+
+    def row(self, i: int) -> dict:
+        """Metrics of abstract i as plain Python values (the evaluate_abstract dict)."""
+        row = {name: getattr(self, name)[i].item() for name in self.COLUMNS}
+        row["keywords_present"] = self.keywords_present(i)
+        return row
+
+    def columns(self) -> Dict[str, "np.ndarray"]:
+        """Scalar metrics by name, e.g. for pandas.DataFrame(evaluation.columns())."""
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+
+def evaluate_abstracts(abstracts: Sequence[str], keywords: Iterable[str] = DEFAULT_KEYWORDS) -> Evaluation:
+    """Length, readability and keyword metrics for many abstracts at once."""
+    import numpy as np
+
+    abstracts = [a or "" for a in abstracts]
+    matcher = _matcher(tuple(keywords))
+    tokens = tokenize(abstracts)
+    hits = matcher.count_tokens(tokens)
+
+    words = np.array([len(a.split()) for a in abstracts], dtype=np.int32)
+    chars = np.array([len(a) for a in abstracts], dtype=np.int32)
+    sentences = np.array([len(_SENTENCE_END.findall(a.strip())) for a in abstracts], dtype=np.int32)
+    sentences = np.where((sentences == 0) & (words > 0), 1, sentences)
+
+    # Per distinct word, then gathered for every token
+    n = len(abstracts)
+    word_length = np.fromiter(map(len, tokens.vocab), dtype=np.float64, count=len(tokens.vocab))
+    word_syllables = np.fromiter((max(1, len(_VOWEL_GROUP.findall(w))) for w in tokens.vocab),
+                                 dtype=np.float64, count=len(tokens.vocab))
+    token_count = np.maximum(np.bincount(tokens.doc, minlength=n), 1)
+    letters = np.bincount(tokens.doc, weights=word_length[tokens.ids], minlength=n)
+    syllables = np.bincount(tokens.doc, weights=word_syllables[tokens.ids], minlength=n)
+
+    words_per_sentence = words / np.maximum(sentences, 1)
+    syllables_per_word = syllables / token_count
+    flesch = np.where(words > 0, 206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word, 0.0)
+    present = (hits > 0).sum(axis=1).astype(np.int32)
+
+    return Evaluation(
+        terms=list(matcher.terms),
+        word_count=words,
+        char_count=chars,
+        sentence_count=sentences,
+        avg_sentence_length=words_per_sentence,
+        avg_word_length=letters / token_count,
+        syllables_per_word=syllables_per_word,
+        flesch_reading_ease=flesch,
+        keyword_hits=hits,
+        keyword_match_score=present,
+        keyword_coverage=present / max(len(matcher.terms), 1),
+    )
+
+
+def evaluate_abstract(abstract: str, keywords: Iterable[str] = DEFAULT_KEYWORDS) -> dict:
+    """
+    Heuristic evaluation of one abstract: length, readability and keyword presence.
+    """
+    return evaluate_abstracts([abstract], keywords).row(0)
@@ -0,0 +1,284 @@
+"""
+Response cache for the LLM chains.
+
+Responses are keyed on the model repo_id, its generation kwargs and a hash of
+the fully rendered prompt, so any change to the model, its settings or the
+input produces a new entry. Two backends are provided:
+
+  InMemoryLLMCache   bounded LRU, lives as long as the process
+  SQLiteLLMCache     local SQLite file, survives restarts
+
+The process-wide cache is chosen with LLM_CACHE=memory|sqlite|off
+(LLM_CACHE_PATH sets the SQLite file, by default llm_cache.sqlite in the
+user cache directory, see utils.paths).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+from langchain_core.runnables.config import ensure_config
+
+from utils.logger import setup_logger
+from utils.metrics import record
+from utils.models import cache_model_id
+from utils.paths import cache_path
+from utils.tokens import count_tokens
+
+logger = setup_logger(__name__)
+
+
+def make_key(repo_id: str, model_kwargs: dict, prompt_text: str) -> str:
+    prompt_hash = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+    payload = json.dumps([repo_id, model_kwargs, prompt_hash], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Base class: subclasses implement _get/_put, hit/miss counting lives here."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self._put(key, value)
+
+    def delete(self, key: str) -> None:
+        self._delete(key)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _put(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class InMemoryLLMCache(LLMCache):
+    def __init__(self, max_entries: int = 1024):
+        super().__init__()
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def _put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteLLMCache(LLMCache):
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        path = path or cache_path("llm_cache.sqlite")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL)"
+        )
+        self._db.commit()
+
+    def _get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _put(self, key, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, value, time.time())
+            )
+            self._db.commit()
+
+    def _delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+
+_default_cache: Optional[LLMCache] = None
+_default_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Return the process-wide LLM cache configured by LLM_CACHE, or None if disabled."""
+    global _default_cache
+    backend = os.getenv("LLM_CACHE", "memory").lower()
+    if backend in ("off", "none", "0", "false", ""):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            if backend == "sqlite":
+                _default_cache = SQLiteLLMCache(os.getenv("LLM_CACHE_PATH"))
+            else:
+                _default_cache = InMemoryLLMCache()
+        return _default_cache
+
+
+def cache_stats() -> dict:
+    """Hit/miss counts of the process-wide cache (zeros when disabled)."""
+    cache = get_llm_cache()
+    return cache.stats() if cache else {"hits": 0, "misses": 0}
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+class CachedChain:
+    """
+    `prompt | model` with a response cache in front of it.
+
+    Args:
+        name (str): chain name, used for the opt-in flags below.
+        prompt: PromptTemplate (or its template string) rendered to build
+            the cache key.
+        model: chat model the prompt is piped into on a miss, or a
+            zero-argument callable returning one. A callable is only called
+            when the model is first needed, so importing a node module does
+            not build its client.
+        repo_id (str): model repo id, part of the cache key (with the local
+            model instead when the chain runs on the local backend).
+        model_kwargs (dict): generation kwargs, part of the cache key.
+        cache_by_default (bool): whether calls are cached without opting in.
+        cache (LLMCache): cache to use, defaults to get_llm_cache().
+
+    Callers can override the default per run with the LLM_CACHE_<NAME>
+    environment variable or per call with `configurable={"cache_<name>": bool}`
+    in the graph's run config. `use_cache=False` skips the cache for one call
+    (a rewrite that must not get the same response back), and evict() drops
+    a response that turned out to be unusable; store() caches one that was
+    produced without the cache.
+    """
+
+    def __init__(self, name, prompt, model, repo_id, model_kwargs,
+                 cache_by_default: bool = True, cache: Optional[LLMCache] = None):
+        self.name = name
+        self._prompt = prompt
+        self._model = model
+        self.repo_id = repo_id
+        self.model_kwargs = model_kwargs
+        self.cache_by_default = _env_flag(f"LLM_CACHE_{name.upper()}", cache_by_default)
+        self._cache = cache
+
+    @property
+    def prompt(self):
+        prompt = self._prompt
+        if isinstance(prompt, str):
+            # Building a PromptTemplate imports langchain_core's language model
+            # stack (and transformers, when installed), so wait until it's used
+            from langchain_core.prompts import PromptTemplate
+            prompt = self._prompt = PromptTemplate.from_template(prompt)
+        return prompt
+
+    @property
+    def model(self):
+        if isinstance(self._model, Runnable):
+            return self._model
+        return self._model()
+
+    @property
+    def chain(self):
+        return self.prompt | self.model
+
+    def _active_cache(self) -> Optional[LLMCache]:
+        configurable = ensure_config().get("configurable", {})
+        if not configurable.get(f"cache_{self.name}", self.cache_by_default):
+            return None
+        return self._cache or get_llm_cache()
+
+    def _key(self, prompt_text: str) -> str:
+        return make_key(cache_model_id(self.name, self.repo_id), self.model_kwargs, prompt_text)
+
+    def _lookup(self, cache: Optional[LLMCache], prompt_text: str):
+        """Return (key, cached_message); both None when the cache is off."""
+        if cache is None:
+            return None, None
+        key = self._key(prompt_text)
+        cached = cache.get(key)
+        if cached is None:
+            record(llm_cache_misses=1)
+            return key, None
+        logger.info(f"{self.name} LLM cache hit")
+        record(llm_cache_hits=1)
+        return key, AIMessage(content=cached)
+
+    def _finish(self, cache, key, prompt_text: str, result):
+        usage = getattr(result, "usage_metadata", None) or {}
+        record(
+            llm_calls=1,
+            prompt_tokens=usage.get("input_tokens") or count_tokens(prompt_text),
+            completion_tokens=usage.get("output_tokens") or count_tokens(result.content),
+        )
+        if cache is not None:
+            cache.put(key, result.content)
+        return result
+
+    def store(self, inputs: dict, content: str) -> None:
+        """Cache `content` as the response for `inputs`, if caching is on for this run."""
+        cache = self._active_cache()
+        if cache is not None:
+            cache.put(self._key(self.prompt.format(**inputs)), content)
+
+    def evict(self, inputs: dict) -> None:
+        """Forget the cached response for `inputs`, whether or not caching is on for this run."""
+        cache = self._cache or get_llm_cache()
+        if cache is not None:
+            cache.delete(self._key(self.prompt.format(**inputs)))
+
+    def invoke(self, inputs: dict, config=None, use_cache: bool = True):
+        cache = self._active_cache() if use_cache else None
+        prompt_text = self.prompt.format(**inputs)
+        key, cached = self._lookup(cache, prompt_text)
+        if cached is not None:
+            return cached
+        return self._finish(cache, key, prompt_text, self.chain.invoke(inputs, config))
+
+    async def ainvoke(self, inputs: dict, config=None, use_cache: bool = True):
+        cache = self._active_cache() if use_cache else None
+        prompt_text = self.prompt.format(**inputs)
+        key, cached = self._lookup(cache, prompt_text)
+        if cached is not None:
+            return cached
+        return self._finish(cache, key, prompt_text, await self.chain.ainvoke(inputs, config))
@@ -0,0 +1,417 @@
+"""
+Local CPU inference backend for the chat chains.
+
+Serves a chain from a transformers causal LM in this process instead of a
+Hugging Face endpoint (see utils.models for how a chain picks its backend).
+Small instruct models then run offline, at predictable latency and with no
+per-call cost.
+
+  BatchingEngine   one loaded model behind a bounded request queue; a worker
+                   thread gathers concurrent requests into batches
+  LocalChatModel   chat model Runnable that submits to an engine
+  get_engine       the shared engine of a model id
+
+Dynamic batching: the worker waits for a first request, then keeps taking
+requests for up to LOCAL_MAX_WAIT_MS or until it has LOCAL_MAX_BATCH of them.
+Requests with the same generation settings run as one padded `generate`
+call, so N concurrent graph runs cost about one forward pass per token
+instead of N. When the queue (LOCAL_QUEUE_SIZE) is full, callers wait for up
+to their timeout and then get LocalQueueFull, a TimeoutError the retry
+decorators back off on.
+
+Prefix reuse: each chain renders a fixed template, so its prompts share a
+long token prefix (chat header, instructions). The engine learns that prefix
+by comparing a prompt with the previous one of the same settings, computes
+its key/value cache once and keeps it in an LRU (LOCAL_PREFIX_CACHE
+entries). A batch sharing a cached prefix only runs its prompts' suffixes;
+the suffixes are padded after the prefix, and the attention mask hides the
+padding. A cached prefix longer than the shared part is cropped, not
+recomputed.
+
+torch and transformers are imported when the first engine is built.
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from utils.logger import setup_logger
+from utils.metrics import record
+from utils.retry import time_left
+
+logger = setup_logger(__name__)
+
+MAX_BATCH = int(os.getenv("LOCAL_MAX_BATCH", 8))
+MAX_WAIT = float(os.getenv("LOCAL_MAX_WAIT_MS", 10)) / 1000
+QUEUE_SIZE = int(os.getenv("LOCAL_QUEUE_SIZE", 64))
+PREFIX_CACHE = int(os.getenv("LOCAL_PREFIX_CACHE", 8))
+# Shorter shared prefixes are not worth a cache entry
+MIN_PREFIX = 16
+DEFAULT_MAX_NEW_TOKENS = 256
+
+# Endpoint kwargs that mean the same to transformers' generate()
+_GENERATE_KWARGS = ("max_new_tokens", "temperature", "top_p", "top_k", "repetition_penalty", "do_sample")
+_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+class LocalQueueFull(TimeoutError):
+    """The local model's request queue stayed full for the whole timeout."""
+
+
+def generation_kwargs(model_kwargs: dict) -> dict:
+    """generate() kwargs for a chain's endpoint model_kwargs; timeout, max_length etc. are dropped."""
+    gen = {k: model_kwargs[k] for k in _GENERATE_KWARGS if model_kwargs.get(k) is not None}
+    gen.setdefault("max_new_tokens", DEFAULT_MAX_NEW_TOKENS)
+    gen.setdefault("do_sample", bool(gen.get("temperature")))
+    if not gen["do_sample"]:
+        for k in ("temperature", "top_p", "top_k"):
+            gen.pop(k, None)
+    return gen
+
+
+def _common_prefix(a: Sequence[int], b: Sequence[int]) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class _Request:
+    __slots__ = ("prompt", "generation", "future")
+
+    def __init__(self, prompt: str, generation: dict):
+        self.prompt = prompt
+        self.generation = generation
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+
+
+class BatchingEngine:
+    """
+    A causal LM served to many threads through one batching worker.
+
+    Args:
+        model: transformers causal LM (in eval mode).
+        tokenizer: its tokenizer.
+        max_batch (int): most requests per generate() call.
+        max_wait (float): seconds to wait for more requests after the first.
+        queue_size (int): pending requests before submit() blocks.
+        prefix_cache (int): prompt prefixes whose key/value cache is kept.
+        min_prefix (int): shortest shared prefix (in tokens) worth caching.
+        name (str): used in logs.
+    """
+
+    def __init__(self, model, tokenizer, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT,
+                 queue_size: int = QUEUE_SIZE, prefix_cache: int = PREFIX_CACHE,
+                 min_prefix: int = MIN_PREFIX, name: str = "local"):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.prefix_cache = prefix_cache
+        self.min_prefix = min_prefix
+        self.name = name
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self._templated = bool(getattr(tokenizer, "chat_template", None))
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue(maxsize=queue_size)
+        self._prefixes: "OrderedDict[Tuple[int, ...], Any]" = OrderedDict()
+        self._last_prompt: Dict[tuple, List[int]] = {}
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self._worker.start()
+
+    # -- Client side --------------------------------------------------------------
+    def render(self, messages: Sequence[BaseMessage]) -> str:
+        """Prompt text for chat messages, through the tokenizer's chat template when it has one."""
+        if self._templated:
+            chat = [{"role": _ROLES.get(m.type, "user"), "content": m.content} for m in messages]
+            return self.tokenizer.apply_chat_template(chat, tokenize=False, add_generation_prompt=True)
+        return "\n\n".join(str(m.content) for m in messages)
+
+    def submit(self, prompt: str, generation: dict, timeout: Optional[float] = None) -> concurrent.futures.Future:
+        """
+        Queue a prompt; the future resolves to (text, prompt_tokens, completion_tokens, prefix_tokens).
+
+        Blocks while the queue is full, for at most `timeout` seconds.
+        """
+        request = _Request(prompt, generation)
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            raise LocalQueueFull(f"{self.name}: request queue full") from None
+        return request.future
+
+    def generate(self, prompt: str, generation: dict, timeout: Optional[float] = None):
+        """submit() and wait for the result."""
+        started = time.monotonic()
+        future = self.submit(prompt, generation, timeout)
+        remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        try:
+            return future.result(remaining)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"{self.name}: no result within {timeout}s") from None
+
+    def close(self) -> None:
+        """Stop the worker once the queued requests are done."""
+        self._queue.put(None)
+        self._worker.join()
+
+    # -- Worker side --------------------------------------------------------------
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        until = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            wait = until - time.monotonic()
+            try:
+                request = self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._stopping = True
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Callers that gave up while queued have cancelled their futures
+            batch = [r for r in self._collect(first) if r.future.set_running_or_notify_cancel()]
+            groups: Dict[tuple, List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(tuple(sorted(request.generation.items())), []).append(request)
+            for key, requests in groups.items():
+                try:
+                    results = self._generate(key, requests)
+                except BaseException as e:
+                    logger.error(f"{self.name}: batch of {len(requests)} failed: {e!r}")
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+                for request, result in zip(requests, results):
+                    request.future.set_result(result)
+
+    def _encode(self, prompt: str) -> List[int]:
+        # A chat template already adds the special tokens
+        return list(self.tokenizer(prompt, add_special_tokens=not self._templated)["input_ids"])
+
+    def _prefix(self, key: tuple, prompts: List[List[int]]) -> Tuple[Tuple[int, ...], Any]:
+        """The longest usable cached prefix of every prompt, learning a new one when possible."""
+        # Every prompt keeps at least one token to run, or generate() has no input
+        limit = min(len(p) for p in prompts) - 1
+        shared = prompts[0][:limit]
+        for ids in prompts[1:]:
+            shared = shared[:_common_prefix(shared, ids)]
+        previous = self._last_prompt.get(key)
+        self._last_prompt[key] = prompts[-1]
+
+        best, best_len = None, 0
+        for prefix in self._prefixes:
+            n = _common_prefix(prefix, shared)
+            if n > best_len:
+                best, best_len = prefix, n
+        if best is not None and best_len == len(best):
+            self._prefixes.move_to_end(best)
+            return best, self._prefixes[best]
+        if best_len >= self.min_prefix:
+            cache = copy.deepcopy(self._prefixes[best])
+            cache.crop(best_len)
+            return self._remember(best[:best_len], cache)
+        # A lone prompt is only a prefix of itself: learn from the previous one
+        if len(prompts) == 1:
+            if previous is None:
+                return (), None
+            shared = shared[:_common_prefix(shared, previous)]
+        if len(shared) >= self.min_prefix:
+            import torch
+
+            with torch.no_grad():
+                cache = self.model(torch.tensor([shared]), use_cache=True).past_key_values
+            return self._remember(tuple(shared), cache)
+        return (), None
+
+    def _remember(self, prefix: Tuple[int, ...], cache) -> Tuple[Tuple[int, ...], Any]:
+        if self.prefix_cache <= 0:
+            return prefix, cache
+        logger.info(f"{self.name}: caching a {len(prefix)}-token prompt prefix")
+        self._prefixes[prefix] = cache
+        while len(self._prefixes) > self.prefix_cache:
+            self._prefixes.popitem(last=False)
+        return prefix, cache
+
+    def _generate(self, key: tuple, requests: List[_Request]) -> list:
+        import torch
+
+        prompts = [self._encode(r.prompt) for r in requests]
+        prefix, prefix_cache = self._prefix(key, prompts)
+        suffixes = [ids[len(prefix):] for ids in prompts]
+        width = max(map(len, suffixes))
+        # Pad between the prefix and each suffix: the prefix cache stays valid
+        # for every row, and the mask (hence the position ids) skips the padding
+        input_ids = [list(prefix) + [self.pad_token_id] * (width - len(s)) + s for s in suffixes]
+        attention = [[1] * len(prefix) + [0] * (width - len(s)) + [1] * len(s) for s in suffixes]
+        inputs = torch.tensor(input_ids)
+        kwargs = dict(key)
+        if prefix_cache is not None:
+            cache = copy.deepcopy(prefix_cache)
+            cache.batch_repeat_interleave(len(requests))
+            kwargs["past_key_values"] = cache
+        with torch.no_grad():
+            output = self.model.generate(
+                inputs, attention_mask=torch.tensor(attention), pad_token_id=self.pad_token_id, **kwargs
+            )
+        completions = output[:, inputs.shape[1]:]
+        results = []
+        for ids, tokens in zip(prompts, completions.tolist()):
+            text = self.tokenizer.decode(tokens, skip_special_tokens=True)
+            results.append((text.strip(), len(ids), _trimmed_length(tokens, self.pad_token_id), len(prefix)))
+        return results
+
+
+def _trimmed_length(tokens: List[int], pad_token_id: int) -> int:
+    """Generated tokens, without the padding after a row that finished early."""
+    n = len(tokens)
+    while n and tokens[n - 1] == pad_token_id:
+        n -= 1
+    return n
+
+
+class LocalChatModel(BaseChatModel):
+    """
+    Chat model answering from a local BatchingEngine.
+
+    Fields:
+        engine: the BatchingEngine to submit to.
+        model_name (str): model id, for logs and tracing.
+        generation (dict): generate() kwargs, see generation_kwargs().
+        timeout (float): seconds to wait for a completion, queueing included;
+            a run deadline (utils.retry.deadline) shortens it.
+    """
+
+    engine: Any
+    model_name: str = "local"
+    generation: dict = {}
+    timeout: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-transformers"
+
+    def _timeout(self) -> Optional[float]:
+        left = time_left()
+        if left is None:
+            return self.timeout
+        return left if self.timeout is None else min(self.timeout, left)
+
+    def _result(self, completion) -> ChatResult:
+        text, prompt_tokens, completion_tokens, prefix_tokens = completion
+        record(prefix_cache_tokens=prefix_tokens)
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = self.engine.render(messages)
+        return self._result(self.engine.generate(prompt, self.generation, self._timeout()))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = self.engine.render(messages)
+        timeout = self._timeout()
+        # A full queue blocks in submit(), so wait for a slot off the event loop
+        future = await asyncio.to_thread(self.engine.submit, prompt, self.generation, timeout)
+        try:
+            completion = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{self.engine.name}: no result within {timeout}s") from None
+        return self._result(completion)
+
+
+_engines: Dict[str, BatchingEngine] = {}
+# Engines being loaded, so concurrent callers for one model wait for a single load
+_loading: Dict[str, concurrent.futures.Future] = {}
+_engines_lock = threading.Lock()
+
+
+def _load(model_id: str, token: Optional[str]) -> BatchingEngine:
+    # Deferred: torch and transformers take seconds to import
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    threads = os.getenv("LOCAL_THREADS")
+    if threads:
+        torch.set_num_threads(int(threads))
+    logger.info(f"Loading local model {model_id}")
+    tokenizer = AutoTokenizer.from_pretrained(model_id, token=token)
+    model = AutoModelForCausalLM.from_pretrained(model_id, token=token, torch_dtype=torch.float32)
+    model.eval()
+    return BatchingEngine(model, tokenizer, name=model_id)
+
+
+def get_engine(model_id: str, token: Optional[str] = None) -> BatchingEngine:
+    """
+    The process-wide engine for a model id (a Hub repo id or a local
+    directory), loaded on first use. Every chain and generation setting
+    using that model shares it, and so shares its batches.
+
+    Args:
+        model_id (str): model to load.
+        token (str): Hub token, only used to download the model.
+    """
+    while True:
+        with _engines_lock:
+            engine = _engines.get(model_id)
+            if engine is not None:
+                return engine
+            pending = _loading.get(model_id)
+            if pending is None:
+                pending = _loading[model_id] = concurrent.futures.Future()
+                break
+        # Another caller is loading this model; a load that was interrupted resolves to None
+        engine = pending.result()
+        if engine is not None:
+            return engine
+
+    # Loaded outside the lock, so other models don't wait minutes for this one
+    try:
+        engine = _load(model_id, token)
+    except BaseException as e:
+        with _engines_lock:
+            del _loading[model_id]
+        if isinstance(e, Exception):
+            pending.set_exception(e)
+        else:
+            pending.set_result(None)
+        raise
+    with _engines_lock:
+        del _loading[model_id]
+        _engines[model_id] = engine
+    pending.set_result(engine)
+    return engine
+
+
+def clear_engines() -> None:
+    """Stop and drop every loaded engine."""
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.close()
@@ -0,0 +1,321 @@
+"""
+Per-node instrumentation for the graphs.
+
+Two views of the same measurements:
+
+  * Process-wide Prometheus-style metrics (REGISTRY), rendered with
+    render_prometheus() or written to a textfile with write_prometheus().
+  * A per-run trace: inside `with run_trace("web") as trace:` every
+    instrumented node adds a span (wall time, status and recorded fields),
+    and trace.to_json() gives the whole run.
+
+Nodes are wrapped with @instrument("<node>"); code running inside a node calls
+record(fetch_bytes=..., prompt_tokens=..., ...) to attach numbers to the
+current span. Each recorded field is also exported as the counter
+research_<field>_total{node="<node>"}.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[dict] = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] += amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        counts = self._counts.get(_label_key(labels))
+        return counts[-1] if counts else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': f'{bound:g}'})} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {counts[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help)
+            return self._metrics[name]
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Gauge(name, help)
+            return self._metrics[name]
+
+    def histogram(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help, buckets)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for _, metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+NODE_SECONDS = REGISTRY.histogram("research_node_duration_seconds", "Wall time per graph node run")
+NODE_RUNS = REGISTRY.counter("research_node_runs_total", "Graph node runs by status")
+
+
+@dataclass
+class Span:
+    node: str
+    parent: Optional[str]
+    started_at: float
+    duration: float = 0.0
+    status: str = "ok"
+    error: Optional[str] = None
+    fields: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, name: str, value: float) -> None:
+        self.fields[name] = self.fields.get(name, 0) + value
+
+
+class RunTrace:
+    """All spans recorded during one graph run."""
+
+    def __init__(self, name: str):
+        self.run_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def node_totals(self) -> Dict[str, dict]:
+        """Per-node sums of wall time and recorded fields."""
+        totals: Dict[str, dict] = {}
+        with self._lock:
+            for span in self.spans:
+                entry = totals.setdefault(span.node, {"runs": 0, "seconds": 0.0})
+                entry["runs"] += 1
+                entry["seconds"] += span.duration
+                for name, value in span.fields.items():
+                    entry[name] = entry.get(name, 0) + value
+        return totals
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = [asdict(s) for s in self.spans]
+        return {
+            "run_id": self.run_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "nodes": self.node_totals(),
+            "spans": spans,
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def summary(self) -> str:
+        """One line of per-node wall times, e.g. 'load 0.41s | summarize 2.10s'."""
+        return " | ".join(f"{node} {t['seconds']:.2f}s" for node, t in self.node_totals().items())
+
+
+_current_trace: contextvars.ContextVar[Optional[RunTrace]] = contextvars.ContextVar("run_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("run_span", default=None)
+
+
+@contextmanager
+def run_trace(name: str):
+    """Collect a RunTrace for everything instrumented inside the block."""
+    trace = RunTrace(name)
+    token = _current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.duration = time.perf_counter() - start
+        _current_trace.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+_span_lock = threading.Lock()
+
+
+def record(**fields: float) -> None:
+    """Add numeric fields to the current node span and the matching counters."""
+    span = _current_span.get()
+    node = span.node if span else "none"
+    for name, value in fields.items():
+        if not value:
+            continue
+        REGISTRY.counter(f"research_{name}_total", f"Total {name.replace('_', ' ')}").inc(value, node=node)
+        if span is not None:
+            with _span_lock:
+                span.add(name, value)
+
+
+@contextmanager
+def _span(node: str):
+    parent = _current_span.get()
+    span = Span(node=node, parent=parent.node if parent else None, started_at=time.time())
+    token = _current_span.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.status, span.error = "error", str(e)
+        raise
+    finally:
+        span.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        NODE_SECONDS.observe(span.duration, node=node)
+        NODE_RUNS.inc(node=node, status=span.status)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(span)
+
+
+def instrument(node: str):
+    """
+    Decorator recording a span for each call of a (sync or async) node.
+
+    Usage:
+        @instrument("load")
+        def load_node(state):
+            ...
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _span(node):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _span(node):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+def write_prometheus(path: str) -> None:
+    """Write all metrics in Prometheus text format (node_exporter textfile style)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
@@ -0,0 +1,202 @@
+"""
+Lazily built, shared chat model clients.
+
+Building a ChatHuggingFace imports langchain_huggingface (and with it
+transformers), which dominates startup time. The node modules therefore only
+describe their model (repo_id + generation kwargs) and ask for the client on
+first use:
+
+    model = get_chat_model(repo_id, model_kwargs)
+
+Clients are pooled on (repo_id, model_kwargs, API token), so every chain that
+uses the same model, settings and key shares one client and its HTTP
+connections. The pool is a bounded LRU (MODEL_CLIENT_POOL_SIZE entries).
+
+The token comes from the surrounding `use_api_token(key)` block, falling back
+to HUGGINGFACEHUB_API_TOKEN. It is a context variable, so concurrent users
+of one process (e.g. Streamlit sessions) each get clients for their own key:
+
+    with use_api_token(session_key):
+        graph.invoke(state)
+
+LLM_ENDPOINT_URL points every model at one OpenAI-compatible server instead
+of the Hugging Face router (a TGI deployment, or the benchmark mock).
+
+Each chain can instead run on a local CPU model (utils.local_llm), chosen by
+name with environment variables:
+
+  LLM_BACKEND=local              every chain runs locally ("remote" by default)
+  LLM_BACKEND_CRITIC=remote      ... except the critic
+  LOCAL_MODEL=Qwen/Qwen2.5-0.5B-Instruct        model for local chains
+  LOCAL_MODEL_SUMMARIZE=./models/summarizer     ... per chain
+
+Without a LOCAL_MODEL the chain's own repo_id is loaded. Local chains share
+one engine (and its batches) per model, whatever their generation settings.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+POOL_SIZE = int(os.getenv("MODEL_CLIENT_POOL_SIZE", 32))
+# Per-call timeout (seconds) passed to the endpoint clients
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 120))
+
+BACKENDS = ("remote", "local")
+
+ModelKey = Tuple[str, str, str]
+
+_clients: "OrderedDict[ModelKey, object]" = OrderedDict()
+# Clients being built, so concurrent callers for one key wait for a single build
+_building: Dict[ModelKey, Future] = {}
+_clients_lock = threading.Lock()
+
+_api_token: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("hf_api_token", default=None)
+
+
+@contextmanager
+def use_api_token(token: Optional[str]):
+    """Use this API token for the models built or fetched inside the block."""
+    reset = _api_token.set(token or None)
+    try:
+        yield
+    finally:
+        _api_token.reset(reset)
+
+
+def current_api_token() -> Optional[str]:
+    return _api_token.get() or os.getenv("HUGGINGFACEHUB_API_TOKEN")
+
+
+def token_digest(token: Optional[str] = None) -> str:
+    """
+    Digest of an API token (the current one by default), for keys that must
+    tell callers apart without holding their raw keys.
+    """
+    if token is None:
+        token = current_api_token()
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()
+
+
+def _model_key(repo_id: str, model_kwargs: dict, token: Optional[str]) -> ModelKey:
+    return repo_id, json.dumps(model_kwargs, sort_keys=True, default=str), token_digest(token or "")
+
+
+def _build_chat_model(repo_id: str, model_kwargs: dict, token: Optional[str]):
+    # Deferred: importing langchain_huggingface costs seconds
+    from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
+    endpoint_url = os.getenv("LLM_ENDPOINT_URL")
+    target = {"endpoint_url": endpoint_url} if endpoint_url else {"repo_id": repo_id}
+    llm = HuggingFaceEndpoint(
+        **target,
+        huggingfacehub_api_token=token,
+        **model_kwargs
+    )
+    return ChatHuggingFace(llm=llm)
+
+
+def _build_local_chat_model(model_id: str, model_kwargs: dict, token: Optional[str]):
+    # Deferred: the local backend imports torch and transformers
+    from utils.local_llm import LocalChatModel, generation_kwargs, get_engine
+
+    return LocalChatModel(
+        engine=get_engine(model_id, token),
+        model_name=model_id,
+        generation=generation_kwargs(model_kwargs),
+        timeout=model_kwargs.get("timeout"),
+    )
+
+
+def resolve_model(name: Optional[str], repo_id: str) -> Tuple[str, str]:
+    """(backend, model id) the chain `name` runs on; see the module docstring."""
+    suffix = f"_{name.upper()}" if name else ""
+    backend = (os.getenv(f"LLM_BACKEND{suffix}") or os.getenv("LLM_BACKEND") or "remote").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend == "local":
+        return backend, os.getenv(f"LOCAL_MODEL{suffix}") or os.getenv("LOCAL_MODEL") or repo_id
+    return backend, repo_id
+
+
+def cache_model_id(name: Optional[str], repo_id: str) -> str:
+    """The model part of a response cache key: repo_id, or "local:<model>" for a local chain."""
+    backend, model_id = resolve_model(name, repo_id)
+    return repo_id if backend == "remote" else f"{backend}:{model_id}"
+
+
+def get_chat_model(repo_id: str, model_kwargs: dict, token: Optional[str] = None, name: Optional[str] = None):
+    """
+    Return the shared chat model client for repo_id and model_kwargs.
+
+    Args:
+        repo_id (str): Hugging Face model repo id.
+        model_kwargs (dict): generation kwargs passed to the endpoint.
+        token (str): API token, defaults to current_api_token().
+        name (str): chain name, selects the backend (LLM_BACKEND_<NAME>).
+    """
+    if token is None:
+        token = current_api_token()
+    backend, model_id = resolve_model(name, repo_id)
+    if backend == "local":
+        # Local clients don't depend on the API key, which only downloads the weights
+        key = _model_key(f"local:{model_id}", model_kwargs, None)
+        build = partial(_build_local_chat_model, model_id, model_kwargs, token)
+    else:
+        key = _model_key(repo_id, model_kwargs, token)
+        build = partial(_build_chat_model, repo_id, model_kwargs, token)
+    while True:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is not None:
+                _clients.move_to_end(key)
+                return client
+            pending = _building.get(key)
+            if pending is None:
+                pending = _building[key] = Future()
+                break
+        # Another caller is building this client; a build that was interrupted resolves to None
+        client = pending.result()
+        if client is not None:
+            return client
+
+    # Built outside the lock: a local model can take minutes to load, and
+    # other keys (remote chains included) must not wait for it
+    logger.info(f"Creating {backend} chat model client for {model_id}")
+    try:
+        client = build()
+    except BaseException as e:
+        with _clients_lock:
+            del _building[key]
+        if isinstance(e, Exception):
+            pending.set_exception(e)
+        else:
+            pending.set_result(None)
+        raise
+    with _clients_lock:
+        del _building[key]
+        _clients[key] = client
+        while len(_clients) > POOL_SIZE:
+            _clients.popitem(last=False)
+    pending.set_result(client)
+    return client
+
+
+def pool_size() -> int:
+    return len(_clients)
+
+
+def clear_model_cache() -> None:
+    with _clients_lock:
+        _clients.clear()
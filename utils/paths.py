@@ -0,0 +1,32 @@
+"""
+Where the on-disk caches live.
+
+Caches default to a per-user directory, so running from any folder (or a
+test run) doesn't leave SQLite files and page blobs in the working
+directory:
+
+  RESEARCH_CACHE_DIR                  if set
+  $XDG_CACHE_HOME/research-assistant  otherwise, when XDG_CACHE_HOME is set
+  ~/.cache/research-assistant         otherwise
+
+Each cache's own variable (PAGE_CACHE_DIR, DEDUP_INDEX, LLM_CACHE_PATH)
+still overrides its location.
+"""
+
+import os
+
+APP_NAME = "research-assistant"
+
+
+def cache_dir() -> str:
+    """The user cache directory for this project (not created here)."""
+    explicit = os.getenv("RESEARCH_CACHE_DIR")
+    if explicit:
+        return os.path.expanduser(explicit)
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, APP_NAME)
+
+
+def cache_path(name: str) -> str:
+    """Path of `name` inside cache_dir()."""
+    return os.path.join(cache_dir(), name)
@@ -1,33 +1,364 @@
-import time
+"""
+Retries and resilience for calls to the model endpoints.
+
+  retry / async_retry   retry decorators with full-jitter exponential backoff
+  deadline              total time budget for everything run inside it
+  CircuitBreaker        per-endpoint breaker that fails fast while it is down
+
+Which errors are retried:
+  * the exception types passed to the decorator (e.g. requests Timeout)
+  * timeouts and dropped connections (requests, httpx, builtin)
+  * HTTP 408, 429 and 5xx responses, honouring their Retry-After header
+Anything else (401, 402 out of credits, bad input, ...) is raised at once.
+
+Backoff uses "full jitter": each wait is uniform(0, delay * backoff**n),
+capped at max_delay, so many workers hitting the same outage don't retry in
+lock step. A server's Retry-After is used as the minimum wait.
+
+A deadline bounds the whole run, not each call:
+
+    with deadline(120):
+        graph.invoke(state)
+
+Inside it, a retry that would sleep past the deadline gives up with the last
+error, and an attempt started after it raises DeadlineExceeded. The deadline
+is a context variable, so it reaches worker threads started with
+ContextThreadPoolExecutor and the graph's own executor.
+"""
+
+import asyncio
+import contextvars
+import email.utils
 import functools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from utils.logger import setup_logger
+from utils.metrics import record
+
+logger = setup_logger(__name__)
+
+RETRY_STATUS = {408, 429}
+RUN_DEADLINE = float(os.getenv("RUN_DEADLINE_SECONDS", 600))
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run's time budget was used up."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The endpoint's circuit breaker is open; the call was not attempted."""
+
+
+# -- Error classification ---------------------------------------------------------
+def _status_code(exc: BaseException) -> Optional[int]:
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from the error response's Retry-After header (delay or HTTP date), if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+    except AttributeError:
+        return None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _transient_types() -> Tuple[type, ...]:
+    types = [TimeoutError, ConnectionError]
+    try:
+        import requests
+        types += [requests.exceptions.Timeout, requests.exceptions.ConnectionError]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        types += [httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError]
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+_TRANSIENT = _transient_types()
+
+
+def is_retryable(exc: BaseException, extra: Tuple[type, ...] = ()) -> bool:
+    """True for errors worth retrying: the `extra` types, timeouts, dropped connections, 408/429/5xx."""
+    if isinstance(exc, (DeadlineExceeded, CircuitOpenError)):
+        return False
+    if extra and isinstance(exc, extra):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRY_STATUS or status >= 500
+    return isinstance(exc, _TRANSIENT)
+
+
+def backoff_delay(attempt: int, delay: float, backoff: float, max_delay: float, jitter: bool = True) -> float:
+    """Wait before retry number `attempt` (0-based): full jitter over the exponential schedule."""
+    ceiling = min(max_delay, delay * backoff ** attempt)
+    return random.uniform(0, ceiling) if jitter else ceiling
+
+
+# -- Deadlines --------------------------------------------------------------------
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("retry_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float] = RUN_DEADLINE):
+    """
+    Bound everything inside the block to `seconds` (RUN_DEADLINE_SECONDS by default).
+
+    A deadline already in effect is only ever shortened, never extended.
+    None or 0 leaves the current deadline unchanged.
+    """
+    current = _deadline.get()
+    new = time.monotonic() + seconds if seconds else current
+    if current is not None and new is not None:
+        new = min(current, new)
+    token = _deadline.set(new)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline, or None when there is none."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def _check_deadline(name: str) -> None:
+    left = time_left()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"{name}: run deadline exceeded")
 
-def retry(exceptions, tries=3, delay=2, backoff=2):
+
+# -- Circuit breaker --------------------------------------------------------------
+class CircuitBreaker:
     """
-    Retry decorator with exponential backoff.
+    Args:
+        name (str): endpoint name, used in logs and errors.
+        failure_threshold (int): consecutive transient failures that open the circuit.
+        reset_timeout (float): seconds the circuit stays open before one trial call.
+
+    closed -> (failure_threshold failures) -> open -> (reset_timeout) -> half-open
+    half-open lets a single call through: success closes, failure re-opens.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may go through now. Returns True
+        when the call is the half-open trial, which the caller must end with
+        on_success, on_failure or abandon_trial.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return False
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                logger.info(f"circuit {self.name}: half-open, trying one call")
+                return True
+        record(circuit_rejections=1)
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open), failing fast")
+
+    def abandon_trial(self) -> None:
+        """The trial call ended without a verdict (cancelled, interrupted); let the next call try."""
+        with self._lock:
+            self._trial_running = False
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"circuit {self.name}: closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            trial_failed = self._trial_running
+            self._trial_running = False
+            if trial_failed or self.failures >= self.failure_threshold:
+                if trial_failed or self.opened_at is None:
+                    logger.warning(f"circuit {self.name}: open after {self.failures} failures")
+                    record(circuit_opened=1)
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """The shared breaker for an endpoint (CIRCUIT_FAILURES / CIRCUIT_RESET_SECONDS)."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("CIRCUIT_FAILURES", 5)),
+                reset_timeout=float(os.getenv("CIRCUIT_RESET_SECONDS", 30)),
+            )
+        return _breakers[name]
+
+
+# -- Decorators -------------------------------------------------------------------
+class _Attempts:
+    """Shared retry bookkeeping for the sync and async decorators."""
+
+    def __init__(self, name, exceptions, tries, delay, backoff, max_delay, circuit, jitter):
+        self.name = name
+        self.exceptions = tuple(exceptions)
+        self.tries = tries
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.breaker = get_breaker(circuit) if circuit else None
+        self.jitter = jitter
+
+    def before(self) -> bool:
+        """Check the deadline and circuit; True when this attempt is the circuit's trial call."""
+        _check_deadline(self.name)
+        return bool(self.breaker) and self.breaker.before_call()
+
+    def interrupted(self, trial: bool) -> None:
+        # Cancellation and KeyboardInterrupt say nothing about the endpoint
+        if trial:
+            self.breaker.abandon_trial()
+
+    def succeeded(self) -> None:
+        if self.breaker:
+            self.breaker.on_success()
+
+    def failed(self, exc: BaseException, attempt: int) -> float:
+        """Record a failed attempt; return the wait before the next one, or re-raise."""
+        retryable = is_retryable(exc, self.exceptions)
+        if self.breaker:
+            # Only transient failures count against the endpoint; a 4xx means it is up
+            if retryable:
+                self.breaker.on_failure()
+            else:
+                self.breaker.on_success()
+        if not retryable or attempt + 1 >= self.tries:
+            raise exc
+        wait = backoff_delay(attempt, self.delay, self.backoff, self.max_delay, self.jitter)
+        server_wait = _retry_after(exc)
+        if server_wait is not None:
+            wait = max(wait, server_wait)
+        left = time_left()
+        if left is not None and wait >= left:
+            logger.warning(f"{self.name}: {exc!r}; not retrying, {max(left, 0):.1f}s left before the deadline")
+            raise exc
+        logger.warning(f"{self.name}: {exc!r}; retry {attempt + 1}/{self.tries - 1} in {wait:.2f}s")
+        record(retries=1)
+        return wait
+
+
+def retry(exceptions=(), tries=3, delay=2, backoff=2, max_delay=30, circuit=None, jitter=True):
+    """
+    Retry decorator with full-jitter exponential backoff.
 
     Args:
-        exceptions (tuple): exceptions to catch and retry on.
+        exceptions (tuple): extra exception types to retry on, besides the
+            transient errors listed in the module docstring.
         tries (int): number of attempts.
-        delay (int): initial delay between retries.
-        backoff (int): multiplier for delay.
+        delay (float): backoff base in seconds.
+        backoff (float): multiplier for the backoff ceiling.
+        max_delay (float): cap on a single wait.
+        circuit (str): endpoint name; calls share that endpoint's CircuitBreaker.
+        jitter (bool): randomise waits (full jitter); False waits the full ceiling.
 
     Usage:
-        @retry((TimeoutError, SomeOtherError))
+        @retry((TimeoutError, SomeOtherError), circuit=repo_id)
         def func(...):
             ...
     """
     def decorator(func):
+        attempts = _Attempts(func.__name__, exceptions, tries, delay, backoff, max_delay, circuit, jitter)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            _tries, _delay = tries, delay
-            while _tries > 1:
+            for attempt in range(tries):
+                trial = attempts.before()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    time.sleep(attempts.failed(e, attempt))
+                    continue
+                except BaseException:
+                    attempts.interrupted(trial)
+                    raise
+                attempts.succeeded()
+                return result
+        return wrapper
+    return decorator
+
+
+def async_retry(exceptions=(), tries=3, delay=2, backoff=2, max_delay=30, circuit=None, jitter=True):
+    """
+    Async counterpart of `retry` for coroutine functions.
+
+    Backs off with asyncio.sleep, so other tasks keep running on the event
+    loop while a call waits to be retried.
+
+    Usage:
+        @async_retry((TimeoutError, SomeOtherError), circuit=repo_id)
+        async def func(...):
+            ...
+    """
+    def decorator(func):
+        attempts = _Attempts(func.__name__, exceptions, tries, delay, backoff, max_delay, circuit, jitter)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            for attempt in range(tries):
+                trial = attempts.before()
                 try:
-                    return func(*args, **kwargs)
-                except exceptions as e:
-                    print(f"Warning: {e}, retrying in {_delay} seconds...")
-                    time.sleep(_delay)
-                    _tries -= 1
-                    _delay *= backoff
-            return func(*args, **kwargs)
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    await asyncio.sleep(attempts.failed(e, attempt))
+                    continue
+                except BaseException:
+                    attempts.interrupted(trial)
+                    raise
+                attempts.succeeded()
+                return result
         return wrapper
     return decorator
@@ -0,0 +1,166 @@
+"""
+Request coalescing ("single flight").
+
+When several callers ask for the same thing at the same moment, only the
+first one (the leader) runs it; the others wait and receive the leader's
+result, or its exception. Once the call finishes the key is forgotten, so
+later requests run again (caching is left to the page and LLM caches).
+
+    flight = SingleFlight("web")
+    final_state = flight.do(key, graph.invoke, state)            # threads
+    final_state = await flight.ado(key, graph.ainvoke, state)    # asyncio
+
+Threads and coroutines share one table, so a coroutine can wait on a call
+led by a thread and vice versa. Followers receive the very same result
+object as the leader, so treat it as read-only.
+
+A leader that is cancelled (or interrupted) doesn't fail its followers: the
+call is abandoned and one of the waiting followers runs it instead. Only the
+leader's own errors are shared.
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.logger import setup_logger
+from utils.metrics import record
+
+logger = setup_logger(__name__)
+
+# Resolves an async follower's future when the leader gave up on the call
+_ABANDONED = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.abandoned = False
+        self.waiters = 0
+        self._futures: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def value(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def add_future(self, loop, future) -> None:
+        # Called under the SingleFlight lock, so it can't race finish()
+        self._futures.append((loop, future))
+
+    def finish(self, result, error) -> None:
+        self.result, self.error = result, error
+        self.done.set()
+        for loop, future in self._futures:
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    def abandon(self) -> None:
+        self.abandoned = True
+        self.finish(_ABANDONED, None)
+
+
+def _resolve(future: asyncio.Future, result, error) -> None:
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with equal keys.
+
+    Args:
+        name (str): used in logs.
+
+    Followers are counted in the research_coalesced_requests_total metric.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable, loop=None) -> Tuple[_Call, bool, Optional[asyncio.Future]]:
+        """
+        Return (call, leader, future): the call for key, whether the caller
+        leads it and, for an async follower, the future it should await.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                return call, True, None
+            call.waiters += 1
+            future = None
+            if loop is not None:
+                future = loop.create_future()
+                call.add_future(loop, future)
+        logger.info(f"{self.name}: identical request already running, waiting for its result")
+        record(coalesced_requests=1)
+        return call, False, future
+
+    def _finish(self, key: Hashable, call: _Call, result, error) -> None:
+        with self._lock:
+            del self._calls[key]
+            call.finish(result, error)
+        if call.waiters:
+            logger.info(f"{self.name}: {call.waiters} identical request(s) shared one run")
+
+    def _abandon(self, key: Hashable, call: _Call) -> None:
+        with self._lock:
+            del self._calls[key]
+            call.abandon()
+        if call.waiters:
+            logger.info(f"{self.name}: leading request was cancelled, a waiting one takes over")
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs):
+        """Run func(*args, **kwargs), unless a call with this key is in flight; then wait for that one."""
+        while True:
+            call, leader, _ = self._join(key)
+            if leader:
+                break
+            call.done.wait()
+            if not call.abandoned:
+                return call.value()
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._finish(key, call, None, e)
+            raise
+        except BaseException:
+            self._abandon(key, call)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    async def ado(self, key: Hashable, func: Callable, *args, **kwargs):
+        """Async counterpart of do(): func returns an awaitable."""
+        while True:
+            call, leader, future = self._join(key, asyncio.get_running_loop())
+            if leader:
+                break
+            # Cancelling a follower cancels only its own future, not the shared call
+            result = await future
+            if result is not _ABANDONED:
+                return result
+
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            self._finish(key, call, None, e)
+            raise
+        except BaseException:
+            self._abandon(key, call)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
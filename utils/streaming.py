@@ -0,0 +1,90 @@
+"""
+Stream graph progress and LLM tokens to the UI and CLI.
+
+GraphStream runs a compiled graph with stream_mode=["messages", "updates",
+"values"] and turns what comes back into simple events:
+
+  ("token", node, text)    a chunk of model output produced inside `node`
+  ("update", node, dict)   a node finished and returned these state updates
+
+After iteration, `final_state` holds the graph's last state values and
+`streamed_nodes` the nodes that emitted tokens.
+
+Only tokens from the nodes whose output the user reads (writer, speculate,
+summarize) are emitted. Intermediate calls, e.g. the per-chunk summaries of a
+long page, are tagged PARTIAL_TAG and skipped. speculate writes several
+candidates at once; only the first one of each round is streamed, so their
+tokens don't interleave.
+"""
+
+from typing import AsyncIterator, Iterable, Iterator, Optional, Tuple
+
+PARTIAL_TAG = "partial"
+TOKEN_NODES = ("writer", "speculate", "summarize")
+
+Event = Tuple[str, str, object]
+
+
+class GraphStream:
+    """
+    Args:
+        graph: compiled LangGraph.
+        state: initial state.
+        config (dict): optional run config.
+        token_nodes (Iterable[str]): nodes whose tokens are emitted.
+
+    Usage:
+        stream = GraphStream(web_graph, ResearchState(url=url))
+        for text in stream.tokens():
+            print(text, end="", flush=True)
+        summary = stream.final_state["summary"]
+    """
+
+    def __init__(self, graph, state, config: Optional[dict] = None,
+                 token_nodes: Iterable[str] = TOKEN_NODES):
+        self.graph = graph
+        self.state = state
+        self.config = config
+        self.token_nodes = set(token_nodes)
+        self.final_state: dict = {}
+        self.streamed_nodes: set = set()
+        # (node, step) -> id of the model message followed in that step
+        self._followed: dict = {}
+
+    def _event(self, mode: str, payload) -> Iterator[Event]:
+        if mode == "values":
+            self.final_state = payload
+        elif mode == "updates":
+            for node, update in payload.items():
+                yield "update", node, update or {}
+        elif mode == "messages":
+            chunk, metadata = payload
+            node = metadata.get("langgraph_node")
+            if node not in self.token_nodes or PARTIAL_TAG in (metadata.get("tags") or []):
+                return
+            step = (node, metadata.get("langgraph_step"))
+            if self._followed.setdefault(step, chunk.id) != chunk.id:
+                return
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if text:
+                self.streamed_nodes.add(node)
+                yield "token", node, text
+
+    def __iter__(self) -> Iterator[Event]:
+        for mode, payload in self.graph.stream(
+            self.state, self.config, stream_mode=["messages", "updates", "values"]
+        ):
+            yield from self._event(mode, payload)
+
+    async def __aiter__(self) -> AsyncIterator[Event]:
+        async for mode, payload in self.graph.astream(
+            self.state, self.config, stream_mode=["messages", "updates", "values"]
+        ):
+            for event in self._event(mode, payload):
+                yield event
+
+    def tokens(self) -> Iterator[str]:
+        """Just the token text, e.g. for st.write_stream."""
+        for kind, _, payload in self:
+            if kind == "token":
+                yield payload
@@ -0,0 +1,13 @@
+"""
+Token budgeting helpers.
+"""
+
+import math
+
+# Matches the loader's rule of thumb: ~100,000 characters ≈ 32,000 tokens
+CHARS_PER_TOKEN = 3
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of model tokens in text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
@@ -0,0 +1,59 @@
+"""
+URL helpers shared by the web loader and its caches.
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so equivalent spellings map to the same cache key.
+
+    Lowercases the scheme and host, drops default ports and fragments,
+    sorts query parameters and uses "/" for an empty path.
+
+        >>> normalize_url("HTTPS://www.MDPI.com:443/2076-3417/11/20/9772?b=2&a=1#sec1")
+        'https://www.mdpi.com/2076-3417/11/20/9772?a=1&b=2'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+                   "_ga", "_hsenc", "_hsmi", "ref_src"}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+
+# Trailing path segments that select another view of the same document,
+# e.g. MDPI's /htm (full text) and /pdf (PDF landing page)
+VIEW_SUFFIXES = {"htm", "html", "pdf", "xml", "epub"}
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Map the variants of one document to a single URL: normalize_url, plus
+    dropping tracking parameters, view suffixes and a trailing slash.
+
+        >>> canonical_url("https://www.mdpi.com/2076-3417/11/20/9772/htm?utm_source=x")
+        'https://www.mdpi.com/2076-3417/11/20/9772'
+    """
+    parts = urlsplit(normalize_url(url))
+    segments = parts.path.rstrip("/").split("/")
+    if len(segments) > 2 and segments[-1].lower() in VIEW_SUFFIXES:
+        segments.pop()
+    path = "/".join(segments) or "/"
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)])
+    return urlunsplit((parts.scheme, parts.netloc, path, query, ""))
@@ -1,27 +1,276 @@
-from IPython.display import Image, display
+"""
+Offline rendering of the compiled graphs.
+
+Images are rendered locally, without network access or IPython:
+
+  .svg   drawn here in pure Python (layered top-down layout)
+  .mmd   Mermaid source, for GitHub, mermaid.live or mmdc
+  .dot   Graphviz source, for `dot -Tpng`
+
+Every file records a hash of the graph's topology (nodes, edges, edge labels
+and which edges are conditional). When the file on disk already carries the
+current hash, rendering is skipped, so unchanged graphs cost nothing after
+the first run. Files are replaced atomically.
+
+main.py renders in a background thread (render_in_background), off the
+startup path; `python main.py visualize` renders in the foreground.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import defaultdict
 from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+START, END = "__start__", "__end__"
+
+NODE_HEIGHT = 36
+LAYER_GAP = 64
+NODE_GAP = 36
+MARGIN = 24
+CHAR_WIDTH = 8
+
+_HASH = re.compile(r"topology: ([0-9a-f]{16})")
+
+
+class Edge(NamedTuple):
+    source: str
+    target: str
+    label: str
+    conditional: bool
+
+
+class Topology(NamedTuple):
+    nodes: Tuple[str, ...]
+    edges: Tuple[Edge, ...]
+
+    @property
+    def digest(self) -> str:
+        payload = json.dumps([self.nodes, self.edges], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def topology(graph) -> Topology:
+    """Nodes and edges of a compiled graph (or of its drawable get_graph())."""
+    drawable = graph.get_graph() if hasattr(graph, "get_graph") else graph
+    nodes = tuple(drawable.nodes)
+    edges = tuple(sorted(
+        Edge(e.source, e.target, "" if e.data is None else str(e.data), bool(e.conditional))
+        for e in drawable.edges
+    ))
+    return Topology(nodes, edges)
+
+
+# -- Sources ----------------------------------------------------------------------
+def mermaid_source(topo: Topology) -> str:
+    lines = [f"%% topology: {topo.digest}", "graph TD;"]
+    for node in topo.nodes:
+        shape = f"([{node}])" if node in (START, END) else f"({node})"
+        lines.append(f"\t{node}{shape}")
+    for e in topo.edges:
+        label = f"|{e.label}|" if e.label else ""
+        lines.append(f"\t{e.source} {'-.->' if e.conditional else '-->'}{label} {e.target};")
+    return "\n".join(lines) + "\n"
+
+
+def dot_source(topo: Topology) -> str:
+    lines = [f"// topology: {topo.digest}", "digraph G {", '\tnode [shape=box, style="rounded"];']
+    for node in topo.nodes:
+        shape = ' [shape=oval]' if node in (START, END) else ""
+        lines.append(f'\t"{node}"{shape};')
+    for e in topo.edges:
+        attrs = []
+        if e.label:
+            attrs.append(f'label="{e.label}"')
+        if e.conditional:
+            attrs.append("style=dashed")
+        suffix = f" [{', '.join(attrs)}]" if attrs else ""
+        lines.append(f'\t"{e.source}" -> "{e.target}"{suffix};')
+    return "\n".join(lines) + "\n}\n"
+
 
-def graph_visualiser(graph, filename: str = "graph.jpg", show: bool = True):
+# -- SVG layout -------------------------------------------------------------------
+def _layers(topo: Topology) -> Tuple[Dict[str, int], set]:
+    """Layer of every node (longest path from the start) and the edges that point back up."""
+    successors = defaultdict(list)
+    for e in topo.edges:
+        successors[e.source].append(e.target)
+
+    # Depth-first from the start: an edge to a node still on the stack closes a cycle
+    back, state = set(), {}
+    order: List[str] = []
+
+    def visit(node):
+        state[node] = "open"
+        for target in successors[node]:
+            if state.get(target) == "open":
+                back.add((node, target))
+            elif target not in state:
+                visit(target)
+        state[node] = "done"
+        order.append(node)
+
+    for root in [START] + [n for n in topo.nodes if n != START]:
+        if root in topo.nodes and root not in state:
+            visit(root)
+
+    layer = {node: 0 for node in topo.nodes}
+    for node in reversed(order):
+        for target in successors[node]:
+            if (node, target) not in back:
+                layer[target] = max(layer[target], layer[node] + 1)
+    if END in layer:
+        layer[END] = max(layer.values())
+    return layer, back
+
+
+def _positions(topo: Topology, layer: Dict[str, int]) -> Dict[str, Tuple[float, float, float]]:
+    """Centre x, top y and width of every node."""
+    rows: Dict[int, List[str]] = defaultdict(list)
+    for node in topo.nodes:
+        rows[layer[node]].append(node)
+    width = {n: max(80, CHAR_WIDTH * len(n) + 28) for n in topo.nodes}
+    row_width = {i: sum(width[n] for n in row) + NODE_GAP * (len(row) - 1) for i, row in rows.items()}
+    canvas = max(row_width.values())
+    positions = {}
+    for i in sorted(rows):
+        x = MARGIN + (canvas - row_width[i]) / 2
+        for node in rows[i]:
+            positions[node] = (x + width[node] / 2, MARGIN + i * (NODE_HEIGHT + LAYER_GAP), width[node])
+            x += width[node] + NODE_GAP
+    return positions
+
+
+def render_svg(topo: Topology) -> str:
+    """A standalone SVG drawing of the graph, top to bottom."""
+    layer, back = _layers(topo)
+    pos = _positions(topo, layer)
+    width = max(x + w / 2 for x, _, w in pos.values()) + MARGIN + 60
+    height = max(y for _, y, _ in pos.values()) + NODE_HEIGHT + MARGIN
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+        f'viewBox="0 0 {width:.0f} {height:.0f}" font-family="sans-serif" font-size="13">',
+        f"<!-- topology: {topo.digest} -->",
+        '<defs><marker id="arrow" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="7" markerHeight="7" '
+        'orient="auto-start-reverse"><path d="M0,0 L10,5 L0,10 z" fill="#555"/></marker></defs>',
+    ]
+    for e in topo.edges:
+        sx, sy, sw = pos[e.source]
+        tx, ty, tw = pos[e.target]
+        dash = ' stroke-dasharray="5,4"' if e.conditional else ""
+        if (e.source, e.target) in back:
+            # Loop back up along the right-hand side
+            x1, y1 = sx + sw / 2, sy + NODE_HEIGHT / 2
+            x2, y2 = tx + tw / 2, ty + NODE_HEIGHT / 2
+            bulge = max(x1, x2) + 50
+            path = f"M{x1:.0f},{y1:.0f} C{bulge:.0f},{y1:.0f} {bulge:.0f},{y2:.0f} {x2:.0f},{y2:.0f}"
+            if e.source == e.target:
+                path = f"M{x1:.0f},{y1 - 8:.0f} C{x1 + 45:.0f},{y1 - 30:.0f} {x1 + 45:.0f},{y1 + 30:.0f} {x1:.0f},{y1 + 8:.0f}"
+            label_x, label_y = bulge - 10, (y1 + y2) / 2
+        else:
+            path = f"M{sx:.0f},{sy + NODE_HEIGHT:.0f} L{tx:.0f},{ty:.0f}"
+            label_x, label_y = (sx + tx) / 2 + 4, (sy + NODE_HEIGHT + ty) / 2
+        out.append(f'<path d="{path}" fill="none" stroke="#555"{dash} marker-end="url(#arrow)"/>')
+        if e.label:
+            out.append(f'<text x="{label_x:.0f}" y="{label_y:.0f}" fill="#555" font-size="11">{escape(e.label)}</text>')
+    for node in topo.nodes:
+        x, y, w = pos[node]
+        terminal = node in (START, END)
+        fill = "#e8e8f8" if terminal else "#f4f2ff"
+        radius = NODE_HEIGHT / 2 if terminal else 8
+        out.append(
+            f'<g><title>{escape(node)}</title><rect x="{x - w / 2:.0f}" y="{y:.0f}" width="{w:.0f}" '
+            f'height="{NODE_HEIGHT}" rx="{radius:.0f}" fill="{fill}" stroke="#6f5fd0"/>'
+            f'<text x="{x:.0f}" y="{y + NODE_HEIGHT / 2 + 4:.0f}" text-anchor="middle">{escape(node)}</text></g>'
+        )
+    out.append("</svg>")
+    return "\n".join(out) + "\n"
+
+
+# -- Files ------------------------------------------------------------------------
+RENDERERS: Dict[str, Callable[[Topology], str]] = {
+    ".svg": render_svg,
+    ".mmd": mermaid_source,
+    ".dot": dot_source,
+}
+
+
+def _cached_digest(path: Path) -> Optional[str]:
+    try:
+        with path.open(encoding="utf-8") as f:
+            match = _HASH.search(f.read(512))
+    except (OSError, UnicodeDecodeError):
+        return None
+    return match.group(1) if match else None
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def graph_visualiser(graph, filename: str = "graph.svg", show: bool = False) -> bool:
     """
-    Visualize and save the compiled LangGraph as a .jpg image.
+    Render a compiled LangGraph to filename (.svg, .mmd or .dot).
 
     Args:
         graph: Compiled LangGraph object.
-        filename (str): Path to save the image.
-        show (bool): Whether to display the image in notebook (optional).
+        filename (str): Path to save the drawing; the suffix picks the format.
+        show (bool): Whether to display the SVG in a notebook (needs IPython).
+
+    Returns True when the file was written, False when it was already up to date.
     """
-    try:
-        # Get raw image data
-        image_data = graph.get_graph().draw_mermaid_png()
+    path = Path(filename)
+    renderer = RENDERERS.get(path.suffix.lower())
+    if renderer is None:
+        raise ValueError(f"Unsupported graph image format {path.suffix!r}, use one of {', '.join(RENDERERS)}")
+    topo = topology(graph)
+    written = _cached_digest(path) != topo.digest
+    if written:
+        _write_atomic(path, renderer(topo))
+        logger.info(f"Graph drawing saved as {path.resolve()}")
+    if show:
+        # IPython is only needed for notebook display
+        from IPython.display import SVG, display
+        display(SVG(filename=str(path)))
+    return written
+
 
-        # Save to file
-        output_path = Path(filename)
-        with open(output_path, "wb") as f:
-            f.write(image_data)
+def render_graphs(graphs: Dict[str, Callable], directory: str = "visuals",
+                  formats: Iterable[str] = (".svg", ".mmd")) -> List[Path]:
+    """Render each named graph factory to <directory>/<name>_graph.<format>; returns the files written."""
+    written = []
+    for name, factory in graphs.items():
+        graph = factory()
+        for suffix in formats:
+            path = Path(directory) / f"{name}_graph{suffix}"
+            try:
+                if graph_visualiser(graph, str(path)):
+                    written.append(path)
+            except Exception as e:
+                logger.warning(f"Failed to render {path}: {e!r}")
+    return written
 
-        if show:
-            display(Image(filename))
-        print(f"✅ Graph image saved as: {output_path.resolve()}")
 
-    except Exception as e:
-        print(f"❌ Failed to generate graph image: {e}")
\ No newline at end of file
+def render_in_background(graphs: Dict[str, Callable], directory: str = "visuals") -> threading.Thread:
+    """render_graphs() in a daemon thread, so the caller does not wait for graph compilation."""
+    thread = threading.Thread(target=render_graphs, args=(graphs, directory), name="graph-visualiser", daemon=True)
+    thread.start()
+    return thread